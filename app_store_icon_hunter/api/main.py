@@ -2,11 +2,11 @@
 FastAPI server for App Store Icon Hunter
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Query
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Header, Query, Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import AsyncIterator, List, Optional, Dict, Union
 import asyncio
 import os
 import json
@@ -16,17 +16,47 @@ import logging
 
 try:
     from ..core.app_store import AppStoreAPI
+    from ..core.archive import iter_zip
+    from ..core.autocomplete import PrefixIndex
     from ..core.google_play import GooglePlayAPI
     from ..core.downloader import IconDownloader
-    from ..utils.helpers import validate_store_name, validate_country_code, validate_icon_sizes
+    from ..core.cache import cache_from_env
+    from ..core.catalog import catalog_from_env
+    from ..core.http import get_shared_session
+    from ..core.imaging import image_pool_from_env, resize_quality_from_env, validate_encoding
+    from ..core.matching import CrossStoreMatcher
+    from ..core.models import AppRecord
+    from ..core.presets import check_preset_format, parse_presets
+    from ..core.ratelimit import get_rate_limiter
+    from ..core.resilience import get_breakers
+    from ..core.search import SOURCES, MultiStoreSearch
+    from ..core.singleflight import SingleFlight
+    from ..utils.helpers import (
+        validate_store_name, validate_country_code, validate_icon_sizes, STOREFRONT_COUNTRIES
+    )
 except ImportError:
     # Fallback for direct execution
     import sys
     sys.path.insert(0, str(Path(__file__).parent.parent))
     from core.app_store import AppStoreAPI
+    from core.archive import iter_zip
+    from core.autocomplete import PrefixIndex
     from core.google_play import GooglePlayAPI
     from core.downloader import IconDownloader
-    from utils.helpers import validate_store_name, validate_country_code, validate_icon_sizes
+    from core.cache import cache_from_env
+    from core.catalog import catalog_from_env
+    from core.http import get_shared_session
+    from core.imaging import image_pool_from_env, resize_quality_from_env, validate_encoding
+    from core.matching import CrossStoreMatcher
+    from core.models import AppRecord
+    from core.presets import check_preset_format, parse_presets
+    from core.ratelimit import get_rate_limiter
+    from core.resilience import get_breakers
+    from core.search import SOURCES, MultiStoreSearch
+    from core.singleflight import SingleFlight
+    from utils.helpers import (
+        validate_store_name, validate_country_code, validate_icon_sizes, STOREFRONT_COUNTRIES
+    )
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -50,10 +80,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize APIs
-app_store_api = AppStoreAPI()
-google_play_api = GooglePlayAPI()
-downloader = IconDownloader()
+# Initialize APIs (search cache is configured via ICON_HUNTER_CACHE_* variables)
+search_cache = cache_from_env()
+# Identical concurrent searches share one upstream request
+search_flights = SingleFlight()
+# Opt-in catalog of every app seen (ICON_HUNTER_CATALOG_PATH)
+app_catalog = catalog_from_env()
+# Autocomplete suggestions, updated as fresh search results arrive
+autocomplete_index = PrefixIndex()
+app_store_api = AppStoreAPI(cache=search_cache, catalog=app_catalog,
+                            prefix_index=autocomplete_index, singleflight=search_flights)
+google_play_api = GooglePlayAPI(cache=search_cache, catalog=app_catalog,
+                                prefix_index=autocomplete_index, singleflight=search_flights)
+multi_store_search = MultiStoreSearch(app_store_api, google_play_api, catalog=app_catalog)
+# Concurrent requests for the same job atlas share one build
+atlas_flights = SingleFlight()
+# Icon processing (ICON_HUNTER_IMAGE_EXECUTOR / _IMAGE_WORKERS / _RESIZE_QUALITY / _RENDITIONS)
+downloader = IconDownloader(
+    image_pool=image_pool_from_env(),
+    resize_quality=resize_quality_from_env(),
+    renditions=os.getenv("ICON_HUNTER_RENDITIONS", "").strip().lower() in ("1", "true", "yes", "on"),
+)
+
+
+@app.on_event("startup")
+async def seed_autocomplete():
+    """Build the autocomplete index from the app catalog, or else the search cache"""
+    source = app_catalog or search_cache
+    if source is not None:
+        count = autocomplete_index.add(source.records())
+        logger.info(f"Autocomplete index seeded with {count} apps")
+
+
+@app.on_event("shutdown")
+async def close_pools():
+    """Release pooled upstream connections and image workers on shutdown"""
+    await get_shared_session().close()
+    downloader.close()
+
 
 # Pydantic models
 class AppSearchResult(BaseModel):
@@ -67,17 +131,97 @@ class AppSearchResult(BaseModel):
     developer: Optional[str] = None
     category: Optional[str] = None
     url: Optional[str] = None
+    last_seen: Optional[float] = None  # Set on results served from the local catalog
+    paired_with: Optional[Dict] = None  # Same product in the other store
+
+
+class AutocompleteSuggestion(BaseModel):
+    name: str
+    bundle_id: str
+    store: str
+    developer: Optional[str] = None
+    icon_url: Optional[str] = None
+    rating: Optional[float] = None
+
 
 class SearchRequest(BaseModel):
     term: str = Field(..., description="Search term for apps")
     store: str = Field(default="both", description="Store to search: 'appstore', 'googleplay', or 'both'")
     country: str = Field(default="us", description="Country code")
     limit: int = Field(default=10, description="Maximum number of results")
+    timeout: Optional[float] = Field(default=None, description="Per-store deadline in seconds")
+
+
+class StreamSearchRequest(SearchRequest):
+    limit: int = Field(default=50, description="Maximum number of results per store (App Store up to 200, Google Play up to 100)")
+    offset: int = Field(default=0, description="Results to skip per store (App Store only)")
+    format: str = Field(default="ndjson", description="Stream format: 'ndjson' or 'sse'")
+
+
+class SweepResult(AppSearchResult):
+    countries: List[str] = []
+    icon_urls: Dict[str, str] = {}
+
+
+class SweepRequest(BaseModel):
+    term: str = Field(..., description="Search term for apps")
+    store: str = Field(default="both", description="Store to search: 'appstore', 'googleplay', or 'both'")
+    countries: List[str] = Field(default=[], description="Country codes to search")
+    all_countries: bool = Field(default=False, description="Search every App Store storefront")
+    limit: int = Field(default=10, description="Maximum number of results per store and country")
+    concurrency: int = Field(default=8, description="Countries searched at once")
+    timeout: Optional[float] = Field(default=None, description="Per-store deadline in seconds")
+
+
+class SweepResponse(BaseModel):
+    results: List[SweepResult]
+    countries: Dict[str, Dict[str, Dict]]
+
+
+class MatchApp(BaseModel):
+    name: str
+    store: str = ""
+    developer: Optional[str] = None
+    bundle_id: Optional[str] = None
+    icon_url: Optional[str] = None
+    price: Optional[str] = None
+    rating: Optional[float] = None
+    description: Optional[str] = None
+    category: Optional[str] = None
+    url: Optional[str] = None
+    icon_hash: Optional[Union[int, str]] = Field(default=None, description="64-bit icon difference hash")
+
+
+class MatchRequest(BaseModel):
+    apps: List[MatchApp] = Field(..., description="App Store and Google Play apps in search result format")
+    min_score: float = Field(default=0.75, description="Lowest similarity (0-1) accepted as a match")
+
+
+class MatchedPair(BaseModel):
+    appstore: AppSearchResult
+    googleplay: AppSearchResult
+    score: float
+
+
+class MatchResponse(BaseModel):
+    pairs: List[MatchedPair]
+    stats: Dict
+
+
+class LookupRequest(BaseModel):
+    ids: List[str] = Field(..., description="App Store track IDs, bundle IDs or app URLs")
+    country: str = Field(default="us", description="Country code")
+
 
 class DownloadRequest(BaseModel):
     apps: List[Dict] = Field(..., description="List of apps to download")
     sizes: List[int] = Field(default=[64, 128, 256, 512], description="Icon sizes to download")
-    format: str = Field(default="zip", description="Download format: 'zip' or 'individual'")
+    format: str = Field(default="zip", description="'zip' for the requested sizes, or comma-separated "
+                                                   "export presets: 'ios', 'android', 'macos-icns', "
+                                                   "'windows-ico', 'web-favicon'")
+    encoder: Optional[str] = Field(default=None, description="Encoder profile: 'fast', 'balanced' or 'smallest'")
+    image_format: Optional[str] = Field(default=None, description="Icon format: 'png', 'webp' or 'avif'")
+
 
 class DownloadStatus(BaseModel):
     job_id: str
@@ -99,23 +243,39 @@ async def root():
         "description": "Search apps and download icons from App Store and Google Play",
         "endpoints": {
             "search": "/search",
+            "search_stream": "/search/stream",
+            "autocomplete": "/autocomplete?q=",
+            "sweep": "/search/sweep",
+            "lookup": "/lookup",
+            "match": "/match",
             "download": "/download",
             "status": "/status/{job_id}",
             "download_file": "/download/{job_id}",
+            "atlas": "/atlas/{job_id}?size=",
+            "stats": "/stats",
             "docs": "/docs"
         }
     }
 
 
 @app.post("/search", response_model=List[AppSearchResult])
-async def search_apps(request: SearchRequest):
+async def search_apps(request: SearchRequest, response: Response,
+                      source: str = Query("remote", description="'remote', 'local' or 'local_first'"),
+                      max_age: Optional[float] = Query(None, description="Freshness window in seconds for local_first")):
     """
     Search for apps in App Store and/or Google Play Store
-    
+
     - **term**: Search term (required)
     - **store**: Which store to search ('appstore', 'googleplay', or 'both')
     - **country**: Country code (default: 'us')
     - **limit**: Maximum results per store (default: 10)
+    - **timeout**: Per-store deadline in seconds
+    - **source** (query): 'remote' (default), 'local' to answer from the app
+      catalog only, or 'local_first' to use catalog matches seen within
+      **max_age** seconds and fall back to the stores
+
+    Stores are queried concurrently. The outcome of each store is reported in
+    the ``X-Store-Status`` response header as a JSON object.
     """
     # Validate inputs
     if not validate_store_name(request.store):
@@ -126,40 +286,224 @@ async def search_apps(request: SearchRequest):
     
     if request.limit < 1 or request.limit > 50:
         raise HTTPException(status_code=400, detail="Limit must be between 1 and 50")
-    
-    all_apps = []
+
+    if request.timeout is not None and request.timeout <= 0:
+        raise HTTPException(status_code=400, detail="Timeout must be positive")
+
+    if source not in SOURCES:
+        raise HTTPException(status_code=400, detail=f"Source must be one of: {', '.join(SOURCES)}")
+
+    if source != "remote" and app_catalog is None:
+        raise HTTPException(status_code=400, detail="Local catalog is not enabled (set ICON_HUNTER_CATALOG_PATH)")
     
     try:
-        # Search App Store
-        if request.store in ["appstore", "both"]:
-            app_store_results = app_store_api.search_apps(
-                request.term, request.country, request.limit
-            )
-            all_apps.extend(app_store_results)
-        
-        # Search Google Play
-        if request.store in ["googleplay", "both"]:
-            google_play_results = google_play_api.search_apps(
-                request.term, request.country, request.limit
-            )
-            all_apps.extend(google_play_results)
-        
-        # Convert to response model
-        results = []
-        for app in all_apps:
-            try:
-                result = AppSearchResult(**app)
-                results.append(result)
-            except Exception as e:
-                logger.warning(f"Failed to parse app result: {e}")
-                continue
-        
-        return results
-        
+        outcome = await multi_store_search.search(
+            request.term, request.store, request.country, request.limit, request.timeout,
+            source, max_age
+        )
     except Exception as e:
         logger.error(f"Search failed: {e}")
         raise HTTPException(status_code=500, detail="Search failed")
 
+    statuses = outcome["stores"]
+    response.headers["X-Store-Status"] = json.dumps(statuses)
+
+    if not any(status["status"] == "ok" for status in statuses.values()) and \
+            any(status["status"] in ("error", "timeout", "circuit_open") for status in statuses.values()):
+        raise HTTPException(
+            status_code=502,
+            detail={"message": "Search failed", "stores": statuses},
+            headers={"X-Store-Status": response.headers["X-Store-Status"]},
+        )
+
+    # AppRecords are already normalized; FastAPI validates them against the
+    # response model once while serializing
+    return outcome["results"]
+
+
+@app.get("/autocomplete", response_model=List[AutocompleteSuggestion])
+async def autocomplete(q: str = Query(..., description="Prefix typed so far"),
+                       limit: int = Query(10, description="Maximum suggestions (max: 20)"),
+                       store: str = Query("both", description="'appstore', 'googleplay', or 'both'")):
+    """
+    Suggest apps whose name or developer has a word starting with **q**
+
+    Answered from an in-memory prefix index of apps seen in earlier searches
+    (seeded from the app catalog or search cache at startup); upstream
+    stores are never contacted. Suggestions are ranked by rating and by how
+    often the app has appeared in search results.
+    """
+    if not validate_store_name(store):
+        raise HTTPException(status_code=400, detail="Invalid store name")
+
+    if limit < 1 or limit > autocomplete_index.top_k:
+        raise HTTPException(status_code=400,
+                            detail=f"Limit must be between 1 and {autocomplete_index.top_k}")
+
+    return autocomplete_index.complete(q, limit, None if store == "both" else store)
+
+
+@app.post("/search/stream")
+async def stream_search(request: StreamSearchRequest):
+    """
+    Stream search results as each store's response is parsed
+
+    - **term**: Search term (required)
+    - **store**: Which store to search ('appstore', 'googleplay', or 'both')
+    - **country**: Country code (default: 'us')
+    - **limit**: Maximum results per store (default: 50, max: 200)
+    - **offset**: Results to skip per store, for paging (App Store only)
+    - **format**: 'ndjson' (default) or 'sse'
+    - **timeout**: Per-store deadline in seconds
+
+    Emits ``result`` events (one per app), a ``status`` event when each store
+    finishes, and a final ``done`` event with every store's status.
+    """
+    if not validate_store_name(request.store):
+        raise HTTPException(status_code=400, detail="Invalid store name")
+
+    if not validate_country_code(request.country):
+        raise HTTPException(status_code=400, detail="Invalid country code")
+
+    if request.limit < 1 or request.limit > 200:
+        raise HTTPException(status_code=400, detail="Limit must be between 1 and 200")
+
+    if request.offset < 0:
+        raise HTTPException(status_code=400, detail="Offset must not be negative")
+
+    if request.timeout is not None and request.timeout <= 0:
+        raise HTTPException(status_code=400, detail="Timeout must be positive")
+
+    if request.format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="Format must be 'ndjson' or 'sse'")
+
+    events = multi_store_search.stream(
+        request.term, request.store, request.country, request.limit,
+        request.offset, request.timeout
+    )
+    if request.format == "sse":
+        return StreamingResponse(
+            encode_sse(events), media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+    return StreamingResponse(encode_ndjson(events), media_type="application/x-ndjson")
+
+
+def event_json(event: Dict) -> str:
+    """Serialize a search stream event"""
+    if "app" in event:
+        event = dict(event, app=event["app"].to_dict())
+    return json.dumps(event)
+
+
+async def encode_ndjson(events: AsyncIterator[Dict]) -> AsyncIterator[str]:
+    async for event in events:
+        yield event_json(event) + "\n"
+
+
+async def encode_sse(events: AsyncIterator[Dict]) -> AsyncIterator[str]:
+    async for event in events:
+        yield f"event: {event['type']}\ndata: {event_json(event)}\n\n"
+
+
+@app.post("/search/sweep", response_model=SweepResponse)
+async def sweep_search(request: SweepRequest):
+    """
+    Search the same term across many storefronts
+
+    - **term**: Search term (required)
+    - **store**: Which store to search ('appstore', 'googleplay', or 'both')
+    - **countries**: Country codes to search, or **all_countries** for every storefront
+    - **limit**: Maximum results per store and country (default: 10)
+    - **concurrency**: Countries searched at once (default: 8, max: 32)
+
+    Apps are merged by bundle ID. Each result lists the countries it was found
+    in, and ``icon_urls`` holds any per-country icon that differs from ``icon_url``.
+    """
+    if not validate_store_name(request.store):
+        raise HTTPException(status_code=400, detail="Invalid store name")
+
+    countries = STOREFRONT_COUNTRIES if request.all_countries else request.countries
+    if not countries:
+        raise HTTPException(status_code=400, detail="No countries provided")
+
+    if not all(validate_country_code(country) for country in countries):
+        raise HTTPException(status_code=400, detail="Invalid country code")
+
+    if request.limit < 1 or request.limit > 50:
+        raise HTTPException(status_code=400, detail="Limit must be between 1 and 50")
+
+    if request.concurrency < 1 or request.concurrency > 32:
+        raise HTTPException(status_code=400, detail="Concurrency must be between 1 and 32")
+
+    if request.timeout is not None and request.timeout <= 0:
+        raise HTTPException(status_code=400, detail="Timeout must be positive")
+
+    outcome = await multi_store_search.sweep(
+        request.term, countries, request.store, request.limit,
+        request.concurrency, request.timeout
+    )
+
+    return outcome
+
+
+@app.post("/lookup", response_model=List[AppSearchResult])
+async def lookup_apps(request: LookupRequest):
+    """
+    Resolve known App Store apps in bulk
+
+    - **ids**: Track IDs, bundle IDs or App Store URLs (up to 5000)
+    - **country**: Country code (default: 'us')
+
+    Identifiers are resolved with batched iTunes lookups instead of one
+    search per app. Unknown identifiers are omitted from the response.
+    """
+    if not request.ids:
+        raise HTTPException(status_code=400, detail="No ids provided")
+
+    if len(request.ids) > 5000:
+        raise HTTPException(status_code=400, detail="At most 5000 ids per request")
+
+    if not validate_country_code(request.country):
+        raise HTTPException(status_code=400, detail="Invalid country code")
+
+    return await app_store_api.aget_app_details_bulk(request.ids, request.country)
+
+
+@app.post("/match", response_model=MatchResponse)
+async def match_apps(request: MatchRequest):
+    """
+    Pair App Store and Google Play apps that are the same product
+
+    - **apps**: Apps from both stores (e.g. collected `/search` results), up to 100000
+    - **min_score**: Lowest similarity accepted (default: 0.75)
+
+    Apps are compared by normalized name, developer and bundle ID (plus
+    ``icon_hash`` when given) within shared blocks, and each app is paired
+    at most once.
+    """
+    if len(request.apps) > 100000:
+        raise HTTPException(status_code=400, detail="At most 100000 apps per request")
+
+    if not 0 < request.min_score <= 1:
+        raise HTTPException(status_code=400, detail="min_score must be between 0 and 1")
+
+    # Fields left out or null take AppRecord's defaults
+    records = [
+        AppRecord.from_dict({key: value for key, value in vars(app).items() if value is not None})
+        for app in request.apps
+    ]
+    matcher = CrossStoreMatcher(min_score=request.min_score)
+    # Matching large batches is CPU bound; keep the event loop responsive
+    pairs = await asyncio.get_running_loop().run_in_executor(None, matcher.match, records)
+    return {
+        "pairs": [
+            {"appstore": app_store, "googleplay": google_play, "score": score}
+            for app_store, google_play, score in pairs
+        ],
+        "stats": matcher.last_stats,
+    }
+
 
 @app.post("/download")
 async def start_download(request: DownloadRequest, background_tasks: BackgroundTasks):
@@ -168,7 +512,12 @@ async def start_download(request: DownloadRequest, background_tasks: BackgroundT
     
     - **apps**: List of app dictionaries to download
     - **sizes**: List of icon sizes to generate (default: [64, 128, 256, 512])
-    - **format**: Download format ('zip' only supported currently)
+    - **format**: 'zip' (default) for the requested sizes, or comma-separated
+      export presets ('ios', 'android', 'macos-icns', 'windows-ico',
+      'web-favicon') built in one pass from each icon instead of ``sizes``
+    - **encoder**: Encoder profile ('fast', 'balanced' or 'smallest'; default: 'balanced')
+    - **image_format**: Icon format ('png', 'webp' or 'avif'; default: 'png');
+      presets are always PNG and cannot be combined with another format
     """
     # Validate inputs
     if not request.apps:
@@ -177,6 +526,15 @@ async def start_download(request: DownloadRequest, background_tasks: BackgroundT
     if not validate_icon_sizes(request.sizes):
         raise HTTPException(status_code=400, detail="Invalid icon sizes")
     
+    try:
+        validate_encoding(request.encoder or downloader.encoder,
+                          request.image_format or downloader.image_format)
+        presets = None if request.format in ("zip", "individual") else parse_presets(request.format)
+        if presets:
+            check_preset_format(request.image_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     # Generate job ID
     job_id = str(uuid.uuid4())
     
@@ -185,7 +543,10 @@ async def start_download(request: DownloadRequest, background_tasks: BackgroundT
         download_icons_background, 
         job_id, 
         request.apps, 
-        request.sizes
+        request.sizes,
+        request.encoder,
+        request.image_format,
+        presets
     )
     
     return {
@@ -211,31 +572,141 @@ async def get_download_status(job_id: str):
 
 
 @app.get("/download/{job_id}")
-async def download_file(job_id: str):
+async def download_file(
+    job_id: str,
+    partial: bool = Query(False, description="Download the icons finished so far if the job is still running")
+):
     """
-    Download the completed ZIP file for a job
+    Download the icons of a completed job as a ZIP file
+    
+    The archive is built while it is sent, from the job's icon files, so
+    the first bytes go out immediately and no archive is kept on disk.
     
-    - **job_id**: The ID of the completed download job
+    - **job_id**: The ID of the download job
+    - **partial**: Allow downloading a running or failed job; the archive
+      holds the apps finished when the request arrived
     """
     status = downloader.get_job_status(job_id)
     
     if not status:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    if status["status"] != "completed":
-        raise HTTPException(status_code=400, detail="Job not completed")
+    complete = status["status"] == "completed"
+    if not complete and not partial:
+        raise HTTPException(status_code=400, detail="Job not completed; use partial=true for the icons finished so far")
     
-    zip_path = status.get("zip_path")
-    if not zip_path or not os.path.exists(zip_path):
+    entries = downloader.archive_entries(job_id)
+    if not entries:
         raise HTTPException(status_code=404, detail="Download file not found")
     
-    return FileResponse(
-        zip_path, 
+    filename = f"icons_{job_id[:8]}.zip" if complete else f"icons_{job_id[:8]}_partial.zip"
+    # A plain iterator: Starlette runs it, and so the file reads, on a worker thread
+    return StreamingResponse(
+        iter_zip(entries),
         media_type="application/zip",
-        filename=f"icons_{job_id[:8]}.zip"
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Archive-Files": str(len(entries)),
+        }
     )
 
 
+# Sheet names are content hashes, so a sheet URL never changes content
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+async def job_atlas(job_id: str, size: int) -> Dict:
+    """Atlas index of a completed job, built on first use"""
+    status = downloader.get_job_status(job_id)
+    
+    if not status:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if status["status"] != "completed":
+        raise HTTPException(status_code=400, detail="Job not completed")
+    
+    # Only sizes the job rendered can be packed; anything else would build an empty atlas
+    sizes = status.get("sizes") or []
+    if size not in sizes:
+        raise HTTPException(status_code=400, detail=f"Job has no {size}px icons; available sizes: {sizes}")
+    
+    async def build():
+        # Blocking file I/O and encoding; sheets are built on the image pool
+        return await asyncio.get_running_loop().run_in_executor(None, downloader.build_atlas, job_id, size)
+    
+    index = await atlas_flights.do((job_id, size), build)
+    if not index or not index["icons"]:
+        raise HTTPException(status_code=404, detail=f"No {size}px icons in this job")
+    return index
+
+
+def not_modified(etag: str, if_none_match: Optional[str]) -> bool:
+    """Whether an If-None-Match header matches ``etag``"""
+    if not if_none_match:
+        return False
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    tags |= {tag[2:] for tag in tags if tag.startswith("W/")}
+    return "*" in tags or etag in tags
+
+
+@app.get("/atlas/{job_id}")
+async def get_atlas(
+    job_id: str,
+    size: int = Query(64, description="Icon size in pixels; one of the sizes the job generated"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Sprite sheet index of a completed job's icons of one size
+    
+    Every icon of the size is packed into as few sheets as fit (at most
+    4096px a side), so a dashboard loads one or a few images instead of one
+    per app. The atlas is built on the first request and reused.
+    
+    - **job_id**: The ID of the download job
+    - **size**: Icon size in pixels (default: 64)
+    
+    Returns the index: ``sheets`` (url, width, height), ``icons`` (app name
+    -> sheet, x, y, width, height, css_class) and ``css`` (stylesheet URL).
+    The response carries an ``ETag``; send it back in ``If-None-Match`` to
+    get ``304 Not Modified`` while the atlas is unchanged.
+    """
+    index = await job_atlas(job_id, size)
+    etag = f'"{index["etag"]}"'
+    if not_modified(etag, if_none_match):
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    base = f"/atlas/{job_id}/{size}/"
+    body = dict(index, css=base + "atlas.css",
+                sheets=[dict(sheet, url=base + sheet["file"]) for sheet in index["sheets"]])
+    return JSONResponse(body, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+@app.get("/atlas/{job_id}/{size}/{filename}")
+async def get_atlas_file(job_id: str, size: int, filename: str,
+                         if_none_match: Optional[str] = Header(None)):
+    """
+    A sheet or the stylesheet of a job atlas
+    
+    Sheets are named after their content and may be cached forever.
+    ``atlas.css`` gives each icon a class (listed in the index) to use
+    with ``app-icon``, and is revalidated with its ``ETag``.
+    """
+    index = await job_atlas(job_id, size)
+    path = downloader.atlas_file(job_id, size, filename)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Atlas file not found")
+    
+    if filename == "atlas.css":
+        etag, cache_control = f'"{index["etag"]}"', "no-cache"
+    else:
+        etag, cache_control = f'"{Path(filename).stem.rsplit("_", 1)[-1]}"', IMMUTABLE
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if not_modified(etag, if_none_match):
+        return Response(status_code=304, headers=headers)
+    media_type = "text/css" if filename == "atlas.css" else None
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+
 @app.get("/jobs")
 async def list_jobs():
     """List all download jobs and their status"""
@@ -254,44 +725,55 @@ async def list_jobs():
 
 @app.delete("/jobs/{job_id}")
 async def cleanup_job(job_id: str):
-    """Clean up a completed job and its files"""
+    """Forget a job; its icons stay in the icon store for later jobs"""
     status = downloader.get_job_status(job_id)
     
     if not status:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    # Remove files
-    zip_path = status.get("zip_path")
-    if zip_path and os.path.exists(zip_path):
-        try:
-            os.remove(zip_path)
-        except OSError:
-            pass
-    
-    # Remove job from memory
-    if job_id in downloader.jobs:
-        del downloader.jobs[job_id]
+    # Remove job from memory (archives are streamed, so there is no ZIP file to delete)
+    downloader.discard_job(job_id)
     
     return {"message": f"Job {job_id} cleaned up"}
 
 
-async def download_icons_background(job_id: str, apps: List[Dict], sizes: List[int]):
+async def download_icons_background(job_id: str, apps: List[Dict], sizes: List[int],
+                                    encoder: Optional[str] = None, image_format: Optional[str] = None,
+                                    presets: Optional[List[str]] = None):
     """Background task for downloading icons"""
     try:
-        result = await downloader.download_icons_async(apps, sizes, job_id)
+        result = await downloader.download_icons_async(apps, sizes, job_id, encoder, image_format,
+                                                       presets)
         logger.info(f"Download job {job_id} completed: {result['status']}")
     except Exception as e:
         logger.error(f"Download job {job_id} failed: {e}")
 
 
+@app.get("/stats")
+async def get_stats():
+    """Search cache, app catalog, request coalescing, icon processing and rate limiter statistics"""
+    return {
+        "cache": search_cache.stats() if search_cache else None,
+        "catalog": app_catalog.stats() if app_catalog else None,
+        "autocomplete": autocomplete_index.stats(),
+        "singleflight": search_flights.stats(),
+        "image_pool": downloader.image_pool.stats(),
+        **downloader.storage_stats(),
+        "rate_limits": get_rate_limiter().stats()
+    }
+
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint with upstream circuit breaker state"""
+    upstreams = get_breakers().stats()
+    degraded = any(breaker["state"] != "closed" for breaker in upstreams.values())
     return {
-        "status": "healthy",
+        "status": "degraded" if degraded else "healthy",
         "service": "App Store Icon Hunter API",
-        "version": "2.0.0"
+        "version": "2.0.0",
+        "upstreams": upstreams
     }
 
 
@@ -12,10 +12,16 @@ import time
 try:
     from ..core.app_store import AppStoreAPI
     from ..core.google_play import GooglePlayAPI
+    from ..core.cache import DEFAULT_CACHE_PATH, SearchCache
+    from ..core.catalog import DEFAULT_CATALOG_PATH, AppCatalog
     from ..core.downloader import IconDownloader
+    from ..core.imaging import DEFAULT_ENCODER, ENCODER_PROFILES, IMAGE_FORMATS, validate_encoding
+    from ..core.presets import PRESETS, check_preset_format, parse_presets
+    from ..core.search import MultiStoreSearch, STORE_LABELS
     from ..utils.helpers import (
         format_app_name, clean_filename, validate_store_name, 
-        validate_country_code, validate_icon_sizes, format_price, format_rating
+        validate_country_code, validate_icon_sizes, format_price, format_rating,
+        parse_country_list, STOREFRONT_COUNTRIES
     )
 except ImportError:
     # Fallback for direct execution
@@ -23,42 +29,75 @@ except ImportError:
     sys.path.insert(0, str(Path(__file__).parent.parent))
     from core.app_store import AppStoreAPI
     from core.google_play import GooglePlayAPI
+    from core.cache import DEFAULT_CACHE_PATH, SearchCache
+    from core.catalog import DEFAULT_CATALOG_PATH, AppCatalog
     from core.downloader import IconDownloader
+    from core.imaging import DEFAULT_ENCODER, ENCODER_PROFILES, IMAGE_FORMATS, validate_encoding
+    from core.presets import PRESETS, check_preset_format, parse_presets
+    from core.search import MultiStoreSearch, STORE_LABELS
     from utils.helpers import (
         format_app_name, clean_filename, validate_store_name, 
-        validate_country_code, validate_icon_sizes, format_price, format_rating
+        validate_country_code, validate_icon_sizes, format_price, format_rating,
+        parse_country_list, STOREFRONT_COUNTRIES
     )
 
 
 class AppIconHunterCLI:
     """Main CLI class for App Store Icon Hunter"""
     
-    def __init__(self):
-        self.app_store_api = AppStoreAPI()
-        self.google_play_api = GooglePlayAPI()
+    def __init__(self, cache: Optional[SearchCache] = None,
+                 catalog: Optional[AppCatalog] = None):
+        self.cache = cache
+        self.catalog = catalog
+        self.app_store_api = AppStoreAPI(cache=cache, catalog=catalog)
+        self.google_play_api = GooglePlayAPI(cache=cache, catalog=catalog)
+        self.searcher = MultiStoreSearch(self.app_store_api, self.google_play_api,
+                                         catalog=catalog)
         self.downloader = IconDownloader()
         self.output_dir = Path("icons")
     
-    def search_apps_combined(self, term: str, store: str = "both", 
-                           country: str = "us", limit: int = 10) -> List[Dict]:
-        """Search apps from specified stores"""
-        all_apps = []
+    def search_apps_combined(self, term: str, store: str = "both",
+                             country: str = "us", limit: int = 10,
+                             source: str = "remote") -> List[Dict]:
+        """Search apps from specified stores concurrently"""
+        stores = MultiStoreSearch.stores_for(store)
+        click.echo(f"🔍 Searching {' and '.join(STORE_LABELS[name] for name in stores)}...")
+        outcome = self.searcher.search_sync(term, store, country, limit, source=source)
         
-        # Search App Store
-        if store in ["appstore", "both"]:
-            click.echo("🔍 Searching App Store...")
-            app_store_results = self.app_store_api.search_apps(term, country, limit)
-            all_apps.extend(app_store_results)
-            click.echo(f"  Found {len(app_store_results)} apps in App Store")
+        for name, status in outcome["stores"].items():
+            label = STORE_LABELS[name]
+            if status["status"] == "ok" and status.get("source") == "local":
+                click.echo(f"  Found {status['count']} apps in {label} (local catalog)")
+            elif status["status"] == "ok":
+                click.echo(f"  Found {status['count']} apps in {label}")
+            elif status["status"] == "timeout":
+                click.echo(f"  ⚠️  {label} timed out, showing partial results")
+            elif status["status"] == "circuit_open":
+                click.echo(f"  ⚠️  {label} is failing, skipped for now ({status['error']})")
+            elif status["status"] == "unavailable":
+                click.echo(f"  ⚠️  {label} is not configured (set SERPAPI_KEY)")
+            else:
+                click.echo(f"  ❌ {label} search failed: {status.get('error', 'unknown error')}")
+        
+        return outcome["results"]
+    
+    def search_apps_sweep(self, term: str, countries: List[str], store: str = "both",
+                          limit: int = 10, concurrency: int = 8) -> List[Dict]:
+        """Search several countries concurrently and merge apps by bundle ID"""
+        click.echo(f"🌍 Searching {len(countries)} countries "
+                   f"({concurrency} at a time)...")
+        outcome = self.searcher.sweep_sync(term, countries, store, limit, concurrency)
         
-        # Search Google Play
-        if store in ["googleplay", "both"]:
-            click.echo("🔍 Searching Google Play...")
-            google_play_results = self.google_play_api.search_apps(term, country, limit)
-            all_apps.extend(google_play_results)
-            click.echo(f"  Found {len(google_play_results)} apps in Google Play")
+        failed = [
+            country for country, stores in outcome["countries"].items()
+            if not any(status["status"] == "ok" for status in stores.values())
+        ]
+        click.echo(f"  Found {len(outcome['results'])} unique apps "
+                   f"across {len(countries) - len(failed)} countries")
+        if failed:
+            click.echo(f"  ⚠️  No results from: {', '.join(failed)}")
         
-        return all_apps
+        return outcome["results"]
     
     def display_apps_table(self, apps: List[Dict]) -> None:
         """Display apps in a formatted table"""
@@ -66,9 +105,15 @@ class AppIconHunterCLI:
             click.echo("No apps found.")
             return
         
-        click.echo("\n" + "="*90)
-        click.echo(f"{'#':<3} {'App Name':<30} {'Store':<12} {'Price':<12} {'Rating':<10} {'Developer':<20}")
-        click.echo("="*90)
+        show_countries = any("countries" in app for app in apps)
+        width = 110 if show_countries else 90
+        
+        click.echo("\n" + "="*width)
+        header = f"{'#':<3} {'App Name':<30} {'Store':<12} {'Price':<12} {'Rating':<10} {'Developer':<20}"
+        if show_countries:
+            header += f" {'Countries':<19}"
+        click.echo(header)
+        click.echo("="*width)
         
         for i, app in enumerate(apps, 1):
             name = format_app_name(app.get('name', 'Unknown'))
@@ -82,9 +127,16 @@ class AppIconHunterCLI:
             if len(developer) > 17:
                 developer = developer[:17] + "..."
             
-            click.echo(f"{i:<3} {name:<30} {store:<12} {price:<12} {rating:<10} {developer:<20}")
+            row = f"{i:<3} {name:<30} {store:<12} {price:<12} {rating:<10} {developer:<20}"
+            if show_countries:
+                countries = app.get('countries', [])
+                summary = ",".join(countries[:3])
+                if len(countries) > 3:
+                    summary += f" +{len(countries) - 3}"
+                row += f" {summary:<19}"
+            click.echo(row)
         
-        click.echo("="*90)
+        click.echo("="*width)
     
     def get_user_selection(self, apps: List[Dict]) -> List[Dict]:
         """Get user selection for which apps to download"""
@@ -147,13 +199,22 @@ class AppIconHunterCLI:
         
         return default_sizes
     
-    def download_selected_apps(self, apps: List[Dict], sizes: List[int]) -> None:
+    def download_selected_apps(self, apps: List[Dict], sizes: List[int],
+                               encoder: Optional[str] = None,
+                               image_format: Optional[str] = None,
+                               presets: Optional[List[str]] = None) -> None:
         """Download icons for selected apps"""
         if not apps:
             return
         
         click.echo(f"\n📥 Starting download for {len(apps)} apps...")
-        click.echo(f"Icon sizes: {', '.join(map(str, sizes))}")
+        if presets:
+            click.echo(f"Icon sets: {', '.join(presets)}")
+        else:
+            click.echo(f"Icon sizes: {', '.join(map(str, sizes))}")
+        if encoder or image_format:
+            click.echo(f"Encoding: {(image_format or self.downloader.image_format).upper()}, "
+                       f"{encoder or self.downloader.encoder} profile")
         
         successful_downloads = 0
         failed_downloads = 0
@@ -170,7 +231,7 @@ class AppIconHunterCLI:
                 
                 try:
                     downloaded_files = self.downloader.download_icon_sync(
-                        icon_url, app_name, sizes
+                        icon_url, app_name, sizes, encoder, image_format, presets
                     )
                     
                     if downloaded_files:
@@ -191,6 +252,79 @@ class AppIconHunterCLI:
         click.echo(f"📁 Output directory: {self.output_dir.absolute()}")
 
 
+def cache_options(command):
+    """Attach the search cache options shared by the search commands"""
+    command = click.option('--no-cache', is_flag=True,
+                           help='Always query the stores, bypassing the search cache')(command)
+    command = click.option('--cache-path', default=str(DEFAULT_CACHE_PATH),
+                           envvar='ICON_HUNTER_CACHE_PATH',
+                           help='SQLite file shared between runs '
+                                '(default: ~/.cache/app-store-icon-hunter/search_cache.sqlite3)')(command)
+    command = click.option('--cache-ttl', default=300.0, type=float,
+                           envvar='ICON_HUNTER_CACHE_TTL',
+                           help='Seconds to reuse search results (default: 300)')(command)
+    return command
+
+
+def build_cache(cache_ttl: float, cache_path: Optional[str],
+                no_cache: bool = False) -> Optional[SearchCache]:
+    """Create the search cache selected on the command line"""
+    if no_cache or cache_ttl <= 0:
+        return None
+    return SearchCache(ttl=cache_ttl, path=cache_path or None)
+
+
+def catalog_options(command):
+    """Attach the local app catalog options shared by the search commands"""
+    command = click.option('--offline', is_flag=True,
+                           help='Search only the local app catalog, without contacting the stores')(command)
+    command = click.option('--catalog-path', default=None,
+                           envvar='ICON_HUNTER_CATALOG_PATH',
+                           help='SQLite file recording every app seen, for offline search '
+                                '(default with --offline: ~/.cache/app-store-icon-hunter/catalog.sqlite3)')(command)
+    return command
+
+
+def build_catalog(catalog_path: Optional[str], offline: bool = False) -> Optional[AppCatalog]:
+    """Open the app catalog selected on the command line (it is opt-in)"""
+    if not catalog_path and not offline:
+        return None
+    return AppCatalog(catalog_path or str(DEFAULT_CATALOG_PATH))
+
+
+def country_options(command):
+    """Attach the multi-country sweep options shared by the search commands"""
+    command = click.option('--concurrency', default=8, type=int,
+                           help='Countries searched at once in a sweep (default: 8)')(command)
+    command = click.option('--all-countries', is_flag=True,
+                           help='Search every App Store storefront')(command)
+    command = click.option('--countries', default=None,
+                           help='Comma-separated country codes to sweep, e.g. us,gb,jp')(command)
+    return command
+
+
+def resolve_countries(country: str, countries: Optional[str],
+                      all_countries: bool) -> Optional[List[str]]:
+    """Return the country codes to search, or None if any code is invalid"""
+    if all_countries:
+        return STOREFRONT_COUNTRIES
+    selected = parse_country_list(countries) if countries else [country.lower()]
+    if not selected or not all(validate_country_code(code) for code in selected):
+        return None
+    return selected
+
+
+def run_search(hunter: AppIconHunterCLI, term: str, store: str, countries: List[str],
+               limit: int, concurrency: int, offline: bool = False) -> List[Dict]:
+    """Search one country directly, sweep several, or search the local catalog"""
+    if offline:
+        # The catalog is not split by country, so one lookup covers them all
+        return hunter.search_apps_combined(term, store, countries[0], limit, source="local")
+    if len(countries) == 1:
+        return hunter.search_apps_combined(term, store, countries[0], limit)
+    return hunter.search_apps_sweep(term, countries, store, limit, concurrency)
+
+
 # CLI Commands
 @click.group()
 @click.version_option(version="2.0.0")
@@ -214,7 +348,20 @@ def cli():
               help='Icon sizes to download (default: 64,128,256,512)')
 @click.option('--output', '-o', default='icons',
               help='Output directory (default: icons)')
-def search(term, store, country, limit, auto_download, sizes, output):
+@click.option('--encoder', '-e', default=DEFAULT_ENCODER,
+              type=click.Choice(list(ENCODER_PROFILES)),
+              help=f'Encoder profile: faster encoding or smaller files (default: {DEFAULT_ENCODER})')
+@click.option('--image-format', '-f', default='png', type=click.Choice(list(IMAGE_FORMATS)),
+              help='Icon file format (default: png)')
+@click.option('--presets', '-p', default=None,
+              help=f'Export platform icon sets instead of --sizes, e.g. ios,android '
+                   f'({", ".join(PRESETS)})')
+@country_options
+@cache_options
+@catalog_options
+def search(term, store, country, limit, auto_download, sizes, output, encoder, image_format,
+           presets, countries, all_countries, concurrency, cache_ttl, cache_path, no_cache,
+           catalog_path, offline):
     """Search for apps and optionally download their icons"""
     
     # Validate inputs
@@ -222,7 +369,8 @@ def search(term, store, country, limit, auto_download, sizes, output):
         click.echo("❌ Invalid store name", err=True)
         return
     
-    if not validate_country_code(country):
+    country_list = resolve_countries(country, countries, all_countries)
+    if not country_list:
         click.echo("❌ Invalid country code", err=True)
         return
     
@@ -237,13 +385,24 @@ def search(term, store, country, limit, auto_download, sizes, output):
         click.echo("❌ Invalid sizes format", err=True)
         return
     
+    try:
+        validate_encoding(encoder, image_format)
+        preset_list = parse_presets(presets) if presets else None
+        if preset_list:
+            check_preset_format(image_format)
+    except ValueError as e:
+        click.echo(f"❌ {e}", err=True)
+        return
+    
     # Initialize CLI
-    hunter = AppIconHunterCLI()
+    hunter = AppIconHunterCLI(build_cache(cache_ttl, cache_path, no_cache),
+                              build_catalog(catalog_path, offline))
     hunter.output_dir = Path(output)
+    hunter.downloader.output_dir = hunter.output_dir
     
     # Search for apps
     click.echo(f"🔍 Searching for '{term}' in {store}...")
-    apps = hunter.search_apps_combined(term, store, country, limit)
+    apps = run_search(hunter, term, store, country_list, limit, concurrency, offline)
     
     if not apps:
         click.echo("❌ No apps found.")
@@ -255,12 +414,13 @@ def search(term, store, country, limit, auto_download, sizes, output):
     if auto_download:
         # Auto download all
         click.echo(f"\n🚀 Auto-downloading all {len(apps)} apps...")
-        hunter.download_selected_apps(apps, size_list)
+        hunter.download_selected_apps(apps, size_list, encoder, image_format, preset_list)
     else:
         # Interactive selection
         selected_apps = hunter.get_user_selection(apps)
         if selected_apps:
-            hunter.download_selected_apps(selected_apps, size_list)
+            hunter.download_selected_apps(selected_apps, size_list, encoder, image_format,
+                                          preset_list)
 
 
 @cli.command()
@@ -272,11 +432,21 @@ def search(term, store, country, limit, auto_download, sizes, output):
               help='Country code')
 @click.option('--limit', '-l', default=10, type=int,
               help='Maximum results')
-def list(term, store, country, limit):
+@country_options
+@cache_options
+@catalog_options
+def list(term, store, country, limit, countries, all_countries, concurrency,
+         cache_ttl, cache_path, no_cache, catalog_path, offline):
     """Search and list apps without downloading"""
     
-    hunter = AppIconHunterCLI()
-    apps = hunter.search_apps_combined(term, store, country, limit)
+    country_list = resolve_countries(country, countries, all_countries)
+    if not country_list:
+        click.echo("❌ Invalid country code", err=True)
+        return
+    
+    hunter = AppIconHunterCLI(build_cache(cache_ttl, cache_path, no_cache),
+                              build_catalog(catalog_path, offline))
+    apps = run_search(hunter, term, store, country_list, limit, concurrency, offline)
     
     if apps:
         hunter.display_apps_table(apps)
@@ -286,10 +456,11 @@ def list(term, store, country, limit):
 
 
 @cli.command()
-def interactive():
+@cache_options
+def interactive(cache_ttl, cache_path, no_cache):
     """Run in interactive mode with prompts"""
     
-    hunter = AppIconHunterCLI()
+    hunter = AppIconHunterCLI(build_cache(cache_ttl, cache_path, no_cache))
     
     click.echo("🎮 Welcome to App Store Icon Hunter Interactive Mode")
     click.echo("=" * 60)
@@ -3,5 +3,9 @@
 from .app_store import AppStoreAPI
 from .google_play import GooglePlayAPI
 from .downloader import IconDownloader
+from .cache import SearchCache
+from .models import AppRecord
+from .search import MultiStoreSearch
 
-__all__ = ["AppStoreAPI", "GooglePlayAPI", "IconDownloader"]
+__all__ = ["AppStoreAPI", "GooglePlayAPI", "IconDownloader", "SearchCache", "MultiStoreSearch",
+           "AppRecord"]
@@ -2,98 +2,259 @@
 App Store API integration using iTunes Search API
 """
 
-import requests
-from typing import Dict, List, Optional
+import asyncio
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
 import logging
 
+from .cache import SearchCache
+from .autocomplete import PrefixIndex
+from .catalog import AppCatalog
+from .http import REQUEST_ERRORS, SharedSession, get_shared_session, run_sync
+from .models import AppRecord
+from .resilience import (
+    CircuitBreaker, RetryPolicy, breaker_guard, call_with_resilience, get_breakers
+)
+from .singleflight import SingleFlight
+from ..utils.helpers import extract_bundle_id_from_url
+
 logger = logging.getLogger(__name__)
 
 
 class AppStoreAPI:
     """Interface for iTunes Search API"""
-    
+
     BASE_URL = "https://itunes.apple.com/search"
-    
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'App-Store-Icon-Hunter/2.0'
-        })
-    
-    def search_apps(self, term: str, country: str = "us", limit: int = 10) -> List[Dict]:
+    LOOKUP_URL = "https://itunes.apple.com/lookup"
+    LOOKUP_BATCH_SIZE = 200  # Largest id list iTunes lookup reliably accepts
+    LOOKUP_CONCURRENCY = 8
+    MAX_LIMIT = 200  # Largest page the search endpoint returns
+    SUPPORTS_OFFSET = True
+    # iTunes result keys read by _standardize and the bulk lookup; everything
+    # else (screenshots, release notes, device lists) is dropped while parsing
+    RESULT_FIELDS = (
+        "trackId", "trackName", "bundleId", "artworkUrl512", "artworkUrl100",
+        "artworkUrl60", "formattedPrice", "averageUserRating", "description",
+        "artistName", "primaryGenreName", "trackViewUrl",
+    )
+
+    def __init__(self, session: Optional[SharedSession] = None,
+                 cache: Optional[SearchCache] = None,
+                 catalog: Optional[AppCatalog] = None,
+                 prefix_index: Optional[PrefixIndex] = None,
+                 singleflight: Optional[SingleFlight] = None,
+                 retry: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None,
+                 description_limit: Optional[int] = None,
+                 streaming_parse: bool = True):
+        self.session = session or get_shared_session()
+        self.cache = cache
+        self.catalog = catalog
+        self.prefix_index = prefix_index
+        self.singleflight = singleflight or SingleFlight()
+        self.retry = retry or RetryPolicy()
+        self.description_limit = description_limit
+        self.streaming_parse = streaming_parse
+        self.breaker = breaker or get_breakers().get("appstore")
+
+    @property
+    def available(self) -> bool:
+        """Whether the client can query its store (iTunes needs no credentials)"""
+        return True
+
+    def search_apps(self, term: str, country: str = "us", limit: int = 10) -> List[AppRecord]:
         """
         Search for apps in the App Store using iTunes Search API
-        
+
+        Blocking wrapper around :meth:`asearch_apps`.
+
         Args:
             term: Search term
             country: Country code (default: "us")
             limit: Maximum number of results (default: 10)
-            
+
         Returns:
-            List of app dictionaries with standardized format
+            List of standardized app records
         """
-        params = {
+        return run_sync(self.asearch_apps(term, country, limit))
+
+    async def asearch_apps(self, term: str, country: str = "us", limit: int = 10,
+                           raise_errors: bool = False) -> List[AppRecord]:
+        """
+        Search for apps in the App Store without blocking the event loop
+
+        Args:
+            term: Search term
+            country: Country code (default: "us")
+            limit: Maximum number of results (default: 10)
+            raise_errors: Re-raise request failures instead of returning []
+
+        Returns:
+            List of standardized app records
+        """
+        key = SearchCache.make_key("appstore", term, country, limit)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        try:
+            apps = await self.singleflight.do(
+                key, lambda: self._fetch_search(key, term, country, limit)
+            )
+        except REQUEST_ERRORS as e:
+            if raise_errors:
+                raise
+            logger.error(f"Error searching App Store: {e}")
+            return []
+
+        # Coalesced callers share one list, so hand each of them a copy
+        return [app.copy() for app in apps]
+
+    async def aiter_search_apps(self, term: str, country: str = "us", limit: int = 10,
+                                offset: int = 0) -> AsyncIterator[AppRecord]:
+        """
+        Yield App Store search results as they are parsed from the response
+
+        Unlike :meth:`asearch_apps`, failures are raised and requests are not
+        retried once results have started flowing. The first page is served
+        from and stored in the search cache.
+
+        Args:
+            term: Search term
+            country: Country code (default: "us")
+            limit: Maximum number of results (up to ``MAX_LIMIT``)
+            offset: Number of results to skip, for paging
+
+        Yields:
+            Standardized app records
+        """
+        key = SearchCache.make_key("appstore", term, country, limit)
+        use_cache = self.cache is not None and offset == 0
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                for app in cached:
+                    yield app
+                return
+
+        params = self._search_params(term, country, limit)
+        if offset:
+            params["offset"] = offset
+
+        apps = []
+        async with breaker_guard(self.breaker):
+            async for result in self.session.iter_json_array(
+                self.BASE_URL, "results", params=params, fields=self.RESULT_FIELDS
+            ):
+                app = self._standardize(result)
+                if use_cache or self.catalog is not None or self.prefix_index is not None:
+                    apps.append(app.copy())
+                yield app
+        self._remember(key if offset == 0 else None, apps)
+
+    @staticmethod
+    def _search_params(term: str, country: str, limit: int) -> Dict:
+        return {
             "term": term,
             "media": "software",
-            "entity": "software", 
+            "entity": "software",
             "country": country,
             "limit": limit
         }
-        
-        try:
-            response = self.session.get(self.BASE_URL, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Standardize the format
-            apps = []
-            for result in data.get("results", []):
-                app = {
-                    "name": result.get("trackName", ""),
-                    "bundle_id": result.get("bundleId", ""),
-                    "icon_url": self._get_best_icon_url(result),
-                    "store": "appstore",
-                    "price": result.get("formattedPrice", "Free"),
-                    "rating": result.get("averageUserRating"),
-                    "description": result.get("description", ""),
-                    "developer": result.get("artistName", ""),
-                    "category": result.get("primaryGenreName", ""),
-                    "url": result.get("trackViewUrl", "")
-                }
-                apps.append(app)
-            
-            return apps
-            
-        except requests.RequestException as e:
-            logger.error(f"Error searching App Store: {e}")
-            return []
-    
+
+    async def _fetch_search(self, key: str, term: str, country: str, limit: int) -> List[AppRecord]:
+        """Query the upstream search endpoint and cache the standardized results"""
+        params = self._search_params(term, country, limit)
+        results = await self._get_results(self.BASE_URL, params=params)
+        apps = [self._standardize(result) for result in results]
+        self._remember(key, apps)
+        return apps
+
+    def _remember(self, key: Optional[str], apps: List[AppRecord]) -> None:
+        """Store fresh upstream results in the search cache, app catalog and prefix index"""
+        if self.cache is not None and key is not None:
+            self.cache.set(key, apps)
+        if self.catalog is not None:
+            self.catalog.add(apps)
+        if self.prefix_index is not None:
+            self.prefix_index.add(apps)
+
+    async def _get_json(self, url: str, params: Dict) -> Dict:
+        """GET JSON from iTunes with retries, guarded by the App Store circuit breaker"""
+        return await call_with_resilience(
+            lambda: self.session.get_json(url, params=params), self.retry, self.breaker
+        )
+
+    async def _get_results(self, url: str, params: Dict) -> List[Dict]:
+        """GET the ``results`` array from iTunes, streamed and projected when enabled"""
+        if self.streaming_parse:
+            return await call_with_resilience(
+                lambda: self.session.get_json_array(
+                    url, "results", params=params, fields=self.RESULT_FIELDS
+                ),
+                self.retry, self.breaker,
+            )
+        data = await self._get_json(url, params=params)
+        return data.get("results", [])
+
+    def _standardize(self, result: Dict) -> AppRecord:
+        """Convert an iTunes result into the standardized app format"""
+        record = AppRecord(
+            name=result.get("trackName", ""),
+            bundle_id=result.get("bundleId", ""),
+            icon_url=self._get_best_icon_url(result),
+            store="appstore",
+            price=result.get("formattedPrice", "Free"),
+            rating=result.get("averageUserRating"),
+            description=result.get("description", ""),
+            developer=result.get("artistName", ""),
+            category=result.get("primaryGenreName", ""),
+            url=result.get("trackViewUrl", "")
+        )
+        record.truncate_description(self.description_limit)
+        return record
+
     def _get_best_icon_url(self, result: Dict) -> str:
         """Extract the best quality icon URL from iTunes result"""
         # iTunes provides artworkUrl60, artworkUrl100, artworkUrl512
         icon_url = (
-            result.get("artworkUrl512") or 
-            result.get("artworkUrl100") or 
-            result.get("artworkUrl60") or 
+            result.get("artworkUrl512") or
+            result.get("artworkUrl100") or
+            result.get("artworkUrl60") or
             ""
         )
-        
+
         # Try to get higher resolution by modifying URL
         if icon_url and "100x100" in icon_url:
             icon_url = icon_url.replace("100x100", "512x512")
         elif icon_url and "60x60" in icon_url:
             icon_url = icon_url.replace("60x60", "512x512")
-            
+
         return icon_url
-    
+
     def get_app_details(self, bundle_id: str, country: str = "us") -> Optional[Dict]:
         """
         Get detailed information about a specific app by bundle ID
-        
+
+        Blocking wrapper around :meth:`aget_app_details`.
+
         Args:
             bundle_id: App bundle identifier
             country: Country code
-            
+
+        Returns:
+            App details dictionary or None if not found
+        """
+        return run_sync(self.aget_app_details(bundle_id, country))
+
+    async def aget_app_details(self, bundle_id: str, country: str = "us") -> Optional[Dict]:
+        """
+        Get detailed information about a specific app without blocking the event loop
+
+        Args:
+            bundle_id: App bundle identifier
+            country: Country code
+
         Returns:
             App details dictionary or None if not found
         """
@@ -104,17 +265,119 @@ class AppStoreAPI:
             "country": country,
             "limit": 1
         }
-        
+
         try:
-            response = self.session.get(self.BASE_URL, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            results = data.get("results", [])
-            if results:
-                return results[0]
-            return None
-            
-        except requests.RequestException as e:
+            data = await self._get_json(self.BASE_URL, params=params)
+        except REQUEST_ERRORS as e:
             logger.error(f"Error getting app details: {e}")
             return None
+
+        results = data.get("results", [])
+        if results:
+            self._remember(None, [self._standardize(results[0])])
+            return results[0]
+        return None
+
+    def get_app_details_bulk(self, identifiers: Iterable[str], country: str = "us") -> List[AppRecord]:
+        """
+        Resolve many apps with batched iTunes lookups
+
+        Blocking wrapper around :meth:`aget_app_details_bulk`.
+
+        Args:
+            identifiers: Track IDs, bundle IDs or App Store URLs
+            country: Country code
+
+        Returns:
+            List of standardized app records
+        """
+        return run_sync(self.aget_app_details_bulk(identifiers, country))
+
+    async def aget_app_details_bulk(self, identifiers: Iterable[str],
+                                    country: str = "us") -> List[AppRecord]:
+        """
+        Resolve many apps with batched iTunes lookups
+
+        Identifiers are split into track IDs (numeric IDs and App Store URLs)
+        and bundle IDs, chunked into ``LOOKUP_BATCH_SIZE`` comma-separated
+        lookups and fetched concurrently. Failed chunks are logged and skipped.
+
+        Args:
+            identifiers: Track IDs, bundle IDs or App Store URLs
+            country: Country code
+
+        Returns:
+            List of standardized app records, in the order
+            the identifiers were given, without duplicates or unknown apps
+        """
+        keys, track_ids, bundle_ids = self._split_identifiers(identifiers)
+
+        batches = []
+        for field, values in (("id", track_ids), ("bundleId", bundle_ids)):
+            for start in range(0, len(values), self.LOOKUP_BATCH_SIZE):
+                batches.append((field, values[start:start + self.LOOKUP_BATCH_SIZE]))
+
+        semaphore = asyncio.Semaphore(self.LOOKUP_CONCURRENCY)
+
+        async def lookup(field: str, values: List[str]) -> List[Dict]:
+            params = {field: ",".join(values), "entity": "software", "country": country}
+            async with semaphore:
+                try:
+                    return await self._get_results(self.LOOKUP_URL, params=params)
+                except REQUEST_ERRORS as e:
+                    logger.error(f"Error looking up {len(values)} apps: {e}")
+                    return []
+
+        by_key = {}
+        for results in await asyncio.gather(*[lookup(f, v) for f, v in batches]):
+            for result in results:
+                if not result.get("bundleId"):
+                    continue
+                if result.get("trackId") is not None:
+                    by_key[("id", str(result["trackId"]))] = result
+                by_key[("bundleId", result["bundleId"].lower())] = result
+
+        apps = []
+        seen = set()
+        for key in keys:
+            result = by_key.get(key)
+            if result is None or result["bundleId"] in seen:
+                continue
+            seen.add(result["bundleId"])
+            apps.append(self._standardize(result))
+        self._remember(None, apps)
+        return apps
+
+    @staticmethod
+    def _split_identifiers(identifiers: Iterable[str]) -> Tuple[List[Tuple[str, str]], List[str], List[str]]:
+        """Classify identifiers into lookup keys, unique track IDs and unique bundle IDs"""
+        keys = []
+        track_ids = []
+        bundle_ids = []
+        seen = set()
+        for identifier in identifiers:
+            identifier = str(identifier).strip()
+            if not identifier:
+                continue
+            if "://" in identifier:
+                track_id = extract_bundle_id_from_url(identifier)
+                if not track_id:
+                    logger.warning(f"Could not find an app ID in {identifier}")
+                    continue
+                key = ("id", track_id)
+            elif identifier.isdigit():
+                key = ("id", identifier)
+            elif identifier[:2] == "id" and identifier[2:].isdigit():
+                key = ("id", identifier[2:])
+            else:
+                key = ("bundleId", identifier.lower())
+            keys.append(key)
+            if key in seen:
+                continue
+            seen.add(key)
+            if key[0] == "id":
+                track_ids.append(key[1])
+            else:
+                # Match case-insensitively but query with the original casing
+                bundle_ids.append(identifier)
+        return keys, track_ids, bundle_ids
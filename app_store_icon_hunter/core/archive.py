@@ -0,0 +1,84 @@
+"""
+ZIP archives streamed straight from icon files on disk
+"""
+
+import io
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator, Tuple, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Already compressed formats: deflating them again costs CPU and saves nothing
+STORED_SUFFIXES = frozenset({".png", ".jpg", ".jpeg", ".webp", ".avif", ".gif", ".ico", ".icns", ".zip"})
+CHUNK_SIZE = 64 * 1024
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable file that collects what ZipFile writes until drained"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries: Iterable[Tuple[str, Union[str, Path]]],
+             chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Build a ZIP archive lazily, yielding it in chunks as it is written
+
+    Nothing is written to disk and at most about ``chunk_size`` bytes of
+    one member are held in memory. Members whose format is already
+    compressed (PNG, JPEG, WebP, ...) are stored as-is; anything else is
+    deflated. Because the output cannot be seeked back into, sizes and
+    CRCs follow each member in a data descriptor and are repeated in the
+    central directory, as for any streamed ZIP. The iterator does blocking
+    file reads, so run it on a thread (Starlette's ``StreamingResponse``
+    does this for plain iterators).
+
+    Args:
+        entries: ``(archive name, file path)`` pairs; missing files are skipped
+        chunk_size: Bytes read from a member file at a time
+
+    Yields:
+        Consecutive pieces of the archive
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w") as archive:
+        for arcname, path in entries:
+            try:
+                info = zipfile.ZipInfo.from_file(path, arcname)
+                source = open(path, "rb")
+            except FileNotFoundError:
+                logger.warning(f"Skipping {arcname}: {path} no longer exists")
+                continue
+            info.compress_type = (
+                zipfile.ZIP_STORED if Path(arcname).suffix.lower() in STORED_SUFFIXES
+                else zipfile.ZIP_DEFLATED
+            )
+            with source, archive.open(info, "w") as member:
+                for block in iter(lambda: source.read(chunk_size), b""):
+                    member.write(block)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    # Central directory
+    data = sink.drain()
+    if data:
+        yield data
@@ -0,0 +1,152 @@
+"""
+Sprite sheets packing many icons of one size, with a JSON and CSS index
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+from concurrent.futures import Executor
+from functools import partial
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import logging
+
+from PIL import Image
+
+from .imaging import DEFAULT_ENCODER, encode_icon
+
+logger = logging.getLogger(__name__)
+
+MAX_SHEET_SIZE = 4096  # Edge length in pixels; browsers and GPUs handle 4096 everywhere
+# Sheet encoder for each job encoder: 'smallest' (optimized PNG) spends over
+# a minute on a 4096px sheet of distinct icons for 6% fewer bytes than 'balanced'
+SHEET_ENCODERS = {"fast": "fast", "balanced": "balanced", "smallest": "balanced"}
+_CSS_UNSAFE = re.compile(r"[^a-z0-9_-]+")
+
+
+def _css_class(name: str, taken: set) -> str:
+    """Unique CSS class for an app name"""
+    base = "icon-" + (_CSS_UNSAFE.sub("-", name.lower()).strip("-") or "app")
+    css_class, suffix = base, 2
+    while css_class in taken:
+        css_class, suffix = f"{base}-{suffix}", suffix + 1
+    taken.add(css_class)
+    return css_class
+
+
+def _build_sheet(batch: List[Tuple[str, str]], size: int, per_row: int, output_dir: str,
+                 encoder: str, fmt: str) -> Tuple[Dict, List[Tuple[str, int, int]]]:
+    """
+    Decode, paste and encode one sheet
+
+    Returns:
+        The sheet's file, width and height, and ``(name, x, y)`` of every
+        icon placed on it
+    """
+    columns = min(len(batch), per_row)
+    rows = -(-len(batch) // per_row)
+    sheet = Image.new("RGBA", (columns * size, rows * size), (0, 0, 0, 0))
+    placed = []
+    decoded = {}  # (device, inode) -> tile; jobs link identical icons to one stored file
+    for offset, (name, path) in enumerate(batch):
+        x, y = (offset % per_row) * size, (offset // per_row) * size
+        try:
+            stat = os.stat(path)
+            key = (stat.st_dev, stat.st_ino)
+            if key not in decoded:
+                with Image.open(path) as image:
+                    if image.size != (size, size):
+                        image = image.resize((size, size), Image.Resampling.LANCZOS)
+                    decoded[key] = image.convert("RGBA")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping {name} in {size}px atlas: {e}")
+            continue
+        sheet.paste(decoded[key], (x, y))
+        placed.append((name, x, y))
+
+    buffer = io.BytesIO()
+    encode_icon(sheet, buffer, encoder, fmt)
+    data = buffer.getvalue()
+    filename = f"atlas_{size}_{hashlib.sha256(data).hexdigest()[:16]}.{fmt}"
+    (Path(output_dir) / filename).write_bytes(data)
+    return {"file": filename, "width": sheet.width, "height": sheet.height}, placed
+
+
+def pack_atlas(icons: Iterable[Tuple[str, Union[str, Path]]], size: int,
+               output_dir: Union[str, Path], max_sheet_size: int = MAX_SHEET_SIZE,
+               encoder: str = DEFAULT_ENCODER, fmt: str = "png",
+               executor: Optional[Executor] = None) -> Dict:
+    """
+    Pack square icons into as few sheets as fit, and index where each one is
+
+    All icons have the same size, so a fixed grid is already a perfect
+    packing: an icon's cell follows from its position in ``icons``, and no
+    bin packing is needed. Sheets are independent, so they can be built in
+    parallel on ``executor``, and are at most ``max_sheet_size`` pixels on a
+    side (the last one is cropped to the rows it uses). Each sheet is named
+    after the hash of its content, so its URL can be cached forever.
+    Images that are not ``size`` pixels are resized to fit; unreadable files
+    leave their cell empty and are left out of the index.
+
+    ``index.json`` and ``atlas.css`` are written next to the sheets. The CSS
+    gives every icon a class (``icon-<app name>``) to use together with
+    ``app-icon``.
+
+    Args:
+        icons: ``(name, image path)`` pairs, in the order to pack them
+        size: Icon edge length in pixels
+        output_dir: Directory the sheets and index are written to
+        max_sheet_size: Largest sheet edge in pixels
+        encoder: Encoder profile for the sheets
+        fmt: Sheet format, 'png', 'webp' or 'avif'
+        executor: Pool to build sheets on (sequential when None)
+
+    Returns:
+        The index: ``size``, ``etag``, ``sheets`` (file, width, height) and
+        ``icons`` (name -> sheet, x, y, width, height, css_class)
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    per_row = max(1, max_sheet_size // size)
+    per_sheet = per_row * per_row
+    entries = [(name, str(path)) for name, path in icons]
+    batches = [entries[start:start + per_sheet] for start in range(0, len(entries), per_sheet)]
+    build = partial(_build_sheet, size=size, per_row=per_row, output_dir=str(output_dir),
+                    encoder=encoder, fmt=fmt)
+    results = list(executor.map(build, batches) if executor is not None else map(build, batches))
+
+    sheets, placements = [], {}
+    taken_classes = set()
+    for number, (sheet, placed) in enumerate(results):
+        sheets.append(sheet)
+        for name, x, y in placed:
+            placements[name] = {"sheet": number, "x": x, "y": y, "width": size, "height": size,
+                                "css_class": _css_class(name, taken_classes)}
+
+    # Sheet names are content hashes, so they and the placements identify the atlas
+    etag = hashlib.sha256(json.dumps([sheets, placements], sort_keys=True).encode()).hexdigest()[:32]
+    index = {"size": size, "etag": etag, "sheets": sheets, "icons": placements}
+    (output_dir / "index.json").write_text(json.dumps(index))
+    (output_dir / "atlas.css").write_text(atlas_css(index))
+    return index
+
+
+def atlas_css(index: Dict, url_prefix: str = "") -> str:
+    """
+    Stylesheet placing every icon of an atlas index
+
+    Args:
+        index: Index returned by :func:`pack_atlas`
+        url_prefix: Prepended to sheet file names in ``url()``
+    """
+    size = index["size"]
+    lines = [f".app-icon{{display:inline-block;width:{size}px;height:{size}px;"
+             f"background-repeat:no-repeat}}"]
+    sheets: List[Dict] = index["sheets"]
+    for name, place in index["icons"].items():
+        sheet = sheets[place["sheet"]]
+        lines.append(f".{place['css_class']}{{background-image:url({url_prefix}{sheet['file']});"
+                     f"background-position:{-place['x']}px {-place['y']}px}}")
+    return "\n".join(lines) + "\n"
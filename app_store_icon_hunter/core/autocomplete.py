@@ -0,0 +1,213 @@
+"""
+In-memory prefix index for app name and developer autocomplete
+"""
+
+import math
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+import logging
+
+from .models import AppRecord
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip accents and punctuation, and collapse whitespace"""
+    text = text or ""
+    if not text.isascii():
+        decomposed = unicodedata.normalize("NFKD", text)
+        text = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+class _Entry:
+    """One indexed app and its ranking score"""
+
+    __slots__ = ("record", "hits", "score", "keys")
+
+    def __init__(self, record: AppRecord):
+        self.record = record
+        self.hits = 0
+        self.score = 0.0
+        self.keys = set()
+
+
+class _Node:
+    """Radix trie node; ``top`` holds the best entries of the whole subtree"""
+
+    __slots__ = ("label", "children", "top")
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.children = None  # first character -> _Node, allocated on demand
+        self.top = []
+
+
+class PrefixIndex:
+    """
+    Compact prefix index answering autocomplete queries without I/O
+
+    Keys are every word-start suffix of an app's normalized name and
+    developer ("photo editor pro" is found by "pho", "edi" and "pro"). They
+    are stored in a radix trie whose edges hold whole label strings, so the
+    node count grows with the number of distinct keys rather than characters.
+    Each node keeps its subtree's ``top_k`` entries sorted by score, making a
+    lookup a walk of at most a few nodes followed by a list slice.
+
+    Apps are ranked by ``rating + POPULARITY_WEIGHT * log1p(hits)``, where
+    hits counts how often the app appeared in fresh search results. Calling
+    :meth:`add` with new results updates the index in place.
+
+    Args:
+        top_k: Suggestions kept per node (the largest usable ``limit``)
+    """
+
+    POPULARITY_WEIGHT = 1.0
+    MAX_KEY_LENGTH = 40   # Longer keys are truncated; queries are too
+    MAX_WORDS = 6         # Word-start suffixes indexed per name/developer
+
+    def __init__(self, top_k: int = 20):
+        self.top_k = top_k
+        self._root = _Node()
+        self._entries = {}  # (store, bundle_id) -> _Entry
+        self._nodes = 1
+        self._lock = threading.Lock()
+
+    def add(self, apps: Iterable[AppRecord]) -> int:
+        """
+        Index new or refreshed app records
+
+        Args:
+            apps: Standardized records; records without a bundle ID are skipped
+
+        Returns:
+            Number of records indexed
+        """
+        count = 0
+        with self._lock:
+            for app in apps:
+                if not app.get("bundle_id") or not app.get("store"):
+                    continue
+                self._add(app)
+                count += 1
+        return count
+
+    def complete(self, prefix: str, limit: int = 10,
+                 store: Optional[str] = None) -> List[AppRecord]:
+        """
+        Return the best apps whose name or developer has a word starting with ``prefix``
+
+        Args:
+            prefix: What the user has typed so far
+            limit: Maximum suggestions (at most ``top_k``)
+            store: Only suggest apps from this store
+
+        Returns:
+            Matching records, best first
+        """
+        query = normalize_text(prefix)[:self.MAX_KEY_LENGTH]
+        if not query:
+            return []
+        with self._lock:
+            node = self._find(query)
+            if node is None:
+                return []
+            entries = [entry for entry in node.top
+                       if store is None or entry.record.store == store]
+            return [entry.record.copy() for entry in entries[:limit]]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"apps": len(self._entries), "nodes": self._nodes, "top_k": self.top_k}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _add(self, app: AppRecord) -> None:
+        key = (app["store"], app["bundle_id"])
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry(app.copy())
+        else:
+            entry.record = app.copy()
+        entry.hits += 1
+        entry.score = (entry.record.rating or 0.0) + \
+            self.POPULARITY_WEIGHT * math.log1p(entry.hits)
+
+        # Names can change between sightings; old keys keep pointing at the entry
+        entry.keys.update(self._keys(entry.record))
+        for text in entry.keys:
+            self._insert(text, entry)
+
+    def _keys(self, app: AppRecord) -> List[str]:
+        keys = []
+        for text in (app.name, app.developer):
+            words = normalize_text(text).split(" ")
+            for start in range(min(len(words), self.MAX_WORDS)):
+                key = " ".join(words[start:])[:self.MAX_KEY_LENGTH]
+                if key:
+                    keys.append(key)
+        return keys
+
+    def _insert(self, key: str, entry: _Entry) -> None:
+        node = self._root
+        i = 0
+        while i < len(key):
+            if node.children is None:
+                node.children = {}
+            child = node.children.get(key[i])
+            if child is None:
+                leaf = _Node(key[i:])
+                leaf.top = [entry]
+                node.children[key[i]] = leaf
+                self._nodes += 1
+                return
+            label = child.label
+            common = 1
+            limit = min(len(label), len(key) - i)
+            while common < limit and label[common] == key[i + common]:
+                common += 1
+            if common < len(label):
+                # Split the edge: the new middle node covers the same subtree
+                middle = _Node(label[:common])
+                middle.top = list(child.top)
+                middle.children = {label[common]: child}
+                child.label = label[common:]
+                node.children[key[i]] = middle
+                self._nodes += 1
+                child = middle
+            self._rank(child, entry)
+            node = child
+            i += common
+
+    def _rank(self, node: _Node, entry: _Entry) -> None:
+        """Place ``entry`` in a node's top list if it belongs there"""
+        top = node.top
+        if entry not in top:
+            if len(top) >= self.top_k and entry.score <= top[-1].score:
+                return
+            top.append(entry)
+        top.sort(key=lambda e: e.score, reverse=True)
+        del top[self.top_k:]
+
+    def _find(self, query: str) -> Optional[_Node]:
+        node = self._root
+        i = 0
+        while i < len(query):
+            child = node.children.get(query[i]) if node.children else None
+            if child is None:
+                return None
+            rest = query[i:]
+            if rest.startswith(child.label):
+                i += len(child.label)
+                node = child
+            elif child.label.startswith(rest):
+                return child
+            else:
+                return None
+        return node
@@ -0,0 +1,175 @@
+"""
+Content-addressed storage for downloaded icons and their resized variants
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BlobStore:
+    """
+    Icons stored once by the SHA-256 of their original bytes
+
+    Originals live at ``objects/<2 hex>/<sha256>`` and resized variants at
+    ``variants/<2 hex>/<sha256>/<quality>/icon_<size>x<size>.<format>``, so a
+    variant is keyed by (hash, size, format) within a resize profile. Job
+    directories get hardlinks to these files (copies where the filesystem
+    does not support hardlinks), so an icon fetched again by another job or
+    country costs no decode, no resize and no extra disk.
+
+    Files are written under a temporary name and only then linked into
+    place, so concurrent jobs never see a partial blob. Stored files are shared by
+    every job that links them and must not be modified in place.
+
+    Args:
+        root: Directory holding the store
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.links = 0
+        self.copies = 0
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def path(self, digest: str) -> Path:
+        """Location of an original blob"""
+        return self.root / "objects" / digest[:2] / digest
+
+    def variant_path(self, digest: str, size: int, quality: str, fmt: str = "png") -> Path:
+        """Location of one resized variant of a blob"""
+        return self._variant_dir(digest, quality) / f"icon_{size}x{size}.{fmt}"
+
+    def put(self, data: bytes) -> str:
+        """
+        Store original bytes unless they are already stored
+
+        Returns:
+            SHA-256 hex digest the blob is stored under
+        """
+        digest = self.digest(data)
+        path = self.path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handle, temporary = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            try:
+                with os.fdopen(handle, "wb") as f:
+                    f.write(data)
+                self._publish(temporary, path)
+            finally:
+                if os.path.exists(temporary):
+                    os.unlink(temporary)
+        return digest
+
+    def missing_variants(self, digest: str, sizes: Iterable[int], quality: str,
+                         fmt: str = "png") -> List[int]:
+        """Sizes that have not been rendered for this blob yet"""
+        return [size for size in sizes if not self.variant_path(digest, size, quality, fmt).exists()]
+
+    @contextmanager
+    def staging(self, digest: str, quality: str) -> Iterator[str]:
+        """
+        Directory to render new variants into
+
+        Files written there are moved into the store when the block exits
+        without an error, and discarded otherwise.
+        """
+        target = self._variant_dir(digest, quality)
+        target.mkdir(parents=True, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=target, prefix=".tmp-")
+        try:
+            yield staging
+            for name in os.listdir(staging):
+                self._publish(os.path.join(staging, name), target / name)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def link(self, source: Path, destination: Path) -> str:
+        """
+        Make ``destination`` refer to a stored file
+
+        Returns:
+            The destination path
+        """
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        if destination.exists() or destination.is_symlink():
+            if destination.exists() and os.path.samefile(source, destination):
+                return str(destination)
+            destination.unlink()
+        try:
+            os.link(source, destination)
+            linked = True
+        except OSError as e:
+            # Cross-device output directories or filesystems without hardlinks
+            logger.debug(f"Hardlink {destination} failed, copying: {e}")
+            shutil.copyfile(source, destination)
+            linked = False
+        with self._lock:
+            if linked:
+                self.links += 1
+            else:
+                self.copies += 1
+        return str(destination)
+
+    def link_variants(self, digest: str, sizes: Iterable[int], quality: str,
+                      destination: Path, fmt: str = "png") -> List[str]:
+        """Link stored variants into ``destination``, in the order of ``sizes``"""
+        return [
+            self.link(self.variant_path(digest, size, quality, fmt),
+                      Path(destination) / f"icon_{size}x{size}.{fmt}")
+            for size in sizes
+        ]
+
+    def stats(self) -> Dict:
+        """Return blob counts and disk usage"""
+        counts = {"objects": [0, 0], "variants": [0, 0]}
+        for kind, totals in counts.items():
+            for directory, _, files in os.walk(self.root / kind):
+                if os.path.basename(directory).startswith(".tmp-"):
+                    continue
+                for name in files:
+                    if name.startswith(".tmp-"):
+                        continue
+                    totals[0] += 1
+                    totals[1] += os.path.getsize(os.path.join(directory, name))
+        with self._lock:
+            links, copies = self.links, self.copies
+        return {
+            "path": str(self.root),
+            "objects": counts["objects"][0],
+            "object_bytes": counts["objects"][1],
+            "variants": counts["variants"][0],
+            "variant_bytes": counts["variants"][1],
+            "links": links,
+            "copies": copies,
+        }
+
+    @staticmethod
+    def _publish(temporary: str, path: Path) -> None:
+        """Give a finished temporary file its final name, keeping any existing copy"""
+        try:
+            # Unlike a rename, a link never replaces a blob another job has
+            # already linked, so every job ends up sharing the same inode
+            os.link(temporary, path)
+        except FileExistsError:
+            pass
+        except OSError:
+            if not path.exists():
+                os.replace(temporary, path)
+
+    def _variant_dir(self, digest: str, quality: str) -> Path:
+        return self.root / "variants" / digest[:2] / digest / quality
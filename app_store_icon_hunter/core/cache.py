@@ -0,0 +1,232 @@
+"""
+Search result cache with an in-memory LRU tier and an optional SQLite tier
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import logging
+
+from .models import AppRecord
+
+logger = logging.getLogger(__name__)
+
+
+def _default_cache_path() -> Path:
+    base = os.getenv("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "app-store-icon-hunter" / "search_cache.sqlite3"
+
+
+DEFAULT_CACHE_PATH = _default_cache_path()
+
+
+class SearchCache:
+    """
+    Two-tier cache for standardized search results
+
+    Entries live in an in-memory LRU bounded by ``max_entries`` and expire
+    after ``ttl`` seconds. When ``path`` is given, entries are also written
+    to a SQLite database so separate CLI runs and API workers share hits.
+    """
+
+    PRUNE_EVERY = 100  # Writes between purges of expired on-disk rows
+
+    def __init__(self, ttl: float = 300, max_entries: int = 1024,
+                 path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = Path(path) if path else None
+        self._memory = OrderedDict()  # key -> (expires_at, apps)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "evictions": 0,
+        }
+        self._db = None
+        if self.path is not None:
+            self._db = self._open_db(self.path)
+
+    @staticmethod
+    def make_key(store: str, term: str, country: str, limit: int) -> str:
+        """Build a normalized cache key for a search"""
+        normalized_term = " ".join(term.lower().split())
+        return f"{store.lower()}|{country.lower()}|{int(limit)}|{normalized_term}"
+
+    def get(self, key: str) -> Optional[List[AppRecord]]:
+        """
+        Look up cached results
+
+        Args:
+            key: Key built with :meth:`make_key`
+
+        Returns:
+            Copy of the cached records, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, apps = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._counters["hits"] += 1
+                    self._counters["memory_hits"] += 1
+                    return [app.copy() for app in apps]
+                del self._memory[key]
+
+            apps = self._disk_get(key, now)
+            if apps is not None:
+                self._remember(key, now + self.ttl, apps)
+                self._counters["hits"] += 1
+                self._counters["disk_hits"] += 1
+                return [app.copy() for app in apps]
+
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key: str, apps: List[AppRecord]) -> None:
+        """
+        Store search results
+
+        Args:
+            key: Key built with :meth:`make_key`
+            apps: Standardized app records
+        """
+        expires_at = time.time() + self.ttl
+        apps = [app.copy() for app in apps]
+        with self._lock:
+            self._remember(key, expires_at, apps)
+            self._disk_set(key, expires_at, apps)
+
+    def records(self) -> Iterator[AppRecord]:
+        """
+        Yield every unexpired cached record from both tiers
+
+        Used to seed indexes from earlier searches; apps found by several
+        searches are yielded once per search.
+        """
+        now = time.time()
+        with self._lock:
+            entries = [apps for expires_at, apps in self._memory.values() if expires_at > now]
+            keys = set(self._memory)
+            rows = []
+            if self._db is not None:
+                try:
+                    rows = self._db.execute(
+                        "SELECT key, apps FROM search_cache WHERE expires_at > ?", (now,)
+                    ).fetchall()
+                except sqlite3.Error as e:
+                    logger.warning(f"Search cache read failed: {e}")
+        for apps in entries:
+            for app in apps:
+                yield app.copy()
+        for key, apps in rows:
+            if key not in keys:
+                for app in json.loads(apps):
+                    yield AppRecord.from_dict(app)
+
+    def clear(self) -> None:
+        """Drop every cached entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM search_cache")
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and tier sizes"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._memory)
+            stats["max_entries"] = self.max_entries
+            stats["ttl"] = self.ttl
+            stats["path"] = str(self.path) if self.path else None
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def _remember(self, key: str, expires_at: float, apps: List[AppRecord]) -> None:
+        """Insert into the memory tier, evicting least recently used entries"""
+        self._memory[key] = (expires_at, apps)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _open_db(self, path: Path) -> Optional[sqlite3.Connection]:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(path), timeout=5, check_same_thread=False)
+            # WAL lets several processes read while one writes
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "key TEXT PRIMARY KEY, apps TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            db.commit()
+            return db
+        except sqlite3.Error as e:
+            logger.warning(f"Search cache disabled on disk ({path}): {e}")
+            return None
+
+    def _disk_get(self, key: str, now: float) -> Optional[List[AppRecord]]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT apps, expires_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Search cache read failed: {e}")
+            return None
+        if row is None or row[1] <= now:
+            return None
+        return [AppRecord.from_dict(app) for app in json.loads(row[0])]
+
+    def _disk_set(self, key: str, expires_at: float, apps: List[AppRecord]) -> None:
+        if self._db is None:
+            return
+        try:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, apps, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps([dict(app) for app in apps]), expires_at),
+                )
+                self._writes += 1
+                if self._writes % self.PRUNE_EVERY == 0:
+                    self._db.execute(
+                        "DELETE FROM search_cache WHERE expires_at <= ?", (time.time(),)
+                    )
+        except sqlite3.Error as e:
+            logger.warning(f"Search cache write failed: {e}")
+
+
+def cache_from_env(default_path: Optional[str] = None) -> Optional[SearchCache]:
+    """
+    Build a SearchCache from environment variables
+
+    ``ICON_HUNTER_CACHE_TTL`` (seconds, ``0`` disables the cache),
+    ``ICON_HUNTER_CACHE_SIZE`` (in-memory entries) and
+    ``ICON_HUNTER_CACHE_PATH`` (SQLite file for the shared tier).
+
+    Args:
+        default_path: SQLite path used when ``ICON_HUNTER_CACHE_PATH`` is unset
+
+    Returns:
+        Configured cache, or None when caching is disabled
+    """
+    ttl = float(os.getenv("ICON_HUNTER_CACHE_TTL", "300"))
+    if ttl <= 0:
+        return None
+    max_entries = int(os.getenv("ICON_HUNTER_CACHE_SIZE", "1024"))
+    path = os.getenv("ICON_HUNTER_CACHE_PATH") or default_path
+    return SearchCache(ttl=ttl, max_entries=max_entries, path=path)
@@ -0,0 +1,248 @@
+"""
+Local SQLite catalog of every app seen, with full-text search
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+import logging
+
+from .cache import DEFAULT_CACHE_PATH
+from .models import AppRecord
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_PATH = DEFAULT_CACHE_PATH.parent / "catalog.sqlite3"
+DEFAULT_MAX_AGE = 24 * 3600  # Seconds a catalog entry counts as fresh for local-first search
+
+_COLUMNS = AppRecord.FIELDS
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = [
+    f"""CREATE TABLE IF NOT EXISTS apps (
+        id INTEGER PRIMARY KEY,
+        {", ".join(f"{column} {'REAL' if column == 'rating' else 'TEXT'}" for column in _COLUMNS)},
+        first_seen REAL NOT NULL,
+        last_seen REAL NOT NULL,
+        UNIQUE (store, bundle_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS apps_last_seen ON apps (store, last_seen)",
+]
+
+# External-content FTS5 index kept in sync with the apps table by triggers
+_FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS apps_fts USING fts5(
+        name, developer, category,
+        content='apps', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS apps_ai AFTER INSERT ON apps BEGIN
+        INSERT INTO apps_fts (rowid, name, developer, category)
+        VALUES (new.id, new.name, new.developer, new.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS apps_ad AFTER DELETE ON apps BEGIN
+        INSERT INTO apps_fts (apps_fts, rowid, name, developer, category)
+        VALUES ('delete', old.id, old.name, old.developer, old.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS apps_au AFTER UPDATE ON apps BEGIN
+        INSERT INTO apps_fts (apps_fts, rowid, name, developer, category)
+        VALUES ('delete', old.id, old.name, old.developer, old.category);
+        INSERT INTO apps_fts (rowid, name, developer, category)
+        VALUES (new.id, new.name, new.developer, new.category);
+    END""",
+]
+
+
+class AppCatalog:
+    """
+    Persistent catalog of standardized app records
+
+    Every record the store clients see is upserted by (store, bundle_id),
+    keeping when it was first and last seen. Name, developer and category are
+    indexed with SQLite FTS5 so searches can be answered locally in
+    milliseconds. Sqlite builds without FTS5 fall back to substring matching.
+
+    Args:
+        path: SQLite database file (``":memory:"`` for a throwaway catalog)
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path and path != ":memory:" else None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            str(self.path) if self.path else ":memory:", timeout=5, check_same_thread=False
+        )
+        self._db.row_factory = sqlite3.Row
+        self.full_text = True
+        with self._db:
+            if self.path is not None:
+                self._db.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                self._db.execute(statement)
+            try:
+                for statement in _FTS_SCHEMA:
+                    self._db.execute(statement)
+            except sqlite3.OperationalError as e:
+                logger.warning(f"SQLite FTS5 unavailable, catalog search uses LIKE: {e}")
+                self.full_text = False
+
+    def add(self, apps: Iterable[AppRecord]) -> int:
+        """
+        Insert or refresh app records
+
+        Args:
+            apps: Standardized records; records without a bundle ID are skipped
+
+        Returns:
+            Number of records written
+        """
+        now = time.time()
+        rows = [
+            tuple(app.get(column) for column in _COLUMNS) + (now, now)
+            for app in apps if app.get("bundle_id") and app.get("store")
+        ]
+        if not rows:
+            return 0
+        updates = ", ".join(f"{column} = excluded.{column}" for column in _COLUMNS
+                            if column not in ("store", "bundle_id"))
+        sql = (
+            f"INSERT INTO apps ({', '.join(_COLUMNS)}, first_seen, last_seen) "
+            f"VALUES ({', '.join('?' * (len(_COLUMNS) + 2))}) "
+            f"ON CONFLICT (store, bundle_id) DO UPDATE SET {updates}, last_seen = excluded.last_seen"
+        )
+        try:
+            with self._lock, self._db:
+                self._db.executemany(sql, rows)
+        except sqlite3.Error as e:
+            logger.warning(f"Catalog write failed: {e}")
+            return 0
+        return len(rows)
+
+    def search(self, term: str, store: Optional[str] = None, limit: int = 10,
+               max_age: Optional[float] = None) -> List[AppRecord]:
+        """
+        Search the catalog
+
+        Every word of ``term`` must prefix-match the name, developer or
+        category. Results are ranked by relevance, with name matches first.
+
+        Args:
+            term: Search term
+            store: Restrict to one store ('appstore' or 'googleplay')
+            limit: Maximum number of results
+            max_age: Only return entries seen within this many seconds
+
+        Returns:
+            Matching records, each with a ``last_seen`` timestamp
+        """
+        tokens = _TOKEN.findall(term.lower())
+        if not tokens:
+            return []
+
+        conditions = []
+        params = []
+        if self.full_text:
+            sql = "SELECT apps.* FROM apps_fts JOIN apps ON apps.id = apps_fts.rowid"
+            conditions.append("apps_fts MATCH ?")
+            params.append(" ".join(f'"{token}"*' for token in tokens))
+            order = "bm25(apps_fts, 10.0, 2.0, 1.0)"
+        else:
+            sql = "SELECT apps.* FROM apps"
+            for token in tokens:
+                conditions.append(
+                    "(lower(name) LIKE ? OR lower(developer) LIKE ? OR lower(category) LIKE ?)"
+                )
+                params.extend([f"%{token}%"] * 3)
+            order = "last_seen DESC"
+        if store:
+            conditions.append("apps.store = ?")
+            params.append(store)
+        if max_age is not None:
+            conditions.append("apps.last_seen >= ?")
+            params.append(time.time() - max_age)
+        sql += f" WHERE {' AND '.join(conditions)} ORDER BY {order} LIMIT ?"
+        params.append(limit)
+
+        try:
+            with self._lock:
+                rows = self._db.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Catalog search failed: {e}")
+            return []
+        return [self._record(row) for row in rows]
+
+    def get(self, store: str, bundle_id: str) -> Optional[AppRecord]:
+        """Return the catalog entry for one app, if it has been seen"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM apps WHERE store = ? AND bundle_id = ?", (store, bundle_id)
+            ).fetchone()
+        return self._record(row) if row else None
+
+    def records(self, batch_size: int = 1000) -> Iterator[AppRecord]:
+        """Yield every catalogued app, in batches to bound memory"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT * FROM apps WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._record(row)
+            last_id = rows[-1]["id"]
+
+    def stats(self) -> Dict:
+        """Return entry counts and age per store"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT store, COUNT(*), MIN(last_seen), MAX(last_seen) FROM apps GROUP BY store"
+            ).fetchall()
+        now = time.time()
+        return {
+            "path": str(self.path) if self.path else None,
+            "full_text": self.full_text,
+            "apps": sum(row[1] for row in rows),
+            "stores": {
+                row[0]: {
+                    "apps": row[1],
+                    "oldest_age": round(now - row[2], 1),
+                    "newest_age": round(now - row[3], 1),
+                }
+                for row in rows
+            },
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> AppRecord:
+        record = AppRecord(**{column: row[column] for column in _COLUMNS})
+        record["last_seen"] = row["last_seen"]
+        return record
+
+
+def catalog_from_env() -> Optional[AppCatalog]:
+    """
+    Build an AppCatalog from ``ICON_HUNTER_CATALOG_PATH``
+
+    Returns:
+        Catalog at that path, or None when the variable is unset (the
+        catalog is opt-in)
+    """
+    path = os.getenv("ICON_HUNTER_CATALOG_PATH")
+    if not path:
+        return None
+    try:
+        return AppCatalog(path)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"App catalog disabled ({path}): {e}")
+        return None
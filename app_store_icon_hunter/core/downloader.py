@@ -5,45 +5,170 @@ Icon downloading and processing functionality
 import requests
 import asyncio
 import aiohttp
-import aiofiles
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 import logging
-import zipfile
 import tempfile
+import threading
 import uuid
-from PIL import Image
-import io
+from urllib.parse import urlsplit
+
+from .atlas import SHEET_ENCODERS, pack_atlas
+from .blobstore import BlobStore
+from .httpcache import ValidatorCache
+from .imaging import (
+    DEFAULT_ENCODER, DEFAULT_RESIZE_QUALITY, RESIZE_QUALITIES, ImagePool, ProcessingStats,
+    render_icon_sizes, validate_encoding
+)
+from .presets import PRESETS, check_preset_format, export_presets
+from .ratelimit import RateLimiter, get_rate_limiter
+from .renditions import png_dimensions, rendition_url
+from .resilience import (
+    BreakerRegistry, CircuitBreaker, RetryPolicy, call_with_resilience, call_with_resilience_sync, get_breakers
+)
 
 logger = logging.getLogger(__name__)
 
 
 class IconDownloader:
-    """Handles downloading and resizing app icons"""
+    """
+    Handles downloading and resizing app icons
+
+    Batch downloads run on a fixed pool of ``max_concurrency`` workers, and
+    the underlying connection pool allows at most ``per_host_limit``
+    connections to any one CDN host, so a job of thousands of apps never
+    opens more than a bounded number of sockets.
+
+    Args:
+        output_dir: Directory icons are written to
+        rate_limiter: Per-host request rate limiter
+        retry: Retry policy for icon fetches
+        breakers: Per-host circuit breakers
+        max_concurrency: Apps processed at once (and total connections)
+        per_host_limit: Connections per CDN host (0 for no per-host limit)
+        image_pool: Workers that decode, resize and encode icons (defaults
+            to a thread pool sized to the CPU count)
+        resize_quality: 'best', 'balanced' or 'fast' (see
+            :func:`~.imaging.render_icon_sizes`)
+        blob_store: Content-addressed store that job directories link into
+            (defaults to ``<output_dir>/.blobs``, created on first download)
+        validator_cache: ETag / Last-Modified of every fetched icon URL, used
+            to revalidate instead of downloading again (defaults to a
+            database inside the blob store, opened on first download)
+        renditions: Request each size from the store CDN (App Store
+            ``mzstatic.com`` and Google ``googleusercontent.com`` icons) and
+            resize locally only the sizes the CDN cannot provide (PNG output
+            only)
+        encoder: Default encoder profile, 'fast', 'balanced' or 'smallest'
+            (see ``ENCODER_PROFILES`` in :mod:`.imaging`)
+        image_format: Default output format, 'png', 'webp' or 'avif'
+    """
     
     STANDARD_SIZES = [16, 32, 48, 64, 128, 256, 512, 1024]
     DEFAULT_SIZES = [64, 128, 256, 512]
+    MAX_CONCURRENCY = 64
+    PER_HOST_LIMIT = 16
     
-    def __init__(self, output_dir: str = "icons"):
+    def __init__(self, output_dir: str = "icons", rate_limiter: Optional[RateLimiter] = None,
+                 retry: Optional[RetryPolicy] = None, breakers: Optional[BreakerRegistry] = None,
+                 max_concurrency: int = MAX_CONCURRENCY, per_host_limit: int = PER_HOST_LIMIT,
+                 image_pool: Optional[ImagePool] = None,
+                 resize_quality: str = DEFAULT_RESIZE_QUALITY,
+                 blob_store: Optional[BlobStore] = None,
+                 validator_cache: Optional[ValidatorCache] = None,
+                 renditions: bool = False, encoder: str = DEFAULT_ENCODER,
+                 image_format: str = "png"):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if resize_quality not in RESIZE_QUALITIES:
+            raise ValueError(f"Unknown resize quality '{resize_quality}'")
+        validate_encoding(encoder, image_format)
+        # Nothing is created on disk until the first download
         self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(exist_ok=True)
         self.jobs = {}  # Track download jobs
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.retry = retry or RetryPolicy()
+        self.breakers = breakers or get_breakers()
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.image_pool = image_pool or ImagePool()
+        self.resize_quality = resize_quality
+        self._blob_store = blob_store
+        self._validator_cache = validator_cache
+        self._storage_lock = threading.Lock()
+        self.renditions = renditions
+        self.encoder = encoder
+        self.image_format = image_format
+        self._processing = {}  # job_id -> ProcessingStats
+        self._archives = {}  # job_id -> {archive name: file path}, in completion order
+        self._atlases = {}  # (job_id, size) -> (archive files packed, atlas index)
+        self._atlas_lock = threading.Lock()
     
-    async def download_icons_async(self, apps: List[Dict], sizes: List[int] = None, 
-                                 job_id: str = None) -> Dict:
+    @property
+    def blob_store(self) -> BlobStore:
+        """The blob store, opened (and created under ``output_dir``) on first use"""
+        with self._storage_lock:
+            if self._blob_store is None:
+                self._blob_store = BlobStore(self.output_dir / ".blobs")
+            return self._blob_store
+    
+    @property
+    def validator_cache(self) -> ValidatorCache:
+        """The validator cache, opened on first use"""
+        blob_store = self.blob_store
+        with self._storage_lock:
+            if self._validator_cache is None:
+                self._validator_cache = ValidatorCache(blob_store.root / "validators.sqlite3")
+            return self._validator_cache
+    
+    def storage_stats(self) -> Dict:
+        """Blob store and validator cache statistics (None until opened)"""
+        return {
+            "blob_store": self._blob_store.stats() if self._blob_store is not None else None,
+            "icon_validators": self._validator_cache.stats() if self._validator_cache is not None else None,
+        }
+    
+    async def download_icons_async(self, apps: List[Dict], sizes: List[int] = None,
+                                   job_id: str = None, encoder: Optional[str] = None,
+                                   image_format: Optional[str] = None,
+                                   presets: Optional[List[str]] = None) -> Dict:
         """
         Download icons for multiple apps asynchronously
         
+        ``progress`` in the job status counts finished apps, successful or
+        not, as they finish. ``completed_apps`` and ``failed_apps`` keep the
+        order of ``apps``. ``processing`` reports how well icon processing
+        was parallelized across the image pool, and ``fetches`` how many
+        icons were downloaded in full versus revalidated as unchanged, with
+        CDN rendition requests counted apart.
+        Each app's files join the job's archive as soon as the app is done,
+        and ``archive_files`` counts them, so the archive of a running job
+        can already be downloaded (see :meth:`archive_entries`).
+        
         Args:
             apps: List of app dictionaries
             sizes: List of icon sizes to generate
             job_id: Optional job ID for tracking
+            encoder: Encoder profile for this job (defaults to ``self.encoder``)
+            image_format: Output format for this job (defaults to ``self.image_format``)
+            presets: Platform icon sets to export instead of ``sizes`` (names
+                from ``PRESETS`` in :mod:`.presets`); these are always PNG, and
+                the job's ``encoding`` reports ``png``
             
         Returns:
             Job status dictionary
+            
+        Raises:
+            ValueError: If the encoder profile, image format or a preset is
+                unknown, or presets are combined with a non-PNG ``image_format``
         """
         if sizes is None:
             sizes = self.DEFAULT_SIZES
+        presets = self._check_presets(presets, image_format)
+        if presets:
+            image_format = "png"
+        encoding = {"encoder": encoder or self.encoder, "format": image_format or self.image_format}
+        validate_encoding(encoding["encoder"], encoding["format"])
         
         if job_id is None:
             job_id = str(uuid.uuid4())
@@ -56,20 +181,24 @@ class IconDownloader:
             "completed_apps": [],
             "failed_apps": [],
             "error_message": None,
-            "zip_path": None
+            "archive_files": 0,
+            "encoding": encoding,
+            "presets": presets,
+            "sizes": [] if presets else [size for size in sizes if size in self.STANDARD_SIZES],
+            "processing": None,
+            "fetches": {"downloaded": 0, "revalidated": 0, "bytes_downloaded": 0, "renditions": 0,
+                        "rendition_fetches": 0}
         }
+        self._processing[job_id] = ProcessingStats(self.image_pool.kind, self.image_pool.workers)
+        self._archives[job_id] = {}
         
         try:
-            async with aiohttp.ClientSession() as session:
-                tasks = []
-                for app in apps:
-                    task = self._download_app_icon(session, app, sizes, job_id)
-                    tasks.append(task)
-                
-                results = await asyncio.gather(*tasks, return_exceptions=True)
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency,
+                                             limit_per_host=self.per_host_limit)
+            async with aiohttp.ClientSession(connector=connector) as session:
+                results = await self._run_bounded(session, apps, sizes, job_id)
                 
                 # Process results
-                successful_downloads = []
                 for i, result in enumerate(results):
                     if isinstance(result, Exception):
                         self.jobs[job_id]["failed_apps"].append({
@@ -77,14 +206,8 @@ class IconDownloader:
                             "error": str(result)
                         })
                     else:
-                        successful_downloads.append(result)
                         self.jobs[job_id]["completed_apps"].append(apps[i]["name"])
                 
-                # Create ZIP file if there are successful downloads
-                if successful_downloads:
-                    zip_path = await self._create_zip_file(successful_downloads, job_id)
-                    self.jobs[job_id]["zip_path"] = zip_path
-                
                 self.jobs[job_id]["status"] = "completed"
                 self.jobs[job_id]["progress"] = self.jobs[job_id]["total"]
                 
@@ -92,9 +215,38 @@ class IconDownloader:
             logger.error(f"Download job {job_id} failed: {e}")
             self.jobs[job_id]["status"] = "failed"
             self.jobs[job_id]["error_message"] = str(e)
+        finally:
+            self.jobs[job_id]["processing"] = self._processing.pop(job_id).to_dict()
         
         return self.jobs[job_id]
     
+    async def _run_bounded(self, session: aiohttp.ClientSession, apps: List[Dict],
+                           sizes: List[int], job_id: str) -> List:
+        """
+        Download every app on at most ``max_concurrency`` workers
+        
+        Returns:
+            One entry per app, in input order: the download result or the
+            exception it failed with
+        """
+        results = [None] * len(apps)
+        # Workers share one iterator; taking the next app never awaits, so
+        # each app is handed to exactly one worker
+        pending = iter(enumerate(apps))
+        
+        async def worker():
+            for index, app in pending:
+                try:
+                    results[index] = await self._download_app_icon(session, app, sizes, job_id)
+                    self._add_to_archive(job_id, results[index])
+                except Exception as e:
+                    results[index] = e
+                self.jobs[job_id]["progress"] += 1
+        
+        workers = min(self.max_concurrency, len(apps))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
+    
     async def _download_app_icon(self, session: aiohttp.ClientSession, 
                                app: Dict, sizes: List[int], job_id: str) -> Dict:
         """Download and process a single app's icon"""
@@ -107,23 +259,31 @@ class IconDownloader:
             raise ValueError(f"No icon URL for {app['name']}")
         
         try:
-            # Download original icon
-            async with session.get(icon_url) as response:
-                response.raise_for_status()
-                image_data = await response.read()
-            
-            # Save original
+            # Download (or revalidate) and store the original, then link it
+            # into the job directory
+            image_data, digest = await self._fetch_original(session, icon_url, job_id)
             original_path = app_dir / "original.png"
-            async with aiofiles.open(original_path, "wb") as f:
-                await f.write(image_data)
+            self.blob_store.link(self.blob_store.path(digest), original_path)
             
-            # Generate different sizes
+            # Export platform icon sets, or generate different sizes,
+            # fetching CDN renditions first when enabled
             generated_files = [str(original_path)]
-            if len(sizes) > 1 or sizes[0] != "original":
-                generated_files.extend(await self._resize_icon(image_data, app_dir, sizes))
-            
-            # Update progress
-            self.jobs[job_id]["progress"] += 1
+            presets = self.jobs.get(job_id, {}).get("presets")
+            if presets:
+                generated_files.extend(await self._export_presets(image_data, app_dir, presets, job_id))
+            elif len(sizes) > 1 or sizes[0] != "original":
+                remaining = sizes
+                if self.renditions and self._encoding(job_id)["format"] == "png":
+                    native = await self._fetch_renditions(session, icon_url, sizes, job_id)
+                    for size, rendition_digest in native.items():
+                        generated_files.append(self.blob_store.link(
+                            self.blob_store.path(rendition_digest), app_dir / f"icon_{size}x{size}.png"
+                        ))
+                    remaining = [size for size in sizes if size not in native]
+                if remaining:
+                    generated_files.extend(
+                        await self._resize_icon(image_data, app_dir, remaining, job_id, digest)
+                    )
             
             return {
                 "app": app,
@@ -135,61 +295,360 @@ class IconDownloader:
             logger.error(f"Failed to download icon for {app['name']}: {e}")
             raise
     
-    async def _resize_icon(self, image_data: bytes, output_dir: Path, 
-                         sizes: List[int]) -> List[str]:
-        """Resize icon to different sizes using PIL"""
-        generated_files = []
+    async def _fetch_original(self, session: aiohttp.ClientSession, icon_url: str,
+                              job_id: Optional[str] = None, rendition: bool = False) -> Tuple[bytes, str]:
+        """
+        Get an icon's original bytes into the blob store
+        
+        Icons fetched before are requested conditionally; on ``304 Not
+        Modified`` the stored blob is reused.
+        
+        Args:
+            rendition: The URL is a CDN rendition; it is counted under
+                ``rendition_fetches`` instead of ``downloaded`` or ``revalidated``
+        
+        Returns:
+            Original bytes and their digest in the blob store
+        """
+        loop = asyncio.get_running_loop()
+        known = self._known_icon(icon_url)
+        image_data, validators = await self._fetch_icon(
+            session, icon_url, ValidatorCache.conditional_headers(known)
+        )
+        fetches = self.jobs[job_id]["fetches"] if job_id in self.jobs else None
+        if image_data is None:
+            self.validator_cache.touch(icon_url)
+            if fetches is not None:
+                fetches["rendition_fetches" if rendition else "revalidated"] += 1
+            digest = known["digest"]
+            return await loop.run_in_executor(None, self.blob_store.path(digest).read_bytes), digest
+        
+        if fetches is not None:
+            fetches["rendition_fetches" if rendition else "downloaded"] += 1
+            fetches["bytes_downloaded"] += len(image_data)
+        digest = await loop.run_in_executor(None, self.blob_store.put, image_data)
+        self.validator_cache.put(icon_url, digest, **validators)
+        return image_data, digest
+    
+    def _fetch_original_sync(self, icon_url: str) -> Tuple[bytes, str]:
+        """Blocking counterpart of :meth:`_fetch_original`"""
+        known = self._known_icon(icon_url)
+        response = self._fetch_icon_sync(icon_url, ValidatorCache.conditional_headers(known))
+        if response.status_code == 304 and known is not None:
+            self.validator_cache.touch(icon_url)
+            digest = known["digest"]
+            return self.blob_store.path(digest).read_bytes(), digest
+        
+        digest = self.blob_store.put(response.content)
+        self.validator_cache.put(icon_url, digest, response.headers.get("ETag"),
+                                 response.headers.get("Last-Modified"))
+        return response.content, digest
+    
+    async def _fetch_renditions(self, session: aiohttp.ClientSession, icon_url: str,
+                                sizes: List[int], job_id: Optional[str] = None) -> Dict[int, str]:
+        """
+        Fetch server-rendered sizes of an icon from its store CDN
+        
+        Returns:
+            Blob digest per size the CDN delivered as a PNG of exactly that
+            size; other sizes are left for local resizing
+        """
+        wanted = [size for size in dict.fromkeys(sizes)
+                  if size in self.STANDARD_SIZES and rendition_url(icon_url, size)]
+        results = await asyncio.gather(*(
+            self._fetch_original(session, rendition_url(icon_url, size), job_id, rendition=True)
+            for size in wanted
+        ), return_exceptions=True)
+        
+        native = {}
+        for size, result in zip(wanted, results):
+            if isinstance(result, Exception):
+                logger.info(f"CDN rendition {size}px of {icon_url} failed, resizing locally: {result}")
+            elif png_dimensions(result[0]) == (size, size):
+                native[size] = result[1]
+        if job_id in self.jobs:
+            self.jobs[job_id]["fetches"]["renditions"] += len(native)
+        return native
+    
+    def _fetch_renditions_sync(self, icon_url: str, sizes: List[int]) -> Dict[int, str]:
+        """Blocking counterpart of :meth:`_fetch_renditions`"""
+        native = {}
+        for size in dict.fromkeys(sizes):
+            url = rendition_url(icon_url, size)
+            if size not in self.STANDARD_SIZES or not url:
+                continue
+            try:
+                image_data, digest = self._fetch_original_sync(url)
+            except Exception as e:
+                logger.info(f"CDN rendition {size}px of {icon_url} failed, resizing locally: {e}")
+                continue
+            if png_dimensions(image_data) == (size, size):
+                native[size] = digest
+        return native
+    
+    def _known_icon(self, icon_url: str) -> Optional[Dict]:
+        """Validators of an icon fetched before, if its bytes are still stored"""
+        known = self.validator_cache.get(icon_url)
+        if known is not None and not self.blob_store.path(known["digest"]).exists():
+            return None
+        return known
+    
+    async def _fetch_icon(self, session: aiohttp.ClientSession, icon_url: str,
+                          headers: Optional[Dict[str, str]] = None) -> Tuple[Optional[bytes], Dict]:
+        """
+        Fetch icon bytes with rate limiting, retries and a per-host circuit breaker
+        
+        Returns:
+            The body (None when a conditional request was answered with 304)
+            and the response's ``etag`` and ``last_modified`` validators
+        """
+        async def fetch() -> Tuple[Optional[bytes], Dict]:
+            await self.rate_limiter.acquire(icon_url)
+            async with session.get(icon_url, headers=headers) as response:
+                self.rate_limiter.record(icon_url, response.status, response.headers.get("Retry-After"))
+                response.raise_for_status()
+                validators = {"etag": response.headers.get("ETag"),
+                              "last_modified": response.headers.get("Last-Modified")}
+                if response.status == 304 and headers:
+                    return None, validators
+                return await response.read(), validators
+
+        return await call_with_resilience(fetch, self.retry, self._breaker_for(icon_url))
+
+    def _fetch_icon_sync(self, icon_url: str,
+                         headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """Blocking counterpart of :meth:`_fetch_icon`"""
+        def fetch() -> requests.Response:
+            self.rate_limiter.acquire_sync(icon_url)
+            response = requests.get(icon_url, headers=headers, timeout=10)
+            self.rate_limiter.record(icon_url, response.status_code, response.headers.get("Retry-After"))
+            response.raise_for_status()
+            return response
+
+        return call_with_resilience_sync(fetch, self.retry, self._breaker_for(icon_url))
+
+    def _breaker_for(self, icon_url: str) -> CircuitBreaker:
+        """Circuit breaker for the CDN host serving ``icon_url``"""
+        return self.breakers.get(f"icons:{urlsplit(icon_url).hostname}")
+    
+    async def _resize_icon(self, image_data: bytes, output_dir: Path,
+                           sizes: List[int], job_id: Optional[str] = None,
+                           digest: Optional[str] = None) -> List[str]:
+        """
+        Resize icon to different sizes on the image pool
+        
+        With the ``digest`` of an icon in the blob store, only sizes not
+        rendered before are rendered (into the store), and every size is
+        linked into ``output_dir``.
+        """
+        standard_sizes = [size for size in sizes if size in self.STANDARD_SIZES]
+        stats = self._processing.get(job_id)
+        encoding = self._encoding(job_id)
+        encoder, fmt = encoding["encoder"], encoding["format"]
+        profile = self._variant_profile(encoder)
+        missing = standard_sizes
+        if digest is not None:
+            missing = self.blob_store.missing_variants(digest, standard_sizes, profile, fmt)
+            if not missing:
+                if stats is not None:
+                    stats.reused += 1
+                return self.blob_store.link_variants(digest, standard_sizes, profile, output_dir, fmt)
+        if stats is not None:
+            stats.started()
+        elapsed = None
         
         try:
-            # Open image with PIL
-            image = Image.open(io.BytesIO(image_data))
-            
-            # Convert to RGBA if necessary
-            if image.mode != "RGBA":
-                image = image.convert("RGBA")
-            
-            for size in sizes:
-                if size in self.STANDARD_SIZES:
-                    resized = image.resize((size, size), Image.Resampling.LANCZOS)
-                    
-                    # Save as PNG
-                    output_path = output_dir / f"icon_{size}x{size}.png"
-                    resized.save(output_path, "PNG", optimize=True)
-                    generated_files.append(str(output_path))
+            if digest is None:
+                generated_files, elapsed = await self.image_pool.render(
+                    image_data, output_dir, standard_sizes, self.resize_quality, encoder, fmt
+                )
+            else:
+                with self.blob_store.staging(digest, profile) as staging:
+                    _, elapsed = await self.image_pool.render(
+                        image_data, staging, missing, self.resize_quality, encoder, fmt
+                    )
+                generated_files = self.blob_store.link_variants(
+                    digest, standard_sizes, profile, output_dir, fmt
+                )
             
         except Exception as e:
             logger.error(f"Failed to resize icon: {e}")
-            # If resizing fails, just copy the original for each size
-            for size in sizes:
-                output_path = output_dir / f"icon_{size}x{size}.png"
-                async with aiofiles.open(output_path, "wb") as f:
-                    await f.write(image_data)
-                generated_files.append(str(output_path))
+            # The original is not a rendition in the job's format; leave the
+            # sizes out rather than storing it under their names
+            if stats is not None:
+                stats.failed_sizes += len(missing)
+            if digest is None:
+                for size in standard_sizes:
+                    (output_dir / f"icon_{size}x{size}.{fmt}").unlink(missing_ok=True)
+            generated_files = []
+        finally:
+            if stats is not None:
+                stats.finished(elapsed)
         
         return generated_files
     
-    async def _create_zip_file(self, downloads: List[Dict], job_id: str) -> str:
-        """Create a ZIP file containing all downloaded icons"""
-        zip_path = self.output_dir / f"icons_{job_id}.zip"
+    async def _export_presets(self, image_data: bytes, output_dir: Path, presets: List[str],
+                              job_id: Optional[str] = None) -> List[str]:
+        """Write platform icon sets on the image pool, decoding the icon once for all of them"""
+        stats = self._processing.get(job_id)
+        if stats is not None:
+            stats.started()
+        elapsed = None
+        try:
+            files, elapsed = await self.image_pool.run(
+                export_presets, image_data, str(output_dir), presets, self.resize_quality,
+                self._encoding(job_id)["encoder"]
+            )
+        finally:
+            if stats is not None:
+                stats.finished(elapsed)
+        return files
+    
+    @staticmethod
+    def _check_presets(presets: Optional[List[str]],
+                       image_format: Optional[str] = None) -> Optional[List[str]]:
+        """Deduplicated preset names, or None for plain sizes"""
+        if not presets:
+            return None
+        unknown = [name for name in presets if name not in PRESETS]
+        if unknown:
+            raise ValueError(f"Unknown export preset(s) {unknown}; expected some of {tuple(PRESETS)}")
+        check_preset_format(image_format)
+        return list(dict.fromkeys(presets))
+    
+    def _encoding(self, job_id: Optional[str]) -> Dict[str, str]:
+        """Encoder profile and output format of a job (the defaults outside jobs)"""
+        encoding = self.jobs.get(job_id, {}).get("encoding")
+        return encoding or {"encoder": self.encoder, "format": self.image_format}
+    
+    def _variant_profile(self, encoder: str) -> str:
+        """Blob store key of the variants rendered with the resize quality and ``encoder``"""
+        if encoder == DEFAULT_ENCODER:
+            return self.resize_quality
+        return f"{self.resize_quality}-{encoder}"
+    
+    def _add_to_archive(self, job_id: str, download: Dict) -> None:
+        """Add a finished app's files to the job's archive as ``app_name/<path in its directory>``"""
+        entries = self._archives.setdefault(job_id, {})
+        app_name = self._sanitize_filename(download["app"]["name"])
+        directory = Path(download["directory"])
+        for file_path in download["files"]:
+            try:
+                relative = Path(file_path).relative_to(directory).as_posix()
+            except ValueError:
+                relative = Path(file_path).name
+            entries.setdefault(f"{app_name}/{relative}", str(file_path))
+        if job_id in self.jobs:
+            self.jobs[job_id]["archive_files"] = len(entries)
+    
+    def archive_entries(self, job_id: str) -> Optional[List[Tuple[str, str]]]:
+        """
+        Files of a job so far, as ``(archive name, path)`` pairs for
+        :func:`~.archive.iter_zip`
         
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for download in downloads:
-                app_name = download["app"]["name"]
-                for file_path in download["files"]:
-                    file_path = Path(file_path)
-                    if file_path.exists():
-                        # Create archive path: app_name/filename
-                        archive_path = f"{self._sanitize_filename(app_name)}/{file_path.name}"
-                        zipf.write(file_path, archive_path)
+        Apps appear in the order they finished. For a running job this is a
+        snapshot: apps finishing later are not added to it.
         
-        return str(zip_path)
+        Returns:
+            The entries, or None if the job is unknown
+        """
+        entries = self._archives.get(job_id)
+        return list(entries.items()) if entries is not None else None
+    
+    def atlas_dir(self, job_id: str, size: int) -> Path:
+        """Directory the ``size`` pixel atlas of a job is written to"""
+        # App directories never start with a dot (see _sanitize_filename)
+        return self.output_dir / job_id / ".atlas" / str(size)
+    
+    def build_atlas(self, job_id: str, size: int) -> Optional[Dict]:
+        """
+        Pack a job's ``size`` pixel icons into sprite sheets
+        
+        Icons are packed in archive order by :func:`~.atlas.pack_atlas`, in
+        the job's format and with the job's encoder profile, except that
+        'smallest' jobs get 'balanced' sheets (see ``SHEET_ENCODERS``). The
+        atlas is built once and reused until more files join the job's
+        archive. Builds run one at a
+        time, blocking, with sheets built in parallel on the image pool; call
+        this from a worker thread outside the pool.
+        
+        Args:
+            job_id: Job to pack
+            size: Icon size, one of the sizes the job generated
+            
+        Returns:
+            The atlas index, keyed by app directory name, with no icons if
+            the job has none of ``size``, or None if the job is unknown
+        """
+        entries = self.archive_entries(job_id)
+        if entries is None:
+            return None
+        encoding = self._encoding(job_id)
+        fmt = encoding["format"]
+        icon_name = f"icon_{size}x{size}.{fmt}"
+        icons = [
+            (arcname.rsplit("/", 1)[0], path) for arcname, path in entries
+            if arcname.endswith("/" + icon_name) and arcname.count("/") == 1
+        ]
+        if not icons:
+            # Nothing to pack; do not create an atlas directory for it
+            return {"size": size, "etag": None, "sheets": [], "icons": {}}
+        with self._atlas_lock:
+            cached = self._atlases.get((job_id, size))
+            if cached is not None and cached[0] == len(entries):
+                return cached[1]
+            directory = self.atlas_dir(job_id, size)
+            index = pack_atlas(icons, size, directory, encoder=SHEET_ENCODERS[encoding["encoder"]],
+                               fmt=fmt, executor=self.image_pool.executor)
+            # Sheets of an earlier build are superseded (their names are content hashes)
+            current = {sheet["file"] for sheet in index["sheets"]}
+            for stale in directory.glob(f"atlas_{size}_*.*"):
+                if stale.name not in current:
+                    stale.unlink(missing_ok=True)
+            self._atlases[(job_id, size)] = (len(entries), index)
+        logger.info(f"Packed {len(index['icons'])} icons of job {job_id} into "
+                    f"{len(index['sheets'])} {size}px sheet(s)")
+        return index
+    
+    def atlas_file(self, job_id: str, size: int, filename: str) -> Optional[Path]:
+        """
+        Path of a sheet or ``atlas.css`` of an atlas built by :meth:`build_atlas`
+        
+        Returns:
+            The path, or None if the atlas was not built or has no such file
+        """
+        cached = self._atlases.get((job_id, size))
+        if cached is None:
+            return None
+        names = {sheet["file"] for sheet in cached[1]["sheets"]} | {"atlas.css"}
+        return self.atlas_dir(job_id, size) / filename if filename in names else None
+    
+    def discard_job(self, job_id: str) -> None:
+        """Forget a job, its archive entries and atlases (its files are left on disk)"""
+        self.jobs.pop(job_id, None)
+        self._archives.pop(job_id, None)
+        with self._atlas_lock:
+            for key in [key for key in self._atlases if key[0] == job_id]:
+                del self._atlases[key]
     
     def get_job_status(self, job_id: str) -> Optional[Dict]:
         """Get the status of a download job"""
-        return self.jobs.get(job_id)
+        status = self.jobs.get(job_id)
+        stats = self._processing.get(job_id)
+        if status is not None and stats is not None:
+            status["processing"] = stats.to_dict()
+        return status
+
+    def close(self) -> None:
+        """Shut down the image pool and close the validator cache"""
+        self.image_pool.close()
+        if self._validator_cache is not None:
+            self._validator_cache.close()
     
-    def download_icon_sync(self, icon_url: str, app_name: str, 
-                          sizes: List[int] = None) -> List[str]:
+    def download_icon_sync(self, icon_url: str, app_name: str,
+                           sizes: List[int] = None, encoder: Optional[str] = None,
+                           image_format: Optional[str] = None,
+                           presets: Optional[List[str]] = None) -> List[str]:
         """
         Synchronous version for single icon download
         
@@ -197,51 +656,61 @@ class IconDownloader:
             icon_url: URL of the icon to download
             app_name: Name of the app (for folder naming)
             sizes: List of sizes to generate
+            encoder: Encoder profile (defaults to ``self.encoder``)
+            image_format: Output format (defaults to ``self.image_format``)
+            presets: Platform icon sets to export instead of ``sizes``
             
         Returns:
             List of generated file paths
         """
         if sizes is None:
             sizes = self.DEFAULT_SIZES
+        presets = self._check_presets(presets, image_format)
+        if presets:
+            image_format = "png"
+        encoder = encoder or self.encoder
+        fmt = image_format or self.image_format
+        validate_encoding(encoder, fmt)
+        profile = self._variant_profile(encoder)
         
         app_dir = self.output_dir / self._sanitize_filename(app_name)
-        app_dir.mkdir(exist_ok=True)
+        app_dir.mkdir(parents=True, exist_ok=True)
         
         downloaded_files = []
         
         try:
-            # Download original icon
-            response = requests.get(icon_url, timeout=10)
-            response.raise_for_status()
-            
-            # Save original
+            # Download (or revalidate) and store the original, then link it
+            # into the app directory
+            image_data, digest = self._fetch_original_sync(icon_url)
             original_path = app_dir / "original.png"
-            with open(original_path, "wb") as f:
-                f.write(response.content)
-            downloaded_files.append(str(original_path))
+            downloaded_files.append(self.blob_store.link(self.blob_store.path(digest), original_path))
             
-            # Generate different sizes
-            if len(sizes) > 1 or (len(sizes) == 1 and sizes[0] != "original"):
+            # Export platform icon sets, or generate different sizes,
+            # fetching CDN renditions first when enabled
+            if presets:
+                downloaded_files.extend(export_presets(image_data, str(app_dir), presets,
+                                                       self.resize_quality, encoder))
+            elif len(sizes) > 1 or (len(sizes) == 1 and sizes[0] != "original"):
+                if self.renditions and fmt == "png":
+                    native = self._fetch_renditions_sync(icon_url, sizes)
+                    for size, rendition_digest in native.items():
+                        downloaded_files.append(self.blob_store.link(
+                            self.blob_store.path(rendition_digest), app_dir / f"icon_{size}x{size}.png"
+                        ))
+                    sizes = [size for size in sizes if size not in native]
                 try:
-                    image = Image.open(io.BytesIO(response.content))
-                    if image.mode != "RGBA":
-                        image = image.convert("RGBA")
-                    
-                    for size in sizes:
-                        if size in self.STANDARD_SIZES:
-                            resized = image.resize((size, size), Image.Resampling.LANCZOS)
-                            size_path = app_dir / f"icon_{size}x{size}.png"
-                            resized.save(size_path, "PNG", optimize=True)
-                            downloaded_files.append(str(size_path))
-                            
+                    standard_sizes = [size for size in sizes if size in self.STANDARD_SIZES]
+                    missing = self.blob_store.missing_variants(digest, standard_sizes, profile, fmt)
+                    if missing:
+                        with self.blob_store.staging(digest, profile) as staging:
+                            render_icon_sizes(image_data, staging, missing, self.resize_quality,
+                                              encoder, fmt)
+                    downloaded_files.extend(self.blob_store.link_variants(
+                        digest, standard_sizes, profile, app_dir, fmt
+                    ))
                 except Exception as e:
+                    # Only the original is kept; it is not a rendition in the job's format
                     logger.warning(f"Could not resize icon for {app_name}: {e}")
-                    # Fall back to copying original
-                    for size in sizes:
-                        size_path = app_dir / f"icon_{size}x{size}.png"
-                        with open(size_path, "wb") as f:
-                            f.write(response.content)
-                        downloaded_files.append(str(size_path))
             
             return downloaded_files
             
@@ -2,106 +2,260 @@
 Google Play Store API integration via SerpApi
 """
 
-import requests
 import os
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 import logging
 
+from .cache import SearchCache
+from .autocomplete import PrefixIndex
+from .catalog import AppCatalog
+from .http import REQUEST_ERRORS, SharedSession, describe_error, get_shared_session, run_sync
+from .models import AppRecord
+from .resilience import (
+    CircuitBreaker, RetryPolicy, breaker_guard, call_with_resilience, get_breakers
+)
+from .singleflight import SingleFlight
+
 logger = logging.getLogger(__name__)
 
 
 class GooglePlayAPI:
     """Interface for Google Play Store via SerpApi"""
-    
-    def __init__(self, api_key: str = None):
+
+    MAX_LIMIT = 100  # Largest page SerpApi returns
+    SUPPORTS_OFFSET = False  # SerpApi pages with opaque tokens instead
+
+    # SerpApi result keys read by _standardize
+    RESULT_FIELDS = (
+        "title", "product_id", "thumbnail", "price", "rating", "description",
+        "developer", "genre", "link",
+    )
+
+    def __init__(self, api_key: str = None, session: Optional[SharedSession] = None,
+                 cache: Optional[SearchCache] = None,
+                 catalog: Optional[AppCatalog] = None,
+                 prefix_index: Optional[PrefixIndex] = None,
+                 singleflight: Optional[SingleFlight] = None,
+                 retry: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None,
+                 description_limit: Optional[int] = None,
+                 streaming_parse: bool = True):
         self.api_key = api_key or os.getenv("SERPAPI_KEY")
         self.base_url = "https://serpapi.com/search"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'App-Store-Icon-Hunter/2.0'
-        })
-    
-    def search_apps(self, term: str, country: str = "us", limit: int = 10) -> List[Dict]:
+        self.session = session or get_shared_session()
+        self.cache = cache
+        self.catalog = catalog
+        self.prefix_index = prefix_index
+        self.singleflight = singleflight or SingleFlight()
+        self.retry = retry or RetryPolicy()
+        self.description_limit = description_limit
+        self.streaming_parse = streaming_parse
+        self.breaker = breaker or get_breakers().get("googleplay")
+
+    @property
+    def available(self) -> bool:
+        """Whether the client can query its store (requires a SerpApi key)"""
+        return bool(self.api_key)
+
+    def search_apps(self, term: str, country: str = "us", limit: int = 10) -> List[AppRecord]:
         """
         Search for apps in Google Play Store
-        
+
+        Blocking wrapper around :meth:`asearch_apps`.
+
+        Args:
+            term: Search term
+            country: Country code (default: "us")
+            limit: Maximum number of results (default: 10)
+
+        Returns:
+            List of standardized app records
+        """
+        return run_sync(self.asearch_apps(term, country, limit))
+
+    async def asearch_apps(self, term: str, country: str = "us", limit: int = 10,
+                           raise_errors: bool = False) -> List[AppRecord]:
+        """
+        Search for apps in Google Play Store without blocking the event loop
+
         Args:
             term: Search term
             country: Country code (default: "us")
             limit: Maximum number of results (default: 10)
-            
+            raise_errors: Re-raise request failures instead of returning []
+
         Returns:
-            List of app dictionaries with standardized format
+            List of standardized app records
         """
         if not self.api_key:
             logger.warning("Google Play search requires SerpApi key. Set SERPAPI_KEY environment variable.")
             return []
-        
-        params = {
+
+        key = SearchCache.make_key("googleplay", term, country, limit)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        try:
+            apps = await self.singleflight.do(
+                key, lambda: self._fetch_search(key, term, country, limit)
+            )
+        except REQUEST_ERRORS as e:
+            if raise_errors:
+                raise
+            logger.error(f"Error searching Google Play: {describe_error(e)}")
+            return []
+
+        # Coalesced callers share one list, so hand each of them a copy
+        return [app.copy() for app in apps]
+
+    async def aiter_search_apps(self, term: str, country: str = "us", limit: int = 10,
+                                offset: int = 0) -> AsyncIterator[AppRecord]:
+        """
+        Yield Google Play search results as they are parsed from the response
+
+        Unlike :meth:`asearch_apps`, failures are raised and requests are not
+        retried once results have started flowing.
+
+        Args:
+            term: Search term
+            country: Country code (default: "us")
+            limit: Maximum number of results (up to ``MAX_LIMIT``)
+            offset: Must be 0; SerpApi does not support offset paging
+
+        Yields:
+            Standardized app records
+        """
+        if offset:
+            raise ValueError("Google Play search does not support offset paging")
+        if not self.api_key:
+            logger.warning("Google Play search requires SerpApi key. Set SERPAPI_KEY environment variable.")
+            return
+
+        key = SearchCache.make_key("googleplay", term, country, limit)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                for app in cached:
+                    yield app
+                return
+
+        apps = []
+        async with breaker_guard(self.breaker):
+            async for result in self.session.iter_json_array(
+                self.base_url, "organic_results",
+                params=self._search_params(term, country, limit), fields=self.RESULT_FIELDS
+            ):
+                app = self._standardize(result)
+                if self.cache is not None or self.catalog is not None or \
+                        self.prefix_index is not None:
+                    apps.append(app.copy())
+                yield app
+        self._remember(key, apps)
+
+    def _search_params(self, term: str, country: str, limit: int) -> Dict:
+        return {
             "engine": "google_play",
             "q": term,
             "gl": country,
             "num": limit,
             "api_key": self.api_key
         }
-        
-        try:
-            response = self.session.get(self.base_url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Standardize the format
-            apps = []
-            for result in data.get("organic_results", []):
-                app = {
-                    "name": result.get("title", ""),
-                    "bundle_id": result.get("product_id", ""),
-                    "icon_url": result.get("thumbnail", ""),
-                    "store": "googleplay",
-                    "price": result.get("price", "Free"),
-                    "rating": result.get("rating"),
-                    "description": result.get("description", ""),
-                    "developer": result.get("developer", ""),
-                    "category": result.get("genre", ""),
-                    "url": result.get("link", "")
-                }
-                apps.append(app)
-            
-            return apps
-            
-        except requests.RequestException as e:
-            logger.error(f"Error searching Google Play: {e}")
-            return []
-    
+
+    async def _fetch_search(self, key: str, term: str, country: str, limit: int) -> List[AppRecord]:
+        """Query the upstream search endpoint and cache the standardized results"""
+        params = self._search_params(term, country, limit)
+        results = await self._get_results(self.base_url, params=params)
+        apps = [self._standardize(result) for result in results]
+        self._remember(key, apps)
+        return apps
+
+    def _remember(self, key: Optional[str], apps: List[AppRecord]) -> None:
+        """Store fresh upstream results in the search cache, app catalog and prefix index"""
+        if self.cache is not None and key is not None:
+            self.cache.set(key, apps)
+        if self.catalog is not None:
+            self.catalog.add(apps)
+        if self.prefix_index is not None:
+            self.prefix_index.add(apps)
+
+    async def _get_json(self, url: str, params: Dict) -> Dict:
+        """GET JSON from SerpApi with retries, guarded by the Google Play circuit breaker"""
+        return await call_with_resilience(
+            lambda: self.session.get_json(url, params=params), self.retry, self.breaker
+        )
+
+    async def _get_results(self, url: str, params: Dict) -> List[Dict]:
+        """GET the ``organic_results`` array, streamed and projected when enabled"""
+        if self.streaming_parse:
+            return await call_with_resilience(
+                lambda: self.session.get_json_array(
+                    url, "organic_results", params=params, fields=self.RESULT_FIELDS
+                ),
+                self.retry, self.breaker,
+            )
+        data = await self._get_json(url, params=params)
+        return data.get("organic_results", [])
+
+    def _standardize(self, result: Dict) -> AppRecord:
+        """Convert a SerpApi result into the standardized app format"""
+        record = AppRecord(
+            name=result.get("title", ""),
+            bundle_id=result.get("product_id", ""),
+            icon_url=result.get("thumbnail", ""),
+            store="googleplay",
+            price=result.get("price", "Free"),
+            rating=result.get("rating"),
+            description=result.get("description", ""),
+            developer=result.get("developer", ""),
+            category=result.get("genre", ""),
+            url=result.get("link", "")
+        )
+        record.truncate_description(self.description_limit)
+        return record
+
     def get_app_details(self, app_id: str, country: str = "us") -> Optional[Dict]:
         """
         Get detailed information about a specific app by ID
-        
+
+        Blocking wrapper around :meth:`aget_app_details`.
+
         Args:
             app_id: Google Play app ID
             country: Country code
-            
+
+        Returns:
+            App details dictionary or None if not found
+        """
+        return run_sync(self.aget_app_details(app_id, country))
+
+    async def aget_app_details(self, app_id: str, country: str = "us") -> Optional[Dict]:
+        """
+        Get detailed information about a specific app without blocking the event loop
+
+        Args:
+            app_id: Google Play app ID
+            country: Country code
+
         Returns:
             App details dictionary or None if not found
         """
         if not self.api_key:
             logger.warning("Google Play details require SerpApi key.")
             return None
-        
+
         params = {
             "engine": "google_play_product",
             "product_id": app_id,
             "gl": country,
             "api_key": self.api_key
         }
-        
+
         try:
-            response = self.session.get(self.base_url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            return data.get("product_result", {})
-            
-        except requests.RequestException as e:
-            logger.error(f"Error getting Google Play app details: {e}")
+            data = await self._get_json(self.base_url, params=params)
+        except REQUEST_ERRORS as e:
+            logger.error(f"Error getting Google Play app details: {describe_error(e)}")
             return None
+
+        return data.get("product_result", {})
@@ -0,0 +1,233 @@
+"""
+Shared asynchronous HTTP plumbing for the store clients
+"""
+
+import asyncio
+import atexit
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+import logging
+
+import aiohttp
+import requests
+
+from .jsonstream import JsonArrayStream
+from .ratelimit import RateLimiter, get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "App-Store-Icon-Hunter/2.0"
+
+# Exceptions raised by aiohttp for network, HTTP status and timeout failures
+REQUEST_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+
+def describe_error(error: BaseException) -> str:
+    """
+    Reason a request failed, safe to log and show to API clients
+
+    Request URLs carry API keys in their query string (SerpApi's
+    ``api_key``), and aiohttp and requests repeat the full URL in their
+    messages, so only the HTTP status and the URL without its query are
+    reported, or else the exception class.
+    """
+    if isinstance(error, aiohttp.ClientResponseError):
+        reason = f"HTTP {error.status}"
+        if error.request_info is not None:
+            url = error.request_info.real_url.with_query(None).with_fragment(None)
+            reason += f" from {url}"
+        return reason
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        url = urlsplit(error.response.url)._replace(query="", fragment="").geturl()
+        return f"HTTP {error.response.status_code} from {url}"
+    return type(error).__name__
+
+
+class SharedSession:
+    """
+    aiohttp connection pool shared by every store client
+
+    aiohttp sessions are bound to the event loop that created them, so one
+    ``ClientSession`` is lazily created per running loop and reused for all
+    requests made on that loop.
+    """
+
+    CHUNK_SIZE = 65536  # Bytes read per step when streaming a body
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 20, timeout: float = 10,
+                 rate_limiter: Optional[RateLimiter] = None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self._sessions = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self) -> aiohttp.ClientSession:
+        """Return the session for the running event loop, creating it if needed"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._sessions.get(loop)
+            if session is None or session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.limit, limit_per_host=self.limit_per_host
+                )
+                session = aiohttp.ClientSession(
+                    connector=connector,
+                    headers={"User-Agent": USER_AGENT},
+                    timeout=aiohttp.ClientTimeout(total=self.timeout),
+                )
+                self._sessions[loop] = session
+        return session
+
+    async def get_json(self, url: str, params: Optional[Dict] = None,
+                       timeout: Optional[float] = None) -> Any:
+        """
+        GET a URL and decode the JSON body
+
+        Args:
+            url: Request URL
+            params: Query string parameters
+            timeout: Optional per-request timeout in seconds
+
+        Returns:
+            Decoded JSON document
+
+        Raises:
+            aiohttp.ClientError: On connection or HTTP status errors
+            asyncio.TimeoutError: When the request exceeds the timeout
+        """
+        async with self._request(url, params, timeout) as response:
+            # iTunes answers with text/javascript, so skip the content type check
+            return await response.json(content_type=None)
+
+    async def get_json_array(self, url: str, key: str, params: Optional[Dict] = None,
+                             fields: Optional[Iterable[str]] = None,
+                             timeout: Optional[float] = None) -> List[Dict]:
+        """
+        GET a URL and stream one array out of the JSON body
+
+        The body is parsed incrementally while it downloads and each item is
+        reduced to ``fields``, so the full document is never held in memory.
+
+        Args:
+            url: Request URL
+            key: Name of the top-level array to extract (e.g. "results")
+            params: Query string parameters
+            fields: Item keys to keep (None keeps whole items)
+            timeout: Optional per-request timeout in seconds
+
+        Returns:
+            Projected array items ([] when the body has no such array)
+
+        Raises:
+            aiohttp.ClientError: On connection or HTTP status errors
+            asyncio.TimeoutError: When the request exceeds the timeout
+            ValueError: When the body is not a JSON object
+        """
+        return [item async for item in self.iter_json_array(url, key, params, fields, timeout)]
+
+    async def iter_json_array(self, url: str, key: str, params: Optional[Dict] = None,
+                              fields: Optional[Iterable[str]] = None,
+                              timeout: Optional[float] = None) -> AsyncIterator[Dict]:
+        """
+        Like :meth:`get_json_array`, but yield each item as soon as it is parsed
+
+        Raises:
+            aiohttp.ClientError: On connection or HTTP status errors
+            asyncio.TimeoutError: When the request exceeds the timeout
+            ValueError: When the body is not a JSON object
+        """
+        async with self._request(url, params, timeout) as response:
+            stream = JsonArrayStream(key, fields)
+            async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+                for item in stream.feed(chunk):
+                    yield item
+            for item in stream.close():
+                yield item
+
+    @asynccontextmanager
+    async def _request(self, url: str, params: Optional[Dict], timeout: Optional[float]):
+        """Issue a rate-limited GET and yield the successful response"""
+        kwargs = {}
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+
+        await self.rate_limiter.acquire(url)
+        async with self.get().get(url, params=params, **kwargs) as response:
+            self.rate_limiter.record(url, response.status, response.headers.get("Retry-After"))
+            response.raise_for_status()
+            yield response
+
+    async def close(self) -> None:
+        """Close the session belonging to the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
+
+
+class _SyncRunner:
+    """Background event loop used to drive async clients from blocking code"""
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="icon-hunter-sync-loop",
+                    daemon=True,
+                )
+                thread.start()
+        return self._loop
+
+    def run(self, coro):
+        """Run a coroutine on the background loop and wait for its result"""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def shutdown(self) -> None:
+        """Close the shared session on the background loop and stop it"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(
+                get_shared_session().close(), loop
+            ).result(timeout=5)
+        except Exception as e:
+            logger.debug(f"Error closing shared session: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+
+
+_shared_session: Optional[SharedSession] = None
+_sync_runner = _SyncRunner()
+atexit.register(_sync_runner.shutdown)
+
+
+def get_shared_session() -> SharedSession:
+    """Return the process-wide shared session"""
+    global _shared_session
+    if _shared_session is None:
+        _shared_session = SharedSession()
+    return _shared_session
+
+
+def run_sync(coro):
+    """
+    Run a coroutine to completion from synchronous code
+
+    The coroutine runs on a long-lived background loop, so connections in the
+    shared pool are kept alive between blocking calls.
+    """
+    return _sync_runner.run(coro)
@@ -0,0 +1,112 @@
+"""
+HTTP validators for conditional icon requests
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ValidatorCache:
+    """
+    Disk-backed record of the ``ETag`` / ``Last-Modified`` of each icon URL
+
+    Together with the digest of the bytes last downloaded from the URL
+    (kept in the :class:`~.blobstore.BlobStore`), this lets the downloader
+    ask the CDN whether an icon changed instead of downloading it again:
+    a ``304 Not Modified`` answer means the stored blob, and every size
+    rendered from it, can be reused.
+
+    Args:
+        path: SQLite database file (``":memory:"`` to keep validators per process)
+    """
+
+    def __init__(self, path: Union[str, Path] = ":memory:"):
+        self.path = None if str(path) == ":memory:" else Path(path)
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            str(self.path) if self.path else ":memory:", timeout=5, check_same_thread=False
+        )
+        with self._db:
+            if self.path is not None:
+                self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS validators (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    digest TEXT NOT NULL,
+                    checked_at REAL NOT NULL
+                )"""
+            )
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Return the stored validators and digest for ``url``, if any"""
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT etag, last_modified, digest FROM validators WHERE url = ?", (url,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Validator cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "digest": row[2]}
+
+    def put(self, url: str, digest: str, etag: Optional[str] = None,
+            last_modified: Optional[str] = None) -> None:
+        """
+        Remember the validators a response carried
+
+        Responses without an ``ETag`` or ``Last-Modified`` cannot be
+        revalidated, so any stored entry for the URL is dropped instead.
+        """
+        try:
+            with self._lock, self._db:
+                if etag or last_modified:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO validators VALUES (?, ?, ?, ?, ?)",
+                        (url, etag, last_modified, digest, time.time()),
+                    )
+                else:
+                    self._db.execute("DELETE FROM validators WHERE url = ?", (url,))
+        except sqlite3.Error as e:
+            logger.warning(f"Validator cache write failed: {e}")
+
+    def touch(self, url: str) -> None:
+        """Record that ``url`` was just revalidated"""
+        try:
+            with self._lock, self._db:
+                self._db.execute(
+                    "UPDATE validators SET checked_at = ? WHERE url = ?", (time.time(), url)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Validator cache write failed: {e}")
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+        """Request headers that make a request conditional on ``entry``"""
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def stats(self) -> Dict:
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM validators").fetchone()[0]
+        return {"path": str(self.path) if self.path else None, "urls": count}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,438 @@
+"""
+Icon decoding, resizing and encoding off the event loop
+"""
+
+import asyncio
+import io
+import os
+import threading
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import logging
+
+from PIL import Image
+
+try:
+    from PIL import ImageCms
+except ImportError:  # Pillow built without LittleCMS
+    ImageCms = None
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KINDS = ("thread", "process")
+
+# Resize profiles: (filter, reducing_gap, cascade_ratio). A size is resampled
+# from the smallest already rendered output at least cascade_ratio times
+# larger (None always resamples the original). reducing_gap lets Pillow
+# shrink by an integer factor with a cheap box filter first (None disables).
+RESIZE_QUALITIES = {
+    "best": (Image.Resampling.LANCZOS, None, None),
+    "balanced": (Image.Resampling.LANCZOS, 3.0, 2),
+    "fast": (Image.Resampling.BICUBIC, 2.0, 1),
+}
+DEFAULT_RESIZE_QUALITY = "balanced"
+
+# Encoder profiles: Pillow save() options per output format, and the largest
+# size written as an indexed PNG. 'exact' sizes become indexed only when they
+# have at most 256 colors (lossless); 'lossy' sizes are quantized to 256
+# colors otherwise. WebP is lossless; Pillow encodes AVIF through YUV, so AVIF
+# is high-quality lossy with full-resolution chroma.
+ENCODER_PROFILES = {
+    "fast": {
+        "png": {"compress_level": 1},
+        "webp": {"lossless": True, "quality": 0, "method": 0},
+        "avif": {"quality": 90, "subsampling": "4:4:4", "speed": 10},
+        "palette": {"exact": 0, "lossy": 0},
+    },
+    "balanced": {
+        "png": {"compress_level": 6},
+        "webp": {"lossless": True, "quality": 80, "method": 4},
+        "avif": {"quality": 90, "subsampling": "4:4:4", "speed": 6},
+        "palette": {"exact": 0, "lossy": 0},
+    },
+    "smallest": {
+        "png": {"optimize": True},
+        "webp": {"lossless": True, "quality": 100, "method": 4},
+        "avif": {"quality": 90, "subsampling": "4:4:4", "speed": 5},
+        "palette": {"exact": 1024, "lossy": 48},
+    },
+}
+DEFAULT_ENCODER = "balanced"
+IMAGE_FORMATS = ("png", "webp", "avif")
+_PIL_FORMATS = {"png": "PNG", "webp": "WEBP", "avif": "AVIF"}
+_SRGB = ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")) if ImageCms else None
+
+
+def validate_encoding(encoder: str, fmt: str) -> None:
+    """
+    Check an encoder profile and output format can be used
+
+    Raises:
+        ValueError: If either is unknown, or Pillow cannot write the format
+    """
+    if encoder not in ENCODER_PROFILES:
+        raise ValueError(f"Unknown encoder profile '{encoder}'; expected one of {tuple(ENCODER_PROFILES)}")
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(f"Unknown image format '{fmt}'; expected one of {IMAGE_FORMATS}")
+    Image.init()
+    if _PIL_FORMATS[fmt] not in Image.SAVE:
+        raise ValueError(f"This Pillow build cannot write {fmt.upper()} images")
+
+
+def _to_srgb(image: Image.Image) -> Image.Image:
+    """Convert an image with an embedded ICC profile to sRGB and drop the profile"""
+    icc = image.info.get("icc_profile")
+    if not icc:
+        return image
+    if ImageCms is None:
+        logger.debug("Pillow has no color management, dropping ICC profile unconverted")
+        return image
+    if image.mode not in ("RGB", "RGBA", "CMYK", "L"):
+        image = image.convert("RGBA")
+    try:
+        source = ImageCms.ImageCmsProfile(io.BytesIO(icc))
+        converted = ImageCms.profileToProfile(
+            image, source, _SRGB, outputMode="RGBA" if image.mode == "RGBA" else "RGB"
+        )
+    except (ImageCms.PyCMSError, OSError) as e:
+        logger.debug(f"Ignoring unusable ICC profile: {e}")
+        converted = image.copy()
+    converted.info = {}
+    return converted
+
+
+def _to_palette(image: Image.Image, lossy: bool) -> Optional[Image.Image]:
+    """Indexed copy of an RGB(A) image, or None if it has too many colors for a lossless one"""
+    colors = image.getcolors(256) if image.mode in ("RGB", "RGBA") else None
+    if colors is None:
+        if not lossy:
+            return None
+        return image.quantize(256, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+    # Pillow's octree keeps every color when there are few of them (flat icons)
+    indexed = image.quantize(len(colors), method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+    if indexed.convert(image.mode).tobytes() == image.tobytes():
+        return indexed
+    # Otherwise look each pixel up as one 32-bit RGBA word
+    palette = [bytes(color) for _, color in colors]
+    alpha = b"" if image.mode == "RGBA" else b"\xff"
+    index = {int.from_bytes(color + alpha, sys.byteorder): i for i, color in enumerate(palette)}
+    pixels = memoryview(image.convert("RGBA").tobytes()).cast("I")
+    indexed = Image.frombytes("P", image.size, bytes(map(index.__getitem__, pixels)))
+    indexed.putpalette(b"".join(palette), image.mode)
+    return indexed
+
+
+def encode_icon(image: Image.Image, path: Union[Path, IO[bytes]], encoder: str = DEFAULT_ENCODER,
+                fmt: str = "png") -> None:
+    """
+    Write one icon size with an encoder profile
+
+    Metadata (text chunks, EXIF, ICC profiles) is never written; callers
+    convert colors to sRGB first (see :func:`render_icon_sizes`).
+    """
+    profile = ENCODER_PROFILES[encoder]
+    if fmt == "png":
+        size = max(image.size)
+        palette = profile["palette"]
+        if size <= max(palette["exact"], palette["lossy"]):
+            indexed = _to_palette(image, lossy=size <= palette["lossy"])
+            if indexed is not None:
+                image = indexed
+    image.save(path, _PIL_FORMATS[fmt], **profile[fmt])
+
+
+def open_icon(image_data: bytes, sizes: Iterable[int],
+              quality: str = DEFAULT_RESIZE_QUALITY) -> Tuple[Image.Image, bool]:
+    """
+    Decode a source icon once for rendering ``sizes``
+
+    JPEG sources are decoded at a reduced scale (except for 'best') when
+    every size allows it. Colors are converted to sRGB when the source has
+    an ICC profile, and metadata is dropped.
+
+    Returns:
+        The RGBA image, and whether the source is a PNG without color
+        profile or EXIF, whose bytes can be written out as is at its own size
+    """
+    image = Image.open(io.BytesIO(image_data))
+    plain_png = image.format == "PNG" and not {"icc_profile", "exif"} & set(image.info)
+    if image.format == "JPEG" and quality != "best":
+        # Let libjpeg scale by 1/2, 1/4 or 1/8 while decoding
+        largest = max(sizes)
+        image.draft("RGB", (largest, largest))
+    image = _to_srgb(image)
+    if image.mode != "RGBA":
+        image = image.convert("RGBA")
+    image.info = {}
+    return image, plain_png
+
+
+def cascade_sizes(image: Image.Image, sizes: Iterable[int],
+                  quality: str = DEFAULT_RESIZE_QUALITY) -> Iterator[Tuple[int, Image.Image]]:
+    """
+    Resample ``image`` to every size, largest first
+
+    Smaller sizes are resampled from an already rendered one instead of the
+    original where the resize profile allows it (a mip-style cascade). A
+    size equal to the image's own is yielded as the image itself.
+
+    Raises:
+        ValueError: If ``quality`` is unknown
+    """
+    if quality not in RESIZE_QUALITIES:
+        raise ValueError(f"Unknown resize quality '{quality}'; expected one of {tuple(RESIZE_QUALITIES)}")
+    resample, reducing_gap, cascade_ratio = RESIZE_QUALITIES[quality]
+    rendered = []  # (size, image), largest first
+    for size in sorted(set(sizes), reverse=True):
+        if image.size == (size, size):
+            resized = image
+        else:
+            base = image
+            if cascade_ratio is not None:
+                for rendered_size, rendered_image in reversed(rendered):
+                    if rendered_size >= size * cascade_ratio:
+                        base = rendered_image
+                        break
+            resized = base.resize((size, size), resample, reducing_gap=reducing_gap)
+        rendered.append((size, resized))
+        yield size, resized
+
+
+def render_icon_sizes(image_data: bytes, output_dir: str, sizes: Iterable[int],
+                      quality: str = DEFAULT_RESIZE_QUALITY, encoder: str = DEFAULT_ENCODER,
+                      fmt: str = "png") -> List[str]:
+    """
+    Write ``icon_{size}x{size}.{fmt}`` for every size
+
+    Sizes are rendered largest first so smaller ones can be resampled from
+    an already rendered output instead of the original (a mip-style
+    cascade). JPEG sources are decoded at a reduced scale when every size
+    is much smaller, and a PNG source without color profile or EXIF that
+    already has a requested size is written out unchanged for PNG output.
+    Sources with an ICC profile are converted to sRGB, and no metadata is
+    written.
+
+    Args:
+        image_data: Encoded source icon
+        output_dir: Directory the files are written to
+        sizes: Square sizes to generate
+        quality: 'best' (every size from the original with LANCZOS),
+            'balanced' or 'fast'
+        encoder: Encoder profile, 'fast', 'balanced' or 'smallest' (see
+            ``ENCODER_PROFILES``)
+        fmt: Output format, 'png', 'webp' or 'avif'
+
+    Returns:
+        Paths of the written files, in the order of ``sizes``
+
+    Raises:
+        ValueError: If ``quality``, ``encoder`` or ``fmt`` is unknown
+    """
+    if quality not in RESIZE_QUALITIES:
+        raise ValueError(f"Unknown resize quality '{quality}'; expected one of {tuple(RESIZE_QUALITIES)}")
+    validate_encoding(encoder, fmt)
+    wanted = list(dict.fromkeys(sizes))
+    if not wanted:
+        return []
+
+    image, plain_png = open_icon(image_data, wanted, quality)
+    paths = {}
+    for size, resized in cascade_sizes(image, wanted, quality):
+        output_path = Path(output_dir) / f"icon_{size}x{size}.{fmt}"
+        paths[size] = str(output_path)
+        if resized is image and plain_png and fmt == "png":
+            output_path.write_bytes(image_data)
+        else:
+            encode_icon(resized, output_path, encoder, fmt)
+
+    return [paths[size] for size in wanted]
+
+
+def _timed(task: Callable, image_data: bytes, *args) -> Tuple[Any, float]:
+    started = time.perf_counter()
+    result = task(image_data, *args)
+    return result, time.perf_counter() - started
+
+
+def _timed_shared(task: Callable, name: str, length: int, *args) -> Tuple[Any, float]:
+    """Process pool entry point: read the source icon from shared memory"""
+    started = time.perf_counter()
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        image_data = bytes(block.buf[:length])
+    finally:
+        block.close()
+    result = task(image_data, *args)
+    return result, time.perf_counter() - started
+
+
+class ProcessingStats:
+    """
+    Parallelism achieved while processing a batch of images
+
+    ``busy_seconds`` adds up how long each image took to process;
+    ``wall_seconds`` is how long at least one image was being processed.
+    Their ratio is the speedup over processing the same images one by one,
+    bounded by the pool's worker count and the machine's cores. ``reused``
+    counts images whose sizes were all rendered before and were not
+    processed again, and ``failed_sizes`` the sizes that could not be
+    rendered.
+    """
+
+    def __init__(self, kind: str, workers: int):
+        self.kind = kind
+        self.workers = workers
+        self.images = 0
+        self.reused = 0
+        self.failed_sizes = 0
+        self.busy_seconds = 0.0
+        self.wall_seconds = 0.0
+        self._active = 0
+        self._since = 0.0
+
+    def started(self) -> None:
+        if self._active == 0:
+            self._since = time.perf_counter()
+        self._active += 1
+
+    def finished(self, elapsed: Optional[float]) -> None:
+        self._active -= 1
+        if self._active == 0:
+            self.wall_seconds += time.perf_counter() - self._since
+        if elapsed is not None:
+            self.images += 1
+            self.busy_seconds += elapsed
+
+    def to_dict(self) -> Dict:
+        wall = self.wall_seconds
+        if self._active:
+            wall += time.perf_counter() - self._since
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "images": self.images,
+            "reused": self.reused,
+            "failed_sizes": self.failed_sizes,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "wall_seconds": round(wall, 3),
+            "speedup": round(self.busy_seconds / wall, 2) if wall > 0 else None,
+        }
+
+
+class ImagePool:
+    """
+    Worker pool that runs icon processing away from the event loop
+
+    Pillow releases the GIL while resampling and compressing, so the default
+    thread pool already scales across cores. A process pool also parallelizes
+    the Python-level work; source bytes then reach the workers through
+    ``multiprocessing.shared_memory`` instead of being pickled into the task.
+
+    Args:
+        kind: 'thread' or 'process'
+        workers: Pool size (defaults to the CPU count)
+    """
+
+    def __init__(self, kind: str = "thread", workers: Optional[int] = None):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown image executor '{kind}'; expected one of {EXECUTOR_KINDS}")
+        if workers is not None and workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix="icon-render")
+            return self._executor
+
+    async def render(self, image_data: bytes, output_dir: Path, sizes: List[int],
+                     quality: str = DEFAULT_RESIZE_QUALITY, encoder: str = DEFAULT_ENCODER,
+                     fmt: str = "png") -> Tuple[List[str], float]:
+        """
+        Generate icon sizes on the pool
+
+        Args:
+            image_data: Encoded source icon
+            output_dir: Directory the files are written to
+            sizes: Square sizes to generate
+            quality: Resize profile (see :func:`render_icon_sizes`)
+            encoder: Encoder profile
+            fmt: Output format
+
+        Returns:
+            Written file paths and the seconds the worker spent on them
+        """
+        return await self.run(render_icon_sizes, image_data, str(output_dir), list(sizes),
+                              quality, encoder, fmt)
+
+    async def run(self, task: Callable, image_data: bytes, *args) -> Tuple[Any, float]:
+        """
+        Run ``task(image_data, *args)`` on the pool
+
+        ``task`` must be a module-level function so process pools can pickle
+        it; ``image_data`` reaches process workers through shared memory.
+
+        Returns:
+            The task's result and the seconds the worker spent on it
+        """
+        loop = asyncio.get_running_loop()
+        if self.kind == "thread":
+            return await loop.run_in_executor(self.executor, _timed, task, image_data, *args)
+
+        block = shared_memory.SharedMemory(create=True, size=max(len(image_data), 1))
+        try:
+            block.buf[:len(image_data)] = image_data
+            return await loop.run_in_executor(
+                self.executor, _timed_shared, task, block.name, len(image_data), *args
+            )
+        finally:
+            block.close()
+            block.unlink()
+
+    def stats(self) -> Dict:
+        return {"executor": self.kind, "workers": self.workers}
+
+    def close(self) -> None:
+        """Shut the workers down; the pool is recreated if used again"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+def image_pool_from_env() -> ImagePool:
+    """
+    Build an ImagePool from ``ICON_HUNTER_IMAGE_EXECUTOR`` and ``ICON_HUNTER_IMAGE_WORKERS``
+
+    Invalid values are logged and replaced by the defaults (a thread pool
+    sized to the CPU count).
+    """
+    kind = os.getenv("ICON_HUNTER_IMAGE_EXECUTOR", "thread").strip().lower()
+    workers = os.getenv("ICON_HUNTER_IMAGE_WORKERS")
+    try:
+        return ImagePool(kind, int(workers) if workers else None)
+    except ValueError as e:
+        logger.warning(f"Invalid image pool settings, using a thread pool: {e}")
+        return ImagePool()
+
+
+def resize_quality_from_env() -> str:
+    """Read ``ICON_HUNTER_RESIZE_QUALITY``, falling back to the default when unset or invalid"""
+    quality = os.getenv("ICON_HUNTER_RESIZE_QUALITY", DEFAULT_RESIZE_QUALITY).strip().lower()
+    if quality not in RESIZE_QUALITIES:
+        logger.warning(f"Unknown resize quality '{quality}', using '{DEFAULT_RESIZE_QUALITY}'")
+        return DEFAULT_RESIZE_QUALITY
+    return quality
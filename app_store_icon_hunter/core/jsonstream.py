@@ -0,0 +1,193 @@
+"""
+Incremental parsing of the result arrays in upstream JSON responses
+"""
+
+import codecs
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_SCALAR_ENDS = frozenset(" \t\n\r,]}")  # Characters that can follow a complete number or literal
+
+
+class JsonArrayStream:
+    """
+    Push parser that extracts one array from a JSON object as bytes arrive
+
+    Upstream search responses are a top-level object whose bulk is a single
+    array (``results`` for iTunes, ``organic_results`` for SerpApi). Instead
+    of decoding the whole body at once, chunks are fed as they are read from
+    the socket and each array item is decoded on its own with the C-accelerated
+    ``json`` scanner, then reduced to ``fields``. Only the current item and
+    the projected items are ever held in memory, and everything after the
+    array is skipped without being decoded.
+
+    Example:
+        stream = JsonArrayStream("results", fields=("trackName",))
+        for chunk in chunks:
+            items.extend(stream.feed(chunk))
+        items.extend(stream.close())
+    """
+
+    # Parser states
+    OBJECT_START = 0      # Expecting the opening '{'
+    KEY = 1               # Expecting a key or the closing '}'
+    COLON = 2             # Expecting ':' after a key
+    VALUE = 3             # Expecting a value that is skipped
+    ARRAY_START = 4       # Expecting the '[' of the wanted array
+    ITEM = 5              # Expecting an array item or ']'
+    ITEM_SEPARATOR = 6    # Expecting ',' or ']' after an item
+    MEMBER_SEPARATOR = 7  # Expecting ',' or '}' after a skipped value
+    DONE = 8
+
+    def __init__(self, key: str, fields: Optional[Iterable[str]] = None):
+        self.key = key
+        self.fields = tuple(fields) if fields is not None else None
+        self.found = False
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._state = self.OBJECT_START
+        self._current_key = None
+        self._retry_at = 0  # Buffer size needed before retrying an incomplete value
+
+    def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        """
+        Consume the next chunk of the response body
+
+        Args:
+            chunk: Raw bytes, split anywhere (including inside UTF-8 sequences)
+
+        Returns:
+            Array items completed by this chunk, projected to ``fields``
+
+        Raises:
+            ValueError: If the document is not a JSON object
+        """
+        if self._state == self.DONE:
+            return []
+        self._buffer += self._utf8.decode(chunk)
+        items = self._parse(final=False)
+        # Drop consumed text so the buffer never grows beyond one value
+        self._buffer = self._buffer[self._pos:]
+        self._retry_at -= self._pos
+        self._pos = 0
+        return items
+
+    def close(self) -> List[Dict[str, Any]]:
+        """
+        Finish parsing once the body has been read completely
+
+        Returns:
+            Any remaining array items
+
+        Raises:
+            ValueError: If the document is truncated or malformed
+        """
+        if self._state == self.DONE:
+            return []
+        self._buffer += self._utf8.decode(b"", final=True)
+        items = self._parse(final=True)
+        if self._state != self.DONE:
+            raise ValueError("Truncated JSON document")
+        return items
+
+    def _parse(self, final: bool) -> List[Dict[str, Any]]:
+        items = []
+        buffer = self._buffer
+        while self._state != self.DONE:
+            pos = _WHITESPACE.match(buffer, self._pos).end()
+            if pos >= len(buffer):
+                self._pos = pos
+                break
+            char = buffer[pos]
+            state = self._state
+
+            if state in (self.KEY, self.VALUE, self.ITEM) and not (
+                (state == self.KEY and char == "}") or (state == self.ITEM and char == "]")
+            ):
+                # Decoding a value needs all of it; wait for more data when
+                # it is cut off, but only retry once the buffer has doubled
+                # so a large value is not rescanned for every small chunk
+                if not final and len(buffer) < self._retry_at:
+                    self._pos = pos
+                    break
+                try:
+                    value, end = self._decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise ValueError(f"Malformed JSON at offset {pos}") from None
+                    self._pos = pos
+                    self._retry_at = pos + 2 * (len(buffer) - pos)
+                    break
+                if (not final and not isinstance(value, (dict, list, str))
+                        and (end >= len(buffer) or buffer[end] not in _SCALAR_ENDS)):
+                    # A number or literal is complete only once a delimiter
+                    # follows it: "1." or "1e" may still grow into 1.5 or 1e3
+                    self._pos = pos
+                    self._retry_at = len(buffer) + 1
+                    break
+                self._pos = end
+                self._retry_at = 0
+                if state == self.KEY:
+                    if not isinstance(value, str):
+                        raise ValueError(f"Expected an object key at offset {pos}")
+                    self._current_key = value
+                    self._state = self.COLON
+                elif state == self.VALUE:
+                    self._state = self.MEMBER_SEPARATOR
+                else:
+                    items.append(self._project(value))
+                    self._state = self.ITEM_SEPARATOR
+                continue
+
+            self._pos = pos + 1
+            if state == self.OBJECT_START and char == "{":
+                self._state = self.KEY
+            elif state == self.KEY:  # char == "}"
+                self._state = self.DONE
+            elif state == self.COLON and char == ":":
+                self._state = self.ARRAY_START if self._current_key == self.key else self.VALUE
+            elif state == self.ARRAY_START:
+                if char != "[":
+                    raise ValueError(f"Expected '{self.key}' to be an array")
+                self.found = True
+                self._state = self.ITEM
+            elif state == self.ITEM:  # char == "]"
+                self._state = self.DONE
+            elif state == self.ITEM_SEPARATOR and char in ",]":
+                self._state = self.ITEM if char == "," else self.DONE
+            elif state == self.MEMBER_SEPARATOR and char in ",}":
+                self._state = self.KEY if char == "," else self.DONE
+            else:
+                raise ValueError(f"Unexpected {char!r} at offset {pos}")
+        return items
+
+    def _project(self, item: Any) -> Any:
+        if self.fields is None or not isinstance(item, dict):
+            return item
+        return {field: item[field] for field in self.fields if field in item}
+
+
+def parse_array(data: bytes, key: str, fields: Optional[Iterable[str]] = None,
+                chunk_size: int = 65536) -> List[Dict[str, Any]]:
+    """
+    Extract and project one array from a complete JSON document
+
+    Args:
+        data: Encoded JSON object
+        key: Name of the array member to extract
+        fields: Item keys to keep (None keeps whole items)
+        chunk_size: Bytes fed to the parser at a time
+
+    Returns:
+        Projected array items, or [] when the key is missing
+    """
+    stream = JsonArrayStream(key, fields)
+    items = []
+    for start in range(0, len(data), chunk_size):
+        items.extend(stream.feed(data[start:start + chunk_size]))
+    items.extend(stream.close())
+    return items
@@ -0,0 +1,260 @@
+"""
+Cross-store matching of App Store and Google Play records for the same product
+"""
+
+import re
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+from .autocomplete import normalize_text
+from .models import AppRecord
+
+logger = logging.getLogger(__name__)
+
+# Words that say nothing about which product an app is
+GENERIC_WORDS = frozenset({
+    "app", "apps", "the", "for", "and", "free", "lite", "hd", "mobile", "official",
+    "new", "plus", "pro", "by", "of", "a", "an",
+})
+# Legal suffixes stripped from developer names
+COMPANY_SUFFIXES = frozenset({
+    "inc", "llc", "ltd", "limited", "gmbh", "co", "corp", "corporation", "company",
+    "sa", "sas", "srl", "bv", "ab", "oy", "plc", "pty", "ag", "kg", "kk", "as",
+})
+
+_BITS = 512  # Width of the trigram fingerprints
+_HEX_HASH = re.compile(r"^[0-9a-fA-F]{1,16}$")
+
+try:
+    _popcount = int.bit_count  # Python 3.10+
+except AttributeError:  # pragma: no cover - older interpreters
+    def _popcount(value: int) -> int:
+        return bin(value).count("1")
+
+
+def _fingerprint(text: str) -> int:
+    """Set of character trigrams hashed into a ``_BITS``-wide integer bitmap"""
+    padded = f"  {text} "
+    bits = 0
+    for trigram in {padded[i:i + 3] for i in range(len(padded) - 2)}:
+        bits |= 1 << (hash(trigram) % _BITS)
+    return bits
+
+
+def _jaccard(a: int, b: int) -> float:
+    union = _popcount(a | b)
+    return _popcount(a & b) / union if union else 0.0
+
+
+def dhash(image, size: int = 8) -> int:
+    """
+    Difference hash of an icon for :class:`CrossStoreMatcher`
+
+    Args:
+        image: PIL image
+        size: Hash is ``size * size`` bits
+
+    Returns:
+        Perceptual hash as an integer (store it as ``icon_hash``)
+    """
+    pixels = list(image.convert("L").resize((size + 1, size)).getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+class _Features:
+    """Normalized matching features of one record"""
+
+    __slots__ = ("record", "name", "name_bits", "name_count", "developer",
+                 "developer_bits", "bundle_id", "icon_hash", "blocks")
+
+    def __init__(self, record: AppRecord):
+        words = normalize_text(record.get("name", "")).split()
+        significant = [word for word in words if word not in GENERIC_WORDS] or words
+        developer = [word for word in normalize_text(record.get("developer", "")).split()
+                     if word not in COMPANY_SUFFIXES]
+
+        self.record = record
+        self.name = " ".join(significant)
+        self.name_bits = _fingerprint(self.name)
+        self.name_count = _popcount(self.name_bits)
+        self.developer = " ".join(developer)
+        self.developer_bits = _fingerprint(self.developer) if developer else 0
+        self.bundle_id = (record.get("bundle_id") or "").lower()
+        self.icon_hash = self._icon_hash(record.get("icon_hash"))
+
+        # Candidate pairs must share at least one block key
+        self.blocks = set()
+        if significant:
+            self.blocks.add(("name", significant[0]))
+        if developer:
+            self.blocks.add(("developer", self.developer))
+        if self.bundle_id:
+            self.blocks.add(("bundle", self.bundle_id))
+
+    @staticmethod
+    def _icon_hash(value) -> Optional[int]:
+        if isinstance(value, int):
+            return value
+        if isinstance(value, str) and _HEX_HASH.match(value):
+            return int(value, 16)
+        return None
+
+
+class CrossStoreMatcher:
+    """
+    Pair App Store and Google Play records that describe the same product
+
+    Records are grouped into blocks by their first significant name word,
+    their developer (without legal suffixes) and their bundle ID, and only
+    records sharing a block are compared, which keeps the work close to
+    linear instead of comparing every pair. Names and developers are
+    compared as trigram sets packed into integer bitmaps, so a similarity is
+    one AND, one OR and two popcounts. When both records carry an
+    ``icon_hash`` (see :func:`dhash`), icon similarity is blended in.
+    Identical bundle IDs count as a near-certain match. Each record is paired
+    at most once, best scores first.
+
+    Args:
+        min_score: Lowest score (0-1) accepted as a match
+        max_block_pairs: Blocks that would produce more comparisons than
+            this are skipped (a word shared by thousands of apps is not
+            evidence of anything)
+    """
+
+    NAME_WEIGHT = 0.6
+    DEVELOPER_WEIGHT = 0.3
+    ICON_WEIGHT = 0.1
+    SAME_BUNDLE_SCORE = 0.95
+
+    def __init__(self, min_score: float = 0.75, max_block_pairs: int = 250_000):
+        self.min_score = min_score
+        self.max_block_pairs = max_block_pairs
+        self.last_stats = {}
+
+    def match(self, records: Iterable[AppRecord]) -> List[Tuple[AppRecord, AppRecord, float]]:
+        """
+        Find cross-store pairs
+
+        Args:
+            records: App Store and Google Play records, in any order
+
+        Returns:
+            ``(app_store_record, google_play_record, score)`` tuples, best first
+        """
+        started = time.monotonic()
+        sides = {"appstore": [], "googleplay": []}
+        for record in records:
+            side = sides.get(record.get("store"))
+            if side is not None:
+                side.append(_Features(record))
+
+        blocks = defaultdict(lambda: ([], []))
+        for index, side in enumerate(("appstore", "googleplay")):
+            for position, features in enumerate(sides[side]):
+                for key in features.blocks:
+                    blocks[key][index].append(position)
+
+        appstore, googleplay = sides["appstore"], sides["googleplay"]
+        stride = len(googleplay)
+        # Lowest name similarity that can still reach min_score when every
+        # other signal matches perfectly
+        name_floor = (self.min_score - (1 - self.NAME_WEIGHT)) / self.NAME_WEIGHT
+        compared = set()
+        candidates = []
+        skipped = 0
+        for left, right in blocks.values():
+            if not left or not right:
+                continue
+            if len(left) * len(right) > self.max_block_pairs:
+                skipped += 1
+                continue
+            for i in left:
+                a = appstore[i]
+                a_bits, a_count = a.name_bits, a.name_count
+                base = i * stride
+                for j in right:
+                    if base + j in compared:
+                        continue
+                    compared.add(base + j)
+                    b = googleplay[j]
+                    # Name similarity first: it bounds the final score, so
+                    # most pairs are rejected after one AND and one popcount
+                    common = _popcount(a_bits & b.name_bits)
+                    name_similarity = common / (a_count + b.name_count - common)
+                    if name_similarity < name_floor and a.bundle_id != b.bundle_id:
+                        continue
+                    score = self._score(a, b, name_similarity)
+                    if score >= self.min_score:
+                        candidates.append((score, i, j))
+
+        # Greedy one-to-one assignment, best scores first
+        pairs = []
+        used_left = set()
+        used_right = set()
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        for score, i, j in candidates:
+            if i in used_left or j in used_right:
+                continue
+            used_left.add(i)
+            used_right.add(j)
+            pairs.append((appstore[i].record, googleplay[j].record, score))
+
+        self.last_stats = {
+            "records": len(sides["appstore"]) + len(sides["googleplay"]),
+            "comparisons": len(compared),
+            "skipped_blocks": skipped,
+            "pairs": len(pairs),
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        }
+        if skipped:
+            logger.debug(f"Skipped {skipped} oversized matching blocks")
+        return pairs
+
+    def annotate(self, records: List[AppRecord]) -> List[AppRecord]:
+        """
+        Set ``paired_with`` on every record that has a counterpart in the other store
+
+        ``paired_with`` holds the counterpart's ``store``, ``bundle_id``,
+        ``name`` and the match ``score``.
+
+        Args:
+            records: Records to match and annotate in place
+
+        Returns:
+            The same list
+        """
+        for app_store, google_play, score in self.match(records):
+            app_store["paired_with"] = self._reference(google_play, score)
+            google_play["paired_with"] = self._reference(app_store, score)
+        return records
+
+    def _score(self, a: _Features, b: _Features, name_similarity: float) -> float:
+        if a.bundle_id and a.bundle_id == b.bundle_id:
+            return self.SAME_BUNDLE_SCORE if name_similarity else self.min_score
+
+        score = self.NAME_WEIGHT * name_similarity
+        weight = self.NAME_WEIGHT
+        if a.developer_bits and b.developer_bits:
+            score += self.DEVELOPER_WEIGHT * _jaccard(a.developer_bits, b.developer_bits)
+            weight += self.DEVELOPER_WEIGHT
+        if a.icon_hash is not None and b.icon_hash is not None:
+            score += self.ICON_WEIGHT * (1 - _popcount(a.icon_hash ^ b.icon_hash) / 64)
+            weight += self.ICON_WEIGHT
+        return round(score / weight, 4)
+
+    @staticmethod
+    def _reference(record: AppRecord, score: float) -> Dict:
+        return {
+            "store": record.get("store"),
+            "bundle_id": record.get("bundle_id"),
+            "name": record.get("name"),
+            "score": score,
+        }
@@ -0,0 +1,127 @@
+"""
+Compact record type for standardized app search results
+"""
+
+import sys
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Optional
+
+
+def _intern(value: Optional[str]) -> str:
+    return sys.intern(value) if value else ""
+
+
+class AppRecord(MutableMapping):
+    """
+    Standardized app search result stored in ``__slots__``
+
+    Records behave like the dictionaries the store clients used to return
+    (``app["name"]``, ``app.get("rating")``, ``dict(app)``, ``**app``), but
+    keep the ten standard fields in slots instead of a per-instance dict.
+    Low-cardinality strings (store, category, price) are interned so that
+    thousands of records share one copy. Additional keys, such as the
+    ``countries`` added by sweeps, are kept in a small overflow dict that is
+    only allocated when used.
+
+    Fields are normalized on construction (missing strings become ``""``,
+    ratings become floats), so records always validate against the API
+    response models without a separate conversion step.
+    """
+
+    FIELDS = (
+        "name", "bundle_id", "icon_url", "store", "price", "rating",
+        "description", "developer", "category", "url",
+    )
+    INTERNED = ("store", "category", "price")
+
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, name: str = "", bundle_id: str = "", icon_url: str = "",
+                 store: str = "", price: str = "Free", rating: Optional[float] = None,
+                 description: str = "", developer: str = "", category: str = "",
+                 url: str = "", **extra):
+        self.name = name or ""
+        self.bundle_id = str(bundle_id) if bundle_id else ""
+        self.icon_url = icon_url or ""
+        self.store = _intern(store)
+        self.price = _intern(price if price is not None else "Free")
+        self.rating = self._coerce_rating(rating)
+        self.description = description or ""
+        self.developer = developer or ""
+        self.category = _intern(category)
+        self.url = url or ""
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AppRecord":
+        """Build a record from a standardized app dictionary"""
+        return cls(**data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a plain dictionary (e.g. for JSON serialization)"""
+        return dict(self.items())
+
+    def copy(self) -> "AppRecord":
+        """Return a shallow copy that can be modified independently"""
+        record = AppRecord.__new__(AppRecord)
+        for field in self.FIELDS:
+            setattr(record, field, getattr(self, field))
+        record.extra = dict(self.extra) if self.extra else None
+        return record
+
+    def truncate_description(self, max_length: Optional[int]) -> None:
+        """
+        Shorten the description in place
+
+        Args:
+            max_length: Maximum characters to keep (None keeps everything,
+                0 drops the description)
+        """
+        if max_length is not None and len(self.description) > max_length:
+            self.description = self.description[:max_length]
+
+    @staticmethod
+    def _coerce_rating(rating: Any) -> Optional[float]:
+        if rating is None or rating == "":
+            return None
+        try:
+            return float(rating)
+        except (TypeError, ValueError):
+            return None
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self.FIELDS:
+            if key in self.INTERNED:
+                value = _intern(value)
+            elif key == "rating":
+                value = self._coerce_rating(value)
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in self.FIELDS:
+            raise KeyError(f"Standard field '{key}' cannot be removed")
+        if self.extra is None or key not in self.extra:
+            raise KeyError(key)
+        del self.extra[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.FIELDS
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return len(self.FIELDS) + (len(self.extra) if self.extra else 0)
+
+    def __repr__(self) -> str:
+        return f"AppRecord(store={self.store!r}, bundle_id={self.bundle_id!r}, name={self.name!r})"
@@ -0,0 +1,215 @@
+"""
+Platform icon sets exported from one decoded source icon
+"""
+
+import io
+import json
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image
+
+from .imaging import DEFAULT_ENCODER, DEFAULT_RESIZE_QUALITY, cascade_sizes, encode_icon, open_icon
+
+# Xcode app icon slots: (idiom, size in points, scale)
+IOS_ICONS = [
+    ("iphone", 20, 2), ("iphone", 20, 3), ("iphone", 29, 2), ("iphone", 29, 3),
+    ("iphone", 40, 2), ("iphone", 40, 3), ("iphone", 60, 2), ("iphone", 60, 3),
+    ("ipad", 20, 1), ("ipad", 20, 2), ("ipad", 29, 1), ("ipad", 29, 2),
+    ("ipad", 40, 1), ("ipad", 40, 2), ("ipad", 76, 1), ("ipad", 76, 2), ("ipad", 83.5, 2),
+    ("ios-marketing", 1024, 1),
+]
+ANDROID_DENSITIES = {"mdpi": 48, "hdpi": 72, "xhdpi": 96, "xxhdpi": 144, "xxxhdpi": 192}
+ANDROID_PLAY_STORE = 512
+ICNS_SIZES = [32, 64, 128, 256, 512, 1024]  # Every size Pillow's ICNS writer stores
+ICO_SIZES = [16, 24, 32, 48, 64, 128, 256]
+FAVICON_ICO_SIZES = [16, 32, 48]
+FAVICON_PNGS = {
+    "favicon-16x16.png": 16,
+    "favicon-32x32.png": 32,
+    "android-chrome-192x192.png": 192,
+    "android-chrome-512x512.png": 512,
+}
+APPLE_TOUCH_ICON = 180
+
+
+class _Renders:
+    """
+    Sizes rendered from one source, shared by every preset of an export
+
+    Each size is resampled once, and each PNG file content (size, with or
+    without alpha) is encoded once however many presets write it.
+    """
+
+    def __init__(self, images: Dict[int, Image.Image], encoder: str):
+        self.images = images
+        self.encoder = encoder
+        self._encoded = {}
+
+    def image(self, size: int, opaque: bool = False) -> Image.Image:
+        image = self.images[size]
+        if opaque:
+            # App Store and home screen icons must not be transparent
+            background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+            image = Image.alpha_composite(background, image).convert("RGB")
+        return image
+
+    def write_png(self, path: Path, size: int, opaque: bool = False) -> str:
+        key = (size, opaque)
+        if key not in self._encoded:
+            buffer = io.BytesIO()
+            encode_icon(self.image(size, opaque), buffer, self.encoder)
+            self._encoded[key] = buffer.getvalue()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(self._encoded[key])
+        return str(path)
+
+
+def _ios_pixels(points: float, scale: int) -> int:
+    return round(points * scale)
+
+
+def _export_ios(renders: _Renders, root: Path) -> List[str]:
+    """``ios/AppIcon.appiconset``: every Xcode slot and its ``Contents.json``"""
+    directory = root / "ios" / "AppIcon.appiconset"
+    files, images, written = [], [], set()
+    for idiom, points, scale in IOS_ICONS:
+        pixels = _ios_pixels(points, scale)
+        filename = f"Icon-{pixels}.png"
+        if filename not in written:
+            written.add(filename)
+            files.append(renders.write_png(directory / filename, pixels, opaque=True))
+        images.append({"idiom": idiom, "size": f"{points:g}x{points:g}",
+                       "scale": f"{scale}x", "filename": filename})
+    contents = directory / "Contents.json"
+    contents.write_text(json.dumps({"images": images, "info": {"version": 1, "author": "xcode"}},
+                                   indent=2))
+    return files + [str(contents)]
+
+
+def _export_android(renders: _Renders, root: Path) -> List[str]:
+    """``android/res/mipmap-<density>/ic_launcher.png`` and the Play Store icon"""
+    directory = root / "android"
+    files = [
+        renders.write_png(directory / "res" / f"mipmap-{density}" / "ic_launcher.png", size)
+        for density, size in ANDROID_DENSITIES.items()
+    ]
+    files.append(renders.write_png(directory / "playstore-icon.png", ANDROID_PLAY_STORE))
+    return files
+
+
+def _write_container(renders: _Renders, path: Path, fmt: str, sizes: List[int]) -> str:
+    """ICO or ICNS file holding the already rendered ``sizes``"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    largest = renders.image(max(sizes))
+    others = [renders.image(size) for size in sizes if size != max(sizes)]
+    options = {"sizes": [(size, size) for size in sizes]} if fmt == "ICO" else {}
+    largest.save(path, fmt, append_images=others, **options)
+    return str(path)
+
+
+def _export_icns(renders: _Renders, root: Path) -> List[str]:
+    """``macos/AppIcon.icns``"""
+    return [_write_container(renders, root / "macos" / "AppIcon.icns", "ICNS", ICNS_SIZES)]
+
+
+def _export_ico(renders: _Renders, root: Path) -> List[str]:
+    """``windows/app.ico``"""
+    return [_write_container(renders, root / "windows" / "app.ico", "ICO", ICO_SIZES)]
+
+
+def _export_favicon(renders: _Renders, root: Path) -> List[str]:
+    """``web/``: favicon.ico, PNG favicons, apple-touch-icon.png and site.webmanifest"""
+    directory = root / "web"
+    files = [_write_container(renders, directory / "favicon.ico", "ICO", FAVICON_ICO_SIZES)]
+    files.extend(renders.write_png(directory / name, size) for name, size in FAVICON_PNGS.items())
+    files.append(renders.write_png(directory / "apple-touch-icon.png", APPLE_TOUCH_ICON, opaque=True))
+    manifest = directory / "site.webmanifest"
+    manifest.write_text(json.dumps({
+        "icons": [
+            {"src": f"/{name}", "sizes": f"{size}x{size}", "type": "image/png"}
+            for name, size in FAVICON_PNGS.items() if name.startswith("android-chrome")
+        ],
+    }, indent=2))
+    return files + [str(manifest)]
+
+
+# Preset name -> (pixel sizes it needs, writer)
+PRESETS: Dict[str, Tuple[List[int], Callable[[_Renders, Path], List[str]]]] = {
+    "ios": (sorted({_ios_pixels(points, scale) for _, points, scale in IOS_ICONS}), _export_ios),
+    "android": (sorted(set(ANDROID_DENSITIES.values()) | {ANDROID_PLAY_STORE}), _export_android),
+    "macos-icns": (ICNS_SIZES, _export_icns),
+    "windows-ico": (ICO_SIZES, _export_ico),
+    "web-favicon": (sorted(set(FAVICON_ICO_SIZES) | set(FAVICON_PNGS.values()) | {APPLE_TOUCH_ICON}),
+                    _export_favicon),
+}
+
+
+def parse_presets(value: str) -> List[str]:
+    """
+    Split a comma-separated preset list
+
+    Raises:
+        ValueError: If a name is not a preset
+    """
+    names = list(dict.fromkeys(name.strip().lower() for name in value.split(",") if name.strip()))
+    unknown = [name for name in names if name not in PRESETS]
+    if unknown or not names:
+        raise ValueError(f"Unknown export preset(s) {unknown or value!r}; expected some of {tuple(PRESETS)}")
+    return names
+
+
+def check_preset_format(image_format: Optional[str]) -> None:
+    """
+    Check presets can be exported in ``image_format``
+
+    Preset icon sets are PNG files and ICO or ICNS containers whatever the
+    job's format, so only PNG (or no format) is accepted alongside them.
+
+    Raises:
+        ValueError: If ``image_format`` is set and is not PNG
+    """
+    if image_format not in (None, "png"):
+        raise ValueError(f"Export presets are always PNG and cannot be combined with "
+                         f"image format {image_format!r}")
+
+
+def export_presets(image_data: bytes, output_dir: str, presets: Iterable[str],
+                   quality: str = DEFAULT_RESIZE_QUALITY,
+                   encoder: str = DEFAULT_ENCODER) -> List[str]:
+    """
+    Write platform icon sets from a source icon
+
+    The source is decoded once, and the sizes needed by all presets are
+    rendered once, largest first (see :func:`~.imaging.cascade_sizes`).
+    Each preset writes its own directory under ``output_dir``: ``ios``,
+    ``android``, ``macos``, ``windows`` or ``web``.
+
+    Args:
+        image_data: Encoded source icon
+        output_dir: Directory the preset directories are created in
+        presets: Names from ``PRESETS``
+        quality: Resize profile
+        encoder: Encoder profile for PNG files (ICO and ICNS frames use
+            Pillow's defaults)
+
+    Returns:
+        Paths of the written files
+
+    Raises:
+        ValueError: If a preset is unknown
+    """
+    names = list(dict.fromkeys(presets))
+    unknown = [name for name in names if name not in PRESETS]
+    if unknown:
+        raise ValueError(f"Unknown export preset(s) {unknown}; expected some of {tuple(PRESETS)}")
+    sizes = sorted({size for name in names for size in PRESETS[name][0]})
+    if not sizes:
+        return []
+
+    image, _ = open_icon(image_data, sizes, quality)
+    renders = _Renders(dict(cascade_sizes(image, sizes, quality)), encoder)
+    files = []
+    for name in names:
+        files.extend(PRESETS[name][1](renders, Path(output_dir)))
+    return files
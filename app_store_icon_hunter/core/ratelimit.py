@@ -0,0 +1,290 @@
+"""
+Per-host token-bucket rate limiting with adaptive backoff
+"""
+
+import asyncio
+import os
+import threading
+import time
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Hosts behind each store, so limits can be configured by store name
+STORE_HOSTS = {
+    "appstore": "itunes.apple.com",
+    "googleplay": "serpapi.com",
+}
+
+# (requests per second, burst) keyed by host suffix
+DEFAULT_RATES = {
+    "itunes.apple.com": (20 / 60, 20),  # Apple documents ~20 calls per minute
+    "serpapi.com": (5.0, 5),
+    "mzstatic.com": (50.0, 50),
+    "googleusercontent.com": (50.0, 50),
+}
+
+
+# Seconds the current task (and the tasks it starts) spent waiting for tokens,
+# set by wait_for_excluding_limits
+_limiter_wait: ContextVar[Optional[List[float]]] = ContextVar("limiter_wait", default=None)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header
+
+    Args:
+        value: Header value, either delay seconds or an HTTP date
+
+    Returns:
+        Delay in seconds, or None if missing or unparseable
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket whose rate shrinks when the upstream throttles
+
+    Callers reserve a token and sleep for the returned delay, so waiting
+    works the same from asyncio tasks and from threads. Each throttle
+    response halves the rate (down to ``min_rate``) and pauses the bucket for
+    the Retry-After delay; every success restores a small step of the rate.
+    """
+
+    RECOVERY_STEP = 0.05  # Fraction of the configured rate regained per success
+
+    def __init__(self, rate: float, burst: float = 1, min_rate: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.throttled_count = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how long the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            delay = max(0.0, -self.tokens / self.rate, self.blocked_until - now)
+            self.waited += delay
+            return delay
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        """Record a 403/429 response and back off"""
+        with self._lock:
+            self.throttled_count += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            pause = retry_after if retry_after is not None else 1 / self.rate
+            self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+            # Drop any saved burst so requests resume one at a time, at the
+            # reduced rate, once the pause is over
+            self.tokens = min(self.tokens, 1.0)
+            self.updated = self.blocked_until
+
+    def succeeded(self) -> None:
+        """Record a successful response and recover part of the rate"""
+        if self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self.RECOVERY_STEP)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "rate": round(self.rate, 3),
+                "max_rate": round(self.max_rate, 3),
+                "burst": self.capacity,
+                "throttled": self.throttled_count,
+                "waited_seconds": round(self.waited, 3),
+            }
+
+
+class RateLimiter:
+    """Registry of token buckets, one per upstream host"""
+
+    THROTTLE_STATUSES = (403, 429)
+
+    def __init__(self, rates: Optional[Dict[str, Tuple[float, float]]] = None,
+                 default_rate: Optional[Tuple[float, float]] = (20.0, 20)):
+        self.rates = dict(DEFAULT_RATES)
+        self.default_rate = default_rate
+        self._buckets = {}
+        self._lock = threading.Lock()
+        for name, rate in (rates or {}).items():
+            self.configure(name, *rate)
+
+    def configure(self, name: str, rate: float, burst: Optional[float] = None) -> None:
+        """
+        Set the limit for a store or host
+
+        Args:
+            name: Store name ('appstore', 'googleplay') or host suffix
+            rate: Requests per second
+            burst: Bucket size (default: one second worth of requests)
+        """
+        host = STORE_HOSTS.get(name, name)
+        self.rates[host] = (rate, burst if burst is not None else max(1.0, rate))
+        with self._lock:
+            for bucket_host in [h for h in self._buckets if self._matches(h, host)]:
+                del self._buckets[bucket_host]
+
+    def bucket(self, url: str) -> Optional[TokenBucket]:
+        """Return the bucket for a URL's host, or None if the host is unlimited"""
+        host = (urlsplit(url).hostname or "").lower()
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None and host not in self._buckets:
+                rate = self._rate_for(host)
+                bucket = TokenBucket(*rate) if rate else None
+                self._buckets[host] = bucket
+            return bucket
+
+    async def acquire(self, url: str) -> None:
+        """Wait for permission to request ``url`` from a coroutine"""
+        bucket = self.bucket(url)
+        if bucket is not None:
+            delay = bucket.reserve()
+            if delay > 0:
+                waited = _limiter_wait.get()
+                if waited is not None:
+                    waited[0] += delay
+                await asyncio.sleep(delay)
+
+    def acquire_sync(self, url: str) -> None:
+        """Wait for permission to request ``url`` from blocking code"""
+        bucket = self.bucket(url)
+        if bucket is not None:
+            delay = bucket.reserve()
+            if delay > 0:
+                time.sleep(delay)
+
+    def record(self, url: str, status: int, retry_after: Optional[str] = None) -> None:
+        """
+        Feed a response status back into the host's bucket
+
+        Args:
+            url: Requested URL
+            status: HTTP status code
+            retry_after: Raw Retry-After header value, if any
+        """
+        bucket = self.bucket(url)
+        if bucket is None:
+            return
+        if status in self.THROTTLE_STATUSES:
+            delay = parse_retry_after(retry_after)
+            bucket.throttled(delay)
+            logger.warning(
+                f"{urlsplit(url).hostname} throttled us (HTTP {status}); "
+                f"rate reduced to {bucket.rate:.2f}/s"
+            )
+        elif status < 400:
+            bucket.succeeded()
+
+    def stats(self) -> Dict:
+        """Return per-host bucket state"""
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {host: bucket.stats() for host, bucket in buckets.items() if bucket is not None}
+
+    def _rate_for(self, host: str) -> Optional[Tuple[float, float]]:
+        matches = [suffix for suffix in self.rates if self._matches(host, suffix)]
+        if matches:
+            return self.rates[max(matches, key=len)]
+        return self.default_rate
+
+    @staticmethod
+    def _matches(host: str, suffix: str) -> bool:
+        return host == suffix or host.endswith("." + suffix)
+
+
+async def wait_for_excluding_limits(awaitable: Awaitable, timeout: Optional[float]) -> Any:
+    """
+    Like ``asyncio.wait_for``, but time spent waiting for rate limit tokens
+    does not count against ``timeout``
+
+    Used where many requests to one host are queued on purpose (a country
+    sweep), so the deadline bounds each upstream request rather than its
+    place in the queue. Waits are known when a token is reserved, so the
+    deadline moves out as soon as a request starts waiting.
+
+    Raises:
+        asyncio.TimeoutError: If the work, less its rate limit waits, takes
+            longer than ``timeout``; the work is cancelled
+    """
+    if timeout is None:
+        return await awaitable
+    waited = [0.0]
+    reset = _limiter_wait.set(waited)
+    try:
+        # The task copies the context now, so its waits are added to ``waited``
+        task = asyncio.ensure_future(awaitable)
+    finally:
+        _limiter_wait.reset(reset)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        while not task.done():
+            remaining = started + timeout + waited[0] - loop.time()
+            if remaining <= 0:
+                task.cancel()
+                await asyncio.wait({task})
+                raise asyncio.TimeoutError()
+            await asyncio.wait({task}, timeout=remaining)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    return task.result()
+
+
+def rates_from_env() -> Dict[str, Tuple[float, float]]:
+    """
+    Parse ``ICON_HUNTER_RATE_LIMITS``
+
+    The variable holds comma-separated ``name=rate[:burst]`` entries where
+    name is a store ('appstore', 'googleplay') or host suffix, e.g.
+    ``appstore=0.5:10,mzstatic.com=100``.
+    """
+    rates = {}
+    for entry in os.getenv("ICON_HUNTER_RATE_LIMITS", "").split(","):
+        if "=" not in entry:
+            continue
+        name, _, value = entry.partition("=")
+        rate, _, burst = value.partition(":")
+        try:
+            rates[name.strip()] = (float(rate), float(burst) if burst else max(1.0, float(rate)))
+        except ValueError:
+            logger.warning(f"Ignoring invalid rate limit entry: {entry}")
+    return rates
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter shared by all clients"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter(rates_from_env())
+    return _rate_limiter
@@ -0,0 +1,54 @@
+"""
+Store CDN URLs for icons rendered server-side at a given size
+"""
+
+import re
+import struct
+from typing import Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+# mzstatic artwork URLs end in "/{w}x{h}{crop}.{ext}", e.g. "/512x512bb.jpg"
+_MZSTATIC_SIZE = re.compile(r"/\d+x\d+[a-z]{0,3}\.(?:png|jpe?g|webp)$", re.IGNORECASE)
+# googleusercontent image URLs take sizing options after "=", e.g. "=s64-rw"
+_GOOGLE_OPTIONS = re.compile(r"=[^/=]*$")
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _host_matches(host: str, suffix: str) -> bool:
+    return host == suffix or host.endswith("." + suffix)
+
+
+def rendition_url(icon_url: str, size: int) -> Optional[str]:
+    """
+    URL of ``icon_url`` rendered by the store CDN as a ``size`` x ``size`` PNG
+
+    Args:
+        icon_url: Icon URL as returned by a store search
+        size: Edge length in pixels
+
+    Returns:
+        Rendition URL, or None when the host cannot render sizes
+    """
+    if not icon_url:
+        return None
+    parts = urlsplit(icon_url)
+    host = (parts.hostname or "").lower()
+
+    if _host_matches(host, "mzstatic.com"):
+        if not _MZSTATIC_SIZE.search(parts.path):
+            return None
+        path = _MZSTATIC_SIZE.sub(f"/{size}x{size}bb.png", parts.path)
+        return urlunsplit(parts._replace(path=path))
+
+    if _host_matches(host, "googleusercontent.com"):
+        path = _GOOGLE_OPTIONS.sub("", parts.path) + f"=s{size}"
+        return urlunsplit(parts._replace(path=path))
+
+    return None
+
+
+def png_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """Width and height from a PNG header, or None if ``data`` is not a PNG"""
+    if len(data) < 24 or not data.startswith(_PNG_SIGNATURE) or data[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", data[16:24])
@@ -0,0 +1,292 @@
+"""
+Retries with jittered backoff and per-upstream circuit breakers
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+import logging
+
+import aiohttp
+import requests
+
+from .http import describe_error
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(aiohttp.ClientError):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit for {name} is open; retry in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Decide whether a failed request is worth retrying
+
+    Connection failures, timeouts, 5xx and 429 responses are transient;
+    other HTTP errors (404, 400, ...) and open circuits are not.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500 or error.status == 429
+    if isinstance(error, requests.HTTPError):
+        status = error.response.status_code if error.response is not None else 0
+        return status >= 500 or status == 429
+    return isinstance(error, (
+        aiohttp.ClientError,
+        asyncio.TimeoutError,
+        requests.ConnectionError,
+        requests.Timeout,
+    ))
+
+
+class RetryPolicy:
+    """Bounded retries with full-jitter exponential backoff"""
+
+    def __init__(self, attempts: int = 3, base_delay: float = 0.25, max_delay: float = 4.0):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """Return the sleep before retry number ``attempt`` (0-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker for one upstream
+
+    The breaker tracks the outcome of the last ``window`` calls. Once at
+    least ``min_calls`` have been seen and the failure ratio reaches
+    ``failure_threshold``, it opens and rejects calls for ``cooldown``
+    seconds. After the cooldown a single probe call is let through
+    (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: float = 0.5, min_calls: int = 5,
+                 window: int = 20, cooldown: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._outcomes = deque(maxlen=window)
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """
+        Check whether a call may proceed
+
+        Raises:
+            CircuitOpenError: While the circuit is open or a probe is running
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.rejected += 1
+            raise CircuitOpenError(self.name, max(0.0, remaining))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                logger.info(f"Circuit for {self.name} closed")
+                self.state = self.CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def abandon(self) -> None:
+        """Forget a call that was cancelled before it finished"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._probe_in_flight = False
+            self._outcomes.append(False)
+            if self.state == self.HALF_OPEN or self._failure_ratio_exceeded():
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit for {self.name} opened for {self.cooldown:.0f}s")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            failures = self._outcomes.count(False)
+            state = self.state
+            if state == self.OPEN and time.monotonic() >= self.opened_at + self.cooldown:
+                state = self.HALF_OPEN
+            return {
+                "state": state,
+                "recent_calls": len(self._outcomes),
+                "recent_failures": failures,
+                "rejected": self.rejected,
+            }
+
+    def _failure_ratio_exceeded(self) -> bool:
+        calls = len(self._outcomes)
+        if calls < self.min_calls:
+            return False
+        return self._outcomes.count(False) / calls >= self.failure_threshold
+
+
+class BreakerRegistry:
+    """Named circuit breakers shared across clients"""
+
+    def __init__(self, **breaker_options):
+        self.breaker_options = breaker_options
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        """Return the breaker for ``name``, creating it on first use"""
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, **self.breaker_options)
+                self._breakers[name] = breaker
+            return breaker
+
+    def stats(self) -> Dict:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.stats() for name, breaker in breakers.items()}
+
+
+def _record_error(breaker: Optional[CircuitBreaker], error: Exception) -> bool:
+    """Feed a failed attempt into the breaker and report whether it is transient"""
+    transient = is_transient(error)
+    if breaker is not None and not isinstance(error, CircuitOpenError):
+        if transient:
+            breaker.record_failure()
+        else:
+            # Non-transient errors (404 and friends) mean the upstream is up
+            breaker.record_success()
+    return transient
+
+
+async def call_with_resilience(fn: Callable[[], Awaitable[T]], retry: Optional[RetryPolicy] = None,
+                               breaker: Optional[CircuitBreaker] = None) -> T:
+    """
+    Await ``fn()`` with retries and circuit breaking
+
+    Args:
+        fn: Zero-argument coroutine function performing one request
+        retry: Retry policy (default: a single attempt)
+        breaker: Circuit breaker guarding the upstream
+
+    Returns:
+        Result of the first successful attempt
+
+    Raises:
+        CircuitOpenError: When the breaker rejects the call
+        Exception: The last error once retries are exhausted or the error
+            is not transient
+    """
+    attempts = retry.attempts if retry else 1
+    for attempt in range(attempts):
+        if breaker is not None:
+            breaker.before_call()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            if breaker is not None:
+                breaker.abandon()
+            raise
+        except Exception as e:
+            transient = _record_error(breaker, e)
+            if not transient or attempt == attempts - 1:
+                raise
+            delay = retry.delay(attempt)
+            logger.debug(f"Retrying in {delay:.2f}s after transient error: {describe_error(e)}")
+            await asyncio.sleep(delay)
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+
+@asynccontextmanager
+async def breaker_guard(breaker: Optional[CircuitBreaker]) -> AsyncIterator[None]:
+    """
+    Guard a block that talks to an upstream with its circuit breaker
+
+    Used for streamed requests, which cannot be retried once part of the
+    response has been handed to the caller.
+
+    Raises:
+        CircuitOpenError: When the breaker rejects the call
+    """
+    if breaker is None:
+        yield
+        return
+    breaker.before_call()
+    try:
+        yield
+    except (asyncio.CancelledError, GeneratorExit):
+        breaker.abandon()
+        raise
+    except Exception as e:
+        _record_error(breaker, e)
+        raise
+    else:
+        breaker.record_success()
+
+
+def call_with_resilience_sync(fn: Callable[[], T], retry: Optional[RetryPolicy] = None,
+                              breaker: Optional[CircuitBreaker] = None) -> T:
+    """Blocking counterpart of :func:`call_with_resilience`"""
+    attempts = retry.attempts if retry else 1
+    for attempt in range(attempts):
+        if breaker is not None:
+            breaker.before_call()
+        try:
+            result = fn()
+        except Exception as e:
+            transient = _record_error(breaker, e)
+            if not transient or attempt == attempts - 1:
+                raise
+            delay = retry.delay(attempt)
+            logger.debug(f"Retrying in {delay:.2f}s after transient error: {describe_error(e)}")
+            time.sleep(delay)
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+
+_breakers: Optional[BreakerRegistry] = None
+
+
+def get_breakers() -> BreakerRegistry:
+    """Return the process-wide breaker registry"""
+    global _breakers
+    if _breakers is None:
+        _breakers = BreakerRegistry()
+    return _breakers
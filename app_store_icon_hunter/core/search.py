@@ -0,0 +1,337 @@
+"""
+Concurrent search across App Store and Google Play
+"""
+
+import asyncio
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import logging
+
+from .app_store import AppStoreAPI
+from .catalog import DEFAULT_MAX_AGE, AppCatalog
+from .google_play import GooglePlayAPI
+from .http import REQUEST_ERRORS, describe_error, run_sync
+from .matching import CrossStoreMatcher
+from .models import AppRecord
+from .ratelimit import wait_for_excluding_limits
+from .resilience import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Where search results come from: upstream only, the local catalog only, or
+# the catalog when it has fresh matches and upstream otherwise
+SOURCES = ("remote", "local", "local_first")
+
+STORE_LABELS = {
+    "appstore": "App Store",
+    "googleplay": "Google Play",
+}
+
+
+class MultiStoreSearch:
+    """Fan a search out to several stores at once with a per-store deadline"""
+
+    DEFAULT_TIMEOUT = 8.0
+
+    def __init__(self, app_store_api: Optional[AppStoreAPI] = None,
+                 google_play_api: Optional[GooglePlayAPI] = None,
+                 timeout: float = DEFAULT_TIMEOUT,
+                 catalog: Optional[AppCatalog] = None,
+                 matcher: Optional[CrossStoreMatcher] = None):
+        self.clients = {
+            "appstore": app_store_api or AppStoreAPI(),
+            "googleplay": google_play_api or GooglePlayAPI(),
+        }
+        self.timeout = timeout
+        self.catalog = catalog
+        self.matcher = matcher or CrossStoreMatcher()
+
+    @staticmethod
+    def stores_for(store: str) -> List[str]:
+        """Expand a store selector ('appstore', 'googleplay', 'both') to store names"""
+        store = store.lower()
+        if store == "both":
+            return ["appstore", "googleplay"]
+        return [store]
+
+    async def search(self, term: str, store: str = "both", country: str = "us",
+                     limit: int = 10, timeout: Optional[float] = None,
+                     source: str = "remote", max_age: Optional[float] = None) -> Dict:
+        """
+        Search the selected stores concurrently
+
+        A store that errors or misses its deadline does not affect the others;
+        its outcome is reported in the per-store status block instead.
+
+        Args:
+            term: Search term
+            store: 'appstore', 'googleplay', or 'both'
+            country: Country code (the local catalog is not split by country)
+            limit: Maximum results per store
+            timeout: Per-store deadline in seconds (default: ``self.timeout``)
+            source: 'remote', 'local' (catalog only) or 'local_first'
+                (catalog matches seen within ``max_age``, upstream otherwise)
+            max_age: Freshness window in seconds for 'local_first'
+                (default: one day)
+
+        Returns:
+            Dictionary with the combined ``results`` list (stores in request
+            order) and a ``stores`` mapping of store name to status details,
+            including the ``source`` that answered. When both stores are
+            searched, apps found in both carry ``paired_with``
+
+        Raises:
+            ValueError: For an unknown source, or a local source without a catalog
+        """
+        if source not in SOURCES:
+            raise ValueError(f"Unknown search source: {source}")
+        if source != "remote" and self.catalog is None:
+            raise ValueError("Local search requires an app catalog")
+        if timeout is None:
+            timeout = self.timeout
+        if max_age is None:
+            max_age = DEFAULT_MAX_AGE
+        return await self._search(term, store, country, limit, timeout, source, max_age)
+
+    async def _search(self, term: str, store: str, country: str, limit: int, timeout: float,
+                      source: str = "remote", max_age: float = DEFAULT_MAX_AGE,
+                      paced: bool = False) -> Dict:
+        """:meth:`search` with validated arguments; see :meth:`_search_store` for ``paced``"""
+        names = self.stores_for(store)
+        outcomes = await asyncio.gather(*[
+            self._search_store(name, term, country, limit, timeout, source, max_age, paced)
+            for name in names
+        ])
+
+        results = []
+        statuses = {}
+        for name, (apps, status) in zip(names, outcomes):
+            results.extend(apps)
+            statuses[name] = status
+
+        if len(names) > 1:
+            self.matcher.annotate(results)
+        return {"results": results, "stores": statuses}
+
+    def search_sync(self, term: str, store: str = "both", country: str = "us",
+                    limit: int = 10, timeout: Optional[float] = None,
+                    source: str = "remote", max_age: Optional[float] = None) -> Dict:
+        """Blocking wrapper around :meth:`search`"""
+        return run_sync(self.search(term, store, country, limit, timeout, source, max_age))
+
+    async def stream(self, term: str, store: str = "both", country: str = "us",
+                     limit: int = 10, offset: int = 0,
+                     timeout: Optional[float] = None) -> AsyncIterator[Dict]:
+        """
+        Search the selected stores concurrently and yield results as they are parsed
+
+        Each store feeds a shared queue from its own task, so the first
+        results arrive as soon as the fastest store starts answering and no
+        store waits for another.
+
+        Args:
+            term: Search term
+            store: 'appstore', 'googleplay', or 'both'
+            country: Country code
+            limit: Maximum results per store (capped at each store's ``MAX_LIMIT``)
+            offset: Results to skip per store; stores without offset paging
+                report status 'unsupported'
+            timeout: Per-store deadline in seconds (default: ``self.timeout``)
+
+        Yields:
+            ``{"type": "result", "store": name, "app": record}`` per app,
+            ``{"type": "status", "store": name, ...}`` when a store finishes
+            (same fields as the ``stores`` block of :meth:`search`), and a
+            final ``{"type": "done", "stores": {...}}``
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        names = self.stores_for(store)
+        queue = asyncio.Queue()
+        tasks = [
+            asyncio.ensure_future(
+                self._stream_store(name, term, country, limit, offset, timeout, queue)
+            )
+            for name in names
+        ]
+
+        statuses = {}
+        try:
+            while len(statuses) < len(names):
+                event = await queue.get()
+                if event["type"] == "status":
+                    statuses[event["store"]] = {k: v for k, v in event.items()
+                                                if k not in ("type", "store")}
+                yield event
+        finally:
+            # Stop upstream work if the consumer goes away early
+            for task in tasks:
+                task.cancel()
+
+        yield {"type": "done", "stores": {name: statuses[name] for name in names}}
+
+    async def sweep(self, term: str, countries: List[str], store: str = "both",
+                    limit: int = 10, concurrency: int = 8,
+                    timeout: Optional[float] = None) -> Dict:
+        """
+        Search many storefronts concurrently and merge apps by bundle ID
+
+        Duplicate country codes are searched once, and at most
+        ``concurrency`` countries are in flight at a time. A sweep sends far
+        more requests than a store's rate limit allows at once, so each
+        store's deadline excludes the time its request waits for the limit
+        (the sweep is paced to the limit instead of timing out). Work still
+        running when the sweep ends, or is cancelled, is cancelled with it.
+
+        Args:
+            term: Search term
+            countries: Country codes to search
+            store: 'appstore', 'googleplay', or 'both'
+            limit: Maximum results per store and country
+            concurrency: Maximum countries searched at once
+            timeout: Per-store deadline in seconds, not counting rate limit waits
+
+        Returns:
+            Dictionary with the merged ``results`` and a ``countries`` mapping
+            of country code to its per-store status block. Each merged app
+            carries ``countries`` (where it was found, in request order) and
+            ``icon_urls`` (country -> icon URL, only where the icon differs
+            from the app's ``icon_url``).
+        """
+        unique_countries = []
+        for country in countries:
+            country = country.lower()
+            if country not in unique_countries:
+                unique_countries.append(country)
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def search_country(country: str) -> Dict:
+            async with semaphore:
+                return await self._search(term, store, country, limit,
+                                          self.timeout if timeout is None else timeout, paced=True)
+
+        tasks = [asyncio.ensure_future(search_country(c)) for c in unique_countries]
+        try:
+            outcomes = await asyncio.gather(*tasks)
+        finally:
+            # A failed country must not leave the others calling upstream
+            for task in tasks:
+                task.cancel()
+
+        merged = {}
+        statuses = {}
+        for country, outcome in zip(unique_countries, outcomes):
+            statuses[country] = outcome["stores"]
+            for app in outcome["results"]:
+                key = (app["store"], app.get("bundle_id") or app.get("url") or app["name"])
+                entry = merged.get(key)
+                if entry is None:
+                    entry = app.copy()
+                    # Re-paired below across all countries
+                    entry.pop("paired_with", None)
+                    entry["countries"] = []
+                    entry["icon_urls"] = {}
+                    merged[key] = entry
+                entry["countries"].append(country)
+                if app.get("icon_url") != entry.get("icon_url"):
+                    entry["icon_urls"][country] = app.get("icon_url")
+
+        results = list(merged.values())
+        if len(self.stores_for(store)) > 1:
+            self.matcher.annotate(results)
+        return {"results": results, "countries": statuses}
+
+    def sweep_sync(self, term: str, countries: List[str], store: str = "both",
+                   limit: int = 10, concurrency: int = 8,
+                   timeout: Optional[float] = None) -> Dict:
+        """Blocking wrapper around :meth:`sweep`"""
+        return run_sync(self.sweep(term, countries, store, limit, concurrency, timeout))
+
+    async def _search_store(self, name: str, term: str, country: str, limit: int,
+                            timeout: float, source: str = "remote",
+                            max_age: float = DEFAULT_MAX_AGE,
+                            paced: bool = False) -> Tuple[List[AppRecord], Dict]:
+        """
+        Search one store and describe how it went
+
+        With ``paced``, time spent waiting for the store's rate limit does not
+        count against ``timeout``.
+        """
+        started = time.monotonic()
+        if source != "remote":
+            apps = self.catalog.search(
+                term, name, limit, max_age=max_age if source == "local_first" else None
+            )
+            if apps or source == "local":
+                elapsed_ms = round((time.monotonic() - started) * 1000, 1)
+                return apps, {"status": "ok", "count": len(apps),
+                              "elapsed_ms": elapsed_ms, "source": "local"}
+
+        client = self.clients[name]
+        if not client.available:
+            return [], {"status": "unavailable", "count": 0, "elapsed_ms": 0}
+
+        status = {"status": "ok", "count": 0, "source": "remote"}
+        apps = []
+        try:
+            deadline = wait_for_excluding_limits if paced else asyncio.wait_for
+            apps = await deadline(client.asearch_apps(term, country, limit, raise_errors=True), timeout)
+            status["count"] = len(apps)
+        except REQUEST_ERRORS as e:
+            self._describe_failure(name, e, timeout, status)
+
+        status["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+        return apps, status
+
+    async def _stream_store(self, name: str, term: str, country: str, limit: int,
+                            offset: int, timeout: float, queue: asyncio.Queue) -> None:
+        """Push one store's results onto ``queue``, then its status event"""
+        client = self.clients[name]
+        started = time.monotonic()
+        status = {"status": "ok", "count": 0}
+
+        async def produce():
+            results = client.aiter_search_apps(term, country, min(limit, client.MAX_LIMIT), offset)
+            try:
+                async for app in results:
+                    status["count"] += 1
+                    queue.put_nowait({"type": "result", "store": name, "app": app})
+            finally:
+                await results.aclose()
+
+        if not client.available:
+            status["status"] = "unavailable"
+        elif offset and not client.SUPPORTS_OFFSET:
+            status["status"] = "unsupported"
+            status["error"] = f"{STORE_LABELS[name]} does not support offset paging"
+        else:
+            try:
+                await asyncio.wait_for(produce(), timeout)
+            except (REQUEST_ERRORS + (ValueError,)) as e:
+                self._describe_failure(name, e, timeout, status)
+            except Exception as e:
+                # The stream is already open, so every store must still end
+                # with a status event rather than failing the response
+                logger.exception(f"Unexpected error streaming {STORE_LABELS[name]}")
+                status["status"] = "error"
+                status["error"] = describe_error(e)
+
+        status["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+        queue.put_nowait({"type": "status", "store": name, **status})
+
+    @staticmethod
+    def _describe_failure(name: str, error: Exception, timeout: float, status: Dict) -> None:
+        """Record why a store search failed in its status block"""
+        if isinstance(error, asyncio.TimeoutError):
+            logger.warning(f"{STORE_LABELS[name]} search timed out after {timeout}s")
+            status["status"] = "timeout"
+        elif isinstance(error, CircuitOpenError):
+            status["status"] = "circuit_open"
+            status["error"] = str(error)
+        else:
+            # Never str(error): aiohttp includes the request URL and its API key
+            logger.error(f"Error searching {STORE_LABELS[name]}: {describe_error(error)}")
+            status["status"] = "error"
+            status["error"] = describe_error(error)
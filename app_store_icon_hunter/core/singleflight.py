@@ -0,0 +1,87 @@
+"""
+Coalescing of identical in-flight upstream requests
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Share one upstream call between concurrent callers with the same key
+
+    The first caller starts the work as a task; callers arriving while it is
+    still running await the same task and receive its result or exception.
+    Each caller awaits through ``asyncio.shield`` so a caller that gives up
+    (for example on a per-store deadline) does not cancel the work for the
+    others. Once every caller has given up, the work is cancelled rather
+    than left calling the upstream for nobody.
+    """
+
+    def __init__(self):
+        self._inflight = {}  # (loop, key) -> asyncio.Task
+        self._waiters = {}  # asyncio.Task -> callers awaiting it
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``fn`` unless an identical call is already in flight
+
+        Args:
+            key: Identity of the call (e.g. a search cache key)
+            fn: Zero-argument coroutine function performing the upstream call
+
+        Returns:
+            Result of the shared call
+
+        Raises:
+            Whatever the shared call raised
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+
+        with self._lock:
+            self._counters["calls"] += 1
+            task = self._inflight.get(flight_key)
+            if task is not None:
+                self._counters["coalesced"] += 1
+            else:
+                self._counters["executions"] += 1
+                task = loop.create_task(fn())
+                self._inflight[flight_key] = task
+                task.add_done_callback(lambda t: self._finish(flight_key, t))
+            self._waiters[task] = self._waiters.get(task, 0) + 1
+
+        try:
+            return await asyncio.shield(task)
+        finally:
+            with self._lock:
+                self._waiters[task] -= 1
+                if not self._waiters[task]:
+                    del self._waiters[task]
+                    if not task.done():
+                        # Later callers start afresh instead of joining a cancelled call
+                        if self._inflight.get(flight_key) is task:
+                            del self._inflight[flight_key]
+                        task.cancel()
+                        logger.debug(f"Cancelled shared call for {key!r}: every caller gave up")
+
+    def stats(self) -> Dict:
+        """Return call, execution and coalesced counters"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = len(self._inflight)
+        return stats
+
+    def _finish(self, flight_key, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._inflight.get(flight_key) is task:
+                del self._inflight[flight_key]
+        # Mark the exception as retrieved in case every waiter gave up
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Shared call for {flight_key[1]!r} failed: {task.exception()}")
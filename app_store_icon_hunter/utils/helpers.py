@@ -7,6 +7,22 @@ import os
 from typing import List, Optional
 from pathlib import Path
 
+# Two-letter codes of the App Store storefronts, used for --all-countries sweeps
+STOREFRONT_COUNTRIES = [
+    "ae", "ag", "ai", "al", "am", "ao", "ar", "at", "au", "az", "bb", "be", "bf",
+    "bg", "bh", "bj", "bm", "bn", "bo", "br", "bs", "bt", "bw", "by", "bz", "ca",
+    "cg", "ch", "cl", "cn", "co", "cr", "cv", "cy", "cz", "de", "dk", "dm", "do",
+    "dz", "ec", "ee", "eg", "es", "fi", "fj", "fm", "fr", "gb", "gd", "gh", "gm",
+    "gr", "gt", "gw", "gy", "hk", "hn", "hr", "hu", "id", "ie", "il", "in", "is",
+    "it", "jm", "jo", "jp", "ke", "kg", "kh", "kn", "kr", "kw", "ky", "kz", "la",
+    "lb", "lc", "lk", "lr", "lt", "lu", "lv", "md", "mg", "mk", "ml", "mn", "mo",
+    "mr", "ms", "mt", "mu", "mw", "mx", "my", "mz", "na", "ne", "ng", "ni", "nl",
+    "no", "np", "nz", "om", "pa", "pe", "pg", "ph", "pk", "pl", "pt", "pw", "py",
+    "qa", "ro", "ru", "sa", "sb", "sc", "se", "sg", "si", "sk", "sl", "sn", "sr",
+    "st", "sv", "sz", "tc", "td", "th", "tj", "tm", "tn", "tr", "tt", "tw", "tz",
+    "ua", "ug", "us", "uy", "uz", "vc", "ve", "vg", "vn", "ye", "za", "zw",
+]
+
 
 def format_app_name(name: str) -> str:
     """
@@ -112,6 +128,24 @@ def validate_country_code(country: str) -> bool:
     return len(country) == 2 and country.isalpha()
 
 
+def parse_country_list(countries: str) -> List[str]:
+    """
+    Parse a comma-separated list of country codes
+
+    Args:
+        countries: Codes such as "us,gb,jp"
+
+    Returns:
+        Lowercase codes in order, without duplicates or blanks
+    """
+    parsed = []
+    for code in countries.split(","):
+        code = code.strip().lower()
+        if code and code not in parsed:
+            parsed.append(code)
+    return parsed
+
+
 def ensure_directory(path: str) -> Path:
     """
     Ensure directory exists, create if necessary
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark job ZIP delivery: prebuilt deflated file vs streamed archive
+
+Writes a synthetic download job (an original and the default sizes for
+every app) and delivers it two ways:
+
+- file: the former approach, a ``ZIP_DEFLATED`` archive written to disk
+  once the job finishes, then read back in 64 KiB chunks as ``FileResponse``
+  does
+- stream: :func:`~app_store_icon_hunter.core.archive.iter_zip`, built while
+  it is sent, PNG members stored
+
+For each it reports CPU time, wall time, time to the first byte, the
+archive size and the extra disk space used.
+
+Usage:
+    python3 scripts/bench_archive.py
+    python3 scripts/bench_archive.py --apps 2000 --repeat 3
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app_store_icon_hunter.core.archive import iter_zip  # noqa: E402
+from app_store_icon_hunter.core.downloader import IconDownloader  # noqa: E402
+from app_store_icon_hunter.core.imaging import render_icon_sizes  # noqa: E402
+
+CHUNK_SIZE = 64 * 1024  # FileResponse's chunk size
+
+
+def make_icon(seed: int, size: int) -> bytes:
+    detail = Image.effect_mandelbrot((size, size), (-2, -1.5, 1, 1.5), 40 + seed * 7)
+    icon = Image.merge("RGB", (detail, Image.radial_gradient("L").resize((size, size)),
+                               Image.linear_gradient("L").resize((size, size))))
+    buffer = io.BytesIO()
+    icon.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def make_job(root: str, apps: int, sizes: list) -> list:
+    """Icon files laid out like a job directory, as ``(archive name, path)`` pairs"""
+    templates = []
+    for seed in range(8):
+        directory = os.path.join(root, "templates", str(seed))
+        os.makedirs(directory)
+        original = make_icon(seed, 1024)
+        with open(os.path.join(directory, "original.png"), "wb") as f:
+            f.write(original)
+        render_icon_sizes(original, directory, sizes)
+        templates.append(directory)
+
+    entries = []
+    names = ["original.png"] + [f"icon_{size}x{size}.png" for size in sizes]
+    for index in range(apps):
+        directory = os.path.join(root, "job", f"App {index}")
+        os.makedirs(directory)
+        for name in names:
+            path = os.path.join(directory, name)
+            os.link(os.path.join(templates[index % len(templates)], name), path)
+            entries.append((f"App {index}/{name}", path))
+    return entries
+
+
+def deliver_file(entries: list, root: str):
+    zip_path = os.path.join(root, "icons.zip")
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for arcname, path in entries:
+            archive.write(path, arcname)
+    first = True
+    with open(zip_path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            yield chunk, first
+            first = False
+    os.remove(zip_path)
+
+
+def deliver_stream(entries: list, root: str):
+    first = True
+    for chunk in iter_zip(entries):
+        yield chunk, first
+        first = False
+
+
+def measure(deliver, entries: list, root: str) -> dict:
+    started_cpu, started = time.process_time(), time.perf_counter()
+    first_byte = None
+    size = extra_disk = 0
+    for chunk, first in deliver(entries, root):
+        if first:
+            first_byte = time.perf_counter() - started
+            zip_path = os.path.join(root, "icons.zip")
+            extra_disk = os.path.getsize(zip_path) if os.path.exists(zip_path) else 0
+        size += len(chunk)
+    return {"cpu": time.process_time() - started_cpu, "wall": time.perf_counter() - started,
+            "first_byte": first_byte, "size": size, "disk": extra_disk}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--apps", type=int, default=500, help="Apps in the job")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per approach (best is shown)")
+    args = parser.parse_args()
+    sizes = IconDownloader.DEFAULT_SIZES
+
+    with tempfile.TemporaryDirectory() as root:
+        entries = make_job(root, args.apps, sizes)
+        print(f"{args.apps} apps, {len(entries)} files, sizes {sizes}")
+        print(f"{'approach':<8} {'CPU':>8} {'wall':>8} {'first byte':>11} {'archive':>10} {'extra disk':>11}")
+        for name, deliver in (("file", deliver_file), ("stream", deliver_stream)):
+            runs = [measure(deliver, entries, root) for _ in range(args.repeat)]
+            best = min(runs, key=lambda run: run["wall"])
+            print(f"{name:<8} {best['cpu']:>7.2f}s {best['wall']:>7.2f}s "
+                  f"{best['first_byte'] * 1000:>8.1f} ms {best['size'] / 2 ** 20:>7.1f} MB "
+                  f"{best['disk'] / 2 ** 20:>8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark packing a job's icons into sprite sheets
+
+Writes one distinct 64px icon per app, as a job's ``icon_64x64.png``
+files, and packs them with :func:`~app_store_icon_hunter.core.atlas.pack_atlas`
+for each sheet encoder profile, sequentially and with sheets built on a thread
+pool. For each it reports CPU and wall time, the sheets, and their bytes
+next to the bytes (and requests) of serving every icon on its own.
+
+Usage:
+    python3 scripts/bench_atlas.py
+    python3 scripts/bench_atlas.py --apps 2000 --size 128 --encoders fast
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app_store_icon_hunter.core.atlas import pack_atlas  # noqa: E402
+
+
+def make_icons(root: str, apps: int, size: int) -> list:
+    """Distinct icons laid out like a job directory, as ``(app name, path)`` pairs"""
+    icons = []
+    for index in range(apps):
+        directory = os.path.join(root, "job", f"App {index}")
+        os.makedirs(directory)
+        x = -2 + (index % 100) * 0.02
+        y = -1.5 + (index // 100 % 100) * 0.02
+        detail = Image.effect_mandelbrot((size, size), (x, y, x + 1.5, y + 1.5), 30)
+        hue = Image.new("L", (size, size), index * 37 % 256)
+        path = os.path.join(directory, f"icon_{size}x{size}.png")
+        Image.merge("RGB", (detail, hue, detail.transpose(Image.Transpose.FLIP_LEFT_RIGHT))).save(path, "PNG")
+        icons.append((f"App {index}", path))
+    return icons
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--apps", type=int, default=10000, help="Icons to pack")
+    parser.add_argument("--size", type=int, default=64, help="Icon size in pixels")
+    parser.add_argument("--encoders", default="fast,balanced",
+                        help="Comma-separated encoder profiles to pack with")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        started = time.perf_counter()
+        icons = make_icons(root, args.apps, args.size)
+        icon_bytes = sum(os.path.getsize(path) for _, path in icons)
+        print(f"{args.apps} icons of {args.size}px ({time.perf_counter() - started:.1f}s to create), "
+              f"{icon_bytes / 2 ** 20:.1f} MB in {args.apps} requests served one by one")
+        print(f"{'encoder':<9} {'sheets built':<13} {'CPU':>7} {'wall':>7} {'sheets':>7} {'bytes':>9} {'vs icons':>9}")
+        workers = os.cpu_count() or 1
+        for encoder in args.encoders.split(","):
+            for label, executor in (("one by one", None),
+                                    (f"{workers} threads", ThreadPoolExecutor(max_workers=workers))):
+                output = os.path.join(root, f"atlas-{encoder}-{executor is not None}")
+                started_cpu, started = time.process_time(), time.perf_counter()
+                index = pack_atlas(icons, args.size, output, encoder=encoder, executor=executor)
+                cpu, wall = time.process_time() - started_cpu, time.perf_counter() - started
+                if executor is not None:
+                    executor.shutdown()
+                size = sum(os.path.getsize(os.path.join(output, sheet["file"])) for sheet in index["sheets"])
+                print(f"{encoder:<9} {label:<13} {cpu:>6.2f}s {wall:>6.2f}s {len(index['sheets']):>7} "
+                      f"{size / 2 ** 20:>6.1f} MB {size / icon_bytes:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark bounded vs unbounded icon download scheduling
+
+Starts a local icon server with a fixed per-request latency and a capacity
+beyond which it answers 503 (as a CDN throttling a client does), then
+downloads the same batch of icons two ways:
+
+- unbounded: every app at once, like the former ``asyncio.gather`` of one
+  coroutine per app with an unlimited connection pool
+- bounded: ``IconDownloader`` with its worker and per-host connection
+  limits (the defaults unless overridden)
+
+Usage:
+    python3 scripts/bench_downloads.py
+    python3 scripts/bench_downloads.py --apps 2000 --latency 0.05 --capacity 64
+"""
+
+import argparse
+import asyncio
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app_store_icon_hunter.core.downloader import IconDownloader  # noqa: E402
+from app_store_icon_hunter.core.ratelimit import RateLimiter  # noqa: E402
+from app_store_icon_hunter.core.resilience import BreakerRegistry, RetryPolicy  # noqa: E402
+
+
+class IconServer:
+    """Local icon CDN that tracks concurrent requests and sheds load"""
+
+    def __init__(self, latency: float, capacity: int):
+        self.latency = latency
+        self.capacity = capacity
+        self.active = 0
+        self.peak = 0
+        self.rejected = 0
+        buffer = io.BytesIO()
+        Image.new("RGBA", (128, 128), (30, 120, 200, 255)).save(buffer, "PNG")
+        self.icon = buffer.getvalue()
+
+    async def handle(self, request):
+        if self.capacity and self.active >= self.capacity:
+            self.rejected += 1
+            return web.Response(status=503)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+            return web.Response(body=self.icon, content_type="image/png")
+        finally:
+            self.active -= 1
+
+
+async def run_case(name: str, apps: int, args, bounded: bool):
+    server = IconServer(args.latency, args.capacity)
+    application = web.Application()
+    application.router.add_get("/{name}.png", server.handle)
+    runner = web.AppRunner(application, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    batch = [{"name": f"App {i}", "icon_url": f"http://127.0.0.1:{port}/{i}.png"}
+             for i in range(apps)]
+    if bounded:
+        limits = {"max_concurrency": args.max_concurrency, "per_host_limit": args.per_host_limit}
+    else:
+        limits = {"max_concurrency": apps, "per_host_limit": 0}
+    with tempfile.TemporaryDirectory() as output_dir:
+        downloader = IconDownloader(
+            output_dir, rate_limiter=RateLimiter(default_rate=None), retry=RetryPolicy(base_delay=0.05),
+            breakers=BreakerRegistry(), **limits
+        )
+        started = time.perf_counter()
+        status = await downloader.download_icons_async(batch, [64], "bench")
+        elapsed = time.perf_counter() - started
+    await runner.cleanup()
+
+    print(f"{name:<10} {elapsed:>8.2f} s {apps / elapsed:>9.0f}/s {server.peak:>6} "
+          f"{server.rejected:>9} {len(status['failed_apps']):>7}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--apps", type=int, default=1000, help="Icons per batch")
+    parser.add_argument("--latency", type=float, default=0.05, help="Server latency in seconds")
+    parser.add_argument("--capacity", type=int, default=64,
+                        help="Concurrent requests served before answering 503 (0 for no limit)")
+    parser.add_argument("--max-concurrency", type=int, default=IconDownloader.MAX_CONCURRENCY,
+                        help="Bounded mode worker count")
+    parser.add_argument("--per-host-limit", type=int, default=IconDownloader.PER_HOST_LIMIT,
+                        help="Bounded mode connections per host")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)  # Per-app failures are summarized instead
+
+    print(f"{'mode':<10} {'time':>10} {'rate':>10} {'peak':>6} {'rejected':>9} {'failed':>7}")
+    await run_case("unbounded", args.apps, args, bounded=False)
+    await run_case("bounded", args.apps, args, bounded=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark bytes and CPU time per icon of the encoder profiles
+
+Renders a set of icon sizes from two 1024px sources, a detailed one
+(fractal over gradients) and a flat one (a few solid shapes, as most app
+icons are), with every encoder profile and output format. For each it
+reports the CPU time and the bytes written per icon (all sizes together),
+next to the former encoding (PNG with ``optimize=True``, no palette).
+
+Usage:
+    python3 scripts/bench_encoders.py
+    python3 scripts/bench_encoders.py --repeat 5 --sizes 16,32,48,64,128,256,512
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app_store_icon_hunter.core.imaging import (  # noqa: E402
+    ENCODER_PROFILES, IMAGE_FORMATS, render_icon_sizes, validate_encoding
+)
+
+FORMER = "former"
+
+
+def detailed_icon(size: int) -> bytes:
+    detail = Image.effect_mandelbrot((size, size), (-2, -1.5, 1, 1.5), 80)
+    icon = Image.merge("RGB", (detail, Image.radial_gradient("L").resize((size, size)),
+                               Image.linear_gradient("L").resize((size, size))))
+    buffer = io.BytesIO()
+    icon.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def flat_icon(size: int) -> bytes:
+    icon = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(icon)
+    draw.rounded_rectangle((0, 0, size - 1, size - 1), radius=size // 5, fill=(24, 119, 242, 255))
+    draw.ellipse((size // 4, size // 4, size * 3 // 4, size * 3 // 4), fill=(255, 255, 255, 255))
+    draw.rectangle((size * 3 // 8, size * 3 // 8, size * 5 // 8, size * 5 // 8), fill=(250, 190, 20, 255))
+    buffer = io.BytesIO()
+    icon.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def render_former(data: bytes, directory: str, sizes: list) -> list:
+    """The encoding used before profiles: every size from the original, optimized PNG"""
+    image = Image.open(io.BytesIO(data)).convert("RGBA")
+    paths = []
+    for size in sizes:
+        path = os.path.join(directory, f"icon_{size}x{size}.png")
+        image.resize((size, size), Image.Resampling.LANCZOS).save(path, "PNG", optimize=True)
+        paths.append(path)
+    return paths
+
+
+def measure(data: bytes, directory: str, sizes: list, encoder: str, fmt: str, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.process_time()
+        if encoder == FORMER:
+            paths = render_former(data, directory, sizes)
+        else:
+            paths = render_icon_sizes(data, directory, sizes, "best", encoder, fmt)
+        timings.append(time.process_time() - started)
+    timings.sort()
+    return timings[len(timings) // 2], sum(os.path.getsize(path) for path in paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (median is shown)")
+    parser.add_argument("--sizes", default="16,32,48,64,128,256,512",
+                        help="Comma-separated sizes rendered per icon")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    cases = [(FORMER, "png")]
+    for fmt in IMAGE_FORMATS:
+        try:
+            validate_encoding("balanced", fmt)
+        except ValueError as e:
+            print(f"skipping {fmt}: {e}")
+            continue
+        cases.extend((encoder, fmt) for encoder in ENCODER_PROFILES)
+
+    print(f"sizes: {sizes} (resized with 'best', so only encoding differs)")
+    print(f"{'source':<9} {'format':<6} {'encoder':<9} {'CPU/icon':>9} {'bytes/icon':>11} {'vs former':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, data in (("detailed", detailed_icon(1024)), ("flat", flat_icon(1024))):
+            former_bytes = None
+            for encoder, fmt in cases:
+                elapsed, size = measure(data, directory, sizes, encoder, fmt, args.repeat)
+                former_bytes = former_bytes or size
+                print(f"{name:<9} {fmt:<6} {encoder:<9} {elapsed * 1000:>6.0f} ms {size:>11,} "
+                      f"{size / former_bytes:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
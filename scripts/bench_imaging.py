@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark icon processing inline vs on the thread and process pools
+
+Generates large synthetic icons and renders the default icon sizes for all
+of them three ways:
+
+- inline: on the event loop, like the former ``_resize_icon``
+- thread: ``ImagePool("thread")``
+- process: ``ImagePool("process")`` (source bytes via shared memory)
+
+For each mode it reports wall time, the speedup over inline, the speedup
+measured by ``ProcessingStats`` (what download jobs report) and the longest
+time the event loop was blocked.
+
+Usage:
+    python3 scripts/bench_imaging.py
+    python3 scripts/bench_imaging.py --icons 64 --workers 8 --size 512
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app_store_icon_hunter.core.downloader import IconDownloader  # noqa: E402
+from app_store_icon_hunter.core.imaging import (  # noqa: E402
+    ImagePool, ProcessingStats, render_icon_sizes
+)
+
+
+def make_icon(seed: int, size: int) -> bytes:
+    """Detailed, icon-like artwork so resampling and PNG optimization do real work"""
+    detail = Image.effect_mandelbrot((size, size), (-2, -1.5, 1, 1.5), 50 + seed % 50)
+    icon = Image.merge("RGBA", (detail, Image.radial_gradient("L").resize((size, size)),
+                                Image.linear_gradient("L").resize((size, size)),
+                                Image.new("L", (size, size), 255)))
+    buffer = io.BytesIO()
+    icon.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+async def watch_loop(lags: list, stop: asyncio.Event):
+    """Record how late a 5 ms timer fires, i.e. how long the loop was blocked"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.005)
+        lags.append(time.perf_counter() - started - 0.005)
+
+
+async def run_mode(mode: str, icons: list, sizes: list, workers: int):
+    pool = None if mode == "inline" else ImagePool(mode, workers)
+    stats = ProcessingStats(mode, workers if pool else 1)
+    lags = []
+    stop = asyncio.Event()
+    watcher = asyncio.ensure_future(watch_loop(lags, stop))
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        async def render(index: int, data: bytes):
+            directory = os.path.join(output_dir, str(index))
+            os.mkdir(directory)
+            stats.started()
+            if pool is None:
+                started = time.perf_counter()
+                render_icon_sizes(data, directory, sizes)
+                elapsed = time.perf_counter() - started
+            else:
+                elapsed = (await pool.render(data, directory, sizes))[1]
+            stats.finished(elapsed)
+
+        if pool is not None:
+            # Start the workers before timing
+            await pool.render(icons[0], output_dir, sizes[:1])
+        started = time.perf_counter()
+        if pool is None:
+            # One icon at a time, letting the loop run in between as separate
+            # downloads would
+            for i, data in enumerate(icons):
+                await render(i, data)
+                await asyncio.sleep(0.001)
+        else:
+            await asyncio.gather(*(render(i, data) for i, data in enumerate(icons)))
+        elapsed = time.perf_counter() - started
+
+    stop.set()
+    await watcher
+    if pool is not None:
+        pool.close()
+    return elapsed, stats.to_dict()["speedup"], max(lags, default=0.0)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--icons", type=int, default=16, help="Icons to process")
+    parser.add_argument("--size", type=int, default=1024, help="Source icon size in pixels")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Pool size")
+    args = parser.parse_args()
+
+    icons = [make_icon(i, args.size) for i in range(args.icons)]
+    sizes = IconDownloader.DEFAULT_SIZES
+    print(f"{os.cpu_count()} CPUs, {args.workers} workers, {args.icons} icons of "
+          f"{args.size}px -> {sizes}")
+    print(f"{'mode':<8} {'time':>9} {'vs inline':>10} {'job speedup':>12} {'max loop stall':>15}")
+    baseline = None
+    for mode in ("inline", "thread", "process"):
+        elapsed, speedup, stall = await run_mode(mode, icons, sizes, args.workers)
+        baseline = baseline or elapsed
+        print(f"{mode:<8} {elapsed:>7.2f} s {baseline / elapsed:>9.2f}x {speedup or 0:>11.2f}x "
+              f"{stall * 1000:>12.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark cross-store matching on a synthetic catalog
+
+Generates App Store apps and, for most of them, a Google Play listing of the
+same product with the usual differences (suffixes like " - Free" or " Lite",
+another legal form in the developer name, an ``.android`` bundle ID). The
+rest get an unrelated Google Play app. ``CrossStoreMatcher`` then pairs the
+whole catalog and the result is checked against the known pairs.
+
+Usage:
+    python3 scripts/bench_matching.py
+    python3 scripts/bench_matching.py --apps 50000 --seed 7
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app_store_icon_hunter.core.matching import CrossStoreMatcher  # noqa: E402
+from app_store_icon_hunter.core.models import AppRecord  # noqa: E402
+
+SYLLABLES = ["ka", "lo", "mi", "zu", "pe", "ra", "ti", "no", "ve", "sha", "qu", "bo",
+             "lin", "dex", "tor", "mon"]
+KINDS = ["photo", "music", "chat", "maps", "notes", "editor", "player", "scanner", "vpn",
+         "fitness", "weather", "calendar", "budget", "game", "puzzle"]
+
+
+def make_word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+
+
+def make_catalog(apps: int, shared: float, rng: random.Random):
+    records = []
+    expected = {}
+    for i in range(apps):
+        brand, developer = make_word(rng), make_word(rng)
+        name = f"{brand} {rng.choice(KINDS).title()}"
+        bundle_id = f"com.{developer.lower()}.{brand.lower()}.{i}"
+        records.append(AppRecord(name=name, developer=f"{developer} Inc.",
+                                 bundle_id=bundle_id, store="appstore"))
+        if rng.random() < shared:
+            suffix = rng.choice(["", " - Free", " Lite", f": {rng.choice(KINDS).title()}"])
+            records.append(AppRecord(name=name + suffix, developer=f"{developer} LLC",
+                                     bundle_id=f"{bundle_id}.android", store="googleplay"))
+            expected[bundle_id] = f"{bundle_id}.android"
+        else:
+            records.append(AppRecord(name=f"{make_word(rng)} {rng.choice(KINDS).title()}",
+                                     developer=make_word(rng), bundle_id=f"org.other.{i}",
+                                     store="googleplay"))
+    rng.shuffle(records)
+    return records, expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--apps", type=int, default=50000, help="App Store apps (records are twice this)")
+    parser.add_argument("--shared", type=float, default=0.7, help="Share of apps listed in both stores")
+    parser.add_argument("--min-score", type=float, default=0.75, help="Matcher threshold")
+    parser.add_argument("--seed", type=int, default=3, help="Random seed")
+    args = parser.parse_args()
+
+    records, expected = make_catalog(args.apps, args.shared, random.Random(args.seed))
+    matcher = CrossStoreMatcher(min_score=args.min_score)
+    started = time.perf_counter()
+    pairs = matcher.match(records)
+    elapsed = time.perf_counter() - started
+
+    correct = sum(1 for app_store, google_play, _ in pairs
+                  if expected.get(app_store.bundle_id) == google_play.bundle_id)
+    stats = matcher.last_stats
+    print(f"records      {stats['records']}")
+    print(f"comparisons  {stats['comparisons']} "
+          f"({stats['comparisons'] / max(args.apps, 1) ** 2:.4%} of all pairs)")
+    print(f"time         {elapsed:.2f} s")
+    print(f"pairs        {len(pairs)} (expected {len(expected)})")
+    print(f"precision    {correct / max(len(pairs), 1):.2%}")
+    print(f"recall       {correct / max(len(expected), 1):.2%}")
+
+
+if __name__ == "__main__":
+    main()
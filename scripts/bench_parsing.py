@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark whole-document vs streaming parsing of upstream search responses
+
+Builds synthetic iTunes and SerpApi payloads shaped like real responses
+(screenshots, release notes, device lists, long descriptions) and compares
+the two parsing paths used by the store clients:
+
+- whole: join the body, decode it and ``json.loads`` everything, then keep
+  the standardized fields (what ``response.json()`` does)
+- streaming: feed the body chunk by chunk to ``JsonArrayStream`` with field
+  projection (what ``SharedSession.get_json_array`` does)
+
+Usage:
+    python3 scripts/bench_parsing.py
+    python3 scripts/bench_parsing.py --results 200 --repeat 50
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app_store_icon_hunter.core.app_store import AppStoreAPI  # noqa: E402
+from app_store_icon_hunter.core.google_play import GooglePlayAPI  # noqa: E402
+from app_store_icon_hunter.core.http import SharedSession  # noqa: E402
+from app_store_icon_hunter.core.jsonstream import JsonArrayStream  # noqa: E402
+
+
+def itunes_result(i: int) -> dict:
+    shot = "https://is1-ssl.mzstatic.com/image/thumb/Purple/v4/{}/{}/392x696bb.jpg"
+    return {
+        "trackId": 1000000 + i,
+        "trackName": f"Example App {i}",
+        "bundleId": f"com.example.app{i}",
+        "artworkUrl60": f"https://is1-ssl.mzstatic.com/image/thumb/{i}/60x60bb.jpg",
+        "artworkUrl100": f"https://is1-ssl.mzstatic.com/image/thumb/{i}/100x100bb.jpg",
+        "artworkUrl512": f"https://is1-ssl.mzstatic.com/image/thumb/{i}/512x512bb.jpg",
+        "screenshotUrls": [shot.format(i, j) for j in range(10)],
+        "ipadScreenshotUrls": [shot.format(i, j).replace("392x696", "576x768") for j in range(10)],
+        "supportedDevices": [f"iPhone{j}-A{j}" for j in range(80)],
+        "languageCodesISO2A": ["EN", "FR", "DE", "ES", "IT", "JA", "KO", "ZH"] * 4,
+        "advisories": ["Infrequent/Mild Cartoon or Fantasy Violence"],
+        "features": ["iosUniversal"],
+        "description": "An example app with a long marketing description. " * 80,
+        "releaseNotes": "Bug fixes and performance improvements. " * 40,
+        "formattedPrice": "Free",
+        "averageUserRating": 4.5,
+        "userRatingCount": 123456,
+        "artistName": "Example Inc.",
+        "primaryGenreName": "Utilities",
+        "genres": ["Utilities", "Productivity"],
+        "trackViewUrl": f"https://apps.apple.com/us/app/example/id{1000000 + i}",
+    }
+
+
+def serpapi_result(i: int) -> dict:
+    return {
+        "title": f"Example App {i}",
+        "product_id": f"com.example.app{i}",
+        "thumbnail": f"https://play-lh.googleusercontent.com/icon{i}",
+        "link": f"https://play.google.com/store/apps/details?id=com.example.app{i}",
+        "developer": "Example Inc.",
+        "rating": 4.4,
+        "price": "Free",
+        "genre": "Tools",
+        "description": "An example app with a long marketing description. " * 20,
+        "extensions": ["Contains ads", "In-app purchases"],
+        "serpapi_link": f"https://serpapi.com/search.json?engine=google_play_product&id={i}",
+        "screenshots": [f"https://play-lh.googleusercontent.com/shot{i}-{j}" for j in range(8)],
+    }
+
+
+def parse_whole(body: bytes, key: str, fields: tuple) -> list:
+    chunks = [body[i:i + SharedSession.CHUNK_SIZE] for i in range(0, len(body), SharedSession.CHUNK_SIZE)]
+    data = json.loads(b"".join(chunks).decode("utf-8"))
+    return [{f: item[f] for f in fields if f in item} for item in data.get(key, [])]
+
+
+def parse_streaming(body: bytes, key: str, fields: tuple) -> list:
+    stream = JsonArrayStream(key, fields)
+    items = []
+    for i in range(0, len(body), SharedSession.CHUNK_SIZE):
+        items.extend(stream.feed(body[i:i + SharedSession.CHUNK_SIZE]))
+    items.extend(stream.close())
+    return items
+
+
+def measure(fn, body: bytes, key: str, fields: tuple, repeat: int):
+    tracemalloc.start()
+    result = fn(body, key, fields)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(body, key, fields)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return result, peak, timings[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--results", type=int, default=200, help="Results per payload")
+    parser.add_argument("--repeat", type=int, default=30, help="Timed runs per case")
+    args = parser.parse_args()
+
+    cases = [
+        ("iTunes", "results", AppStoreAPI.RESULT_FIELDS, itunes_result),
+        ("SerpApi", "organic_results", GooglePlayAPI.RESULT_FIELDS, serpapi_result),
+    ]
+
+    print(f"{'payload':<10} {'size':>9} {'mode':<10} {'peak memory':>12} {'median time':>12}")
+    for name, key, fields, make in cases:
+        body = json.dumps({
+            "resultCount": args.results,
+            key: [make(i) for i in range(args.results)],
+        }).encode()
+        whole, whole_peak, whole_time = measure(parse_whole, body, key, fields, args.repeat)
+        streamed, stream_peak, stream_time = measure(parse_streaming, body, key, fields, args.repeat)
+        assert whole == streamed, "parsers disagree"
+
+        size = f"{len(body) / 1024:.0f} KiB"
+        for mode, peak, elapsed in (("whole", whole_peak, whole_time),
+                                    ("streaming", stream_peak, stream_time)):
+            print(f"{name:<10} {size:>9} {mode:<10} {peak / 1024:>8.0f} KiB {elapsed * 1000:>9.2f} ms")
+        print(f"{'':<10} {'':>9} {'ratio':<10} {stream_peak / whole_peak:>11.2f}x "
+              f"{stream_time / whole_time:>11.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-icon CPU time of the resize quality profiles
+
+Renders every standard icon size (16 to 1024) from typical sources: a
+1024px PNG as served by the App Store, and 512px JPEG and WebP thumbnails as
+served by Google Play. For each resize quality it reports the CPU time per
+icon, with and without PNG encoding, and the lowest PSNR of any output
+against the 'best' profile, which resamples every size from the original
+with LANCZOS (the former behaviour).
+
+Usage:
+    python3 scripts/bench_resize.py
+    python3 scripts/bench_resize.py --repeat 10 --sizes 64,128,256,512
+"""
+
+import argparse
+import io
+import math
+import os
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageChops, ImageStat
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app_store_icon_hunter.core.downloader import IconDownloader  # noqa: E402
+from app_store_icon_hunter.core.imaging import RESIZE_QUALITIES, render_icon_sizes  # noqa: E402
+
+
+def make_source(fmt: str, size: int) -> bytes:
+    """Icon-like artwork: fractal detail over smooth gradients"""
+    detail = Image.effect_mandelbrot((size, size), (-2, -1.5, 1, 1.5), 80)
+    icon = Image.merge("RGB", (detail, Image.radial_gradient("L").resize((size, size)),
+                               Image.linear_gradient("L").resize((size, size))))
+    buffer = io.BytesIO()
+    icon.save(buffer, fmt, **({"quality": 90} if fmt != "PNG" else {}))
+    return buffer.getvalue()
+
+
+def median_cpu(data: bytes, directory: str, sizes: list, quality: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.process_time()
+        render_icon_sizes(data, directory, sizes, quality)
+        timings.append(time.process_time() - started)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def psnr(a: Image.Image, b: Image.Image) -> float:
+    squares = ImageStat.Stat(ImageChops.difference(a.convert("RGB"), b.convert("RGB"))).sum2
+    mse = sum(squares) / (a.width * a.height * 3)
+    return float("inf") if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case")
+    parser.add_argument("--sizes", default=",".join(map(str, IconDownloader.STANDARD_SIZES)),
+                        help="Comma-separated sizes to render")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    sources = [("PNG 1024", make_source("PNG", 1024)),
+               ("JPEG 512", make_source("JPEG", 512)),
+               ("WebP 512", make_source("WEBP", 512))]
+
+    print(f"sizes: {sizes}")
+    print(f"{'source':<10} {'quality':<9} {'CPU/icon':>10} {'vs best':>8} "
+          f"{'resize only':>12} {'vs best':>8} {'min PSNR':>9}")
+    with tempfile.TemporaryDirectory() as root:
+        for name, data in sources:
+            outputs = {}
+            baseline = resize_baseline = None
+            for quality in RESIZE_QUALITIES:
+                directory = os.path.join(root, f"{name}-{quality}".replace(" ", "_"))
+                os.mkdir(directory)
+                elapsed = median_cpu(data, directory, sizes, quality, args.repeat)
+                paths = render_icon_sizes(data, directory, sizes, quality)
+                outputs[quality] = [Image.open(path) for path in paths]
+                # Same work with PNG encoding stubbed out
+                save = Image.Image.save
+                Image.Image.save = lambda *args, **kwargs: None
+                try:
+                    resize = median_cpu(data, directory, sizes, quality, args.repeat)
+                finally:
+                    Image.Image.save = save
+                baseline = baseline or elapsed
+                resize_baseline = resize_baseline or resize
+                worst = min(psnr(a, b) for a, b in zip(outputs["best"], outputs[quality]))
+                shown = "exact" if math.isinf(worst) else f"{worst:.1f} dB"
+                print(f"{name:<10} {quality:<9} {elapsed * 1000:>7.0f} ms {baseline / elapsed:>7.2f}x "
+                      f"{resize * 1000:>9.1f} ms {resize_baseline / resize:>7.2f}x {shown:>9}")
+
+
+if __name__ == "__main__":
+    main()
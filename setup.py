@@ -28,7 +28,7 @@ setup(
     install_requires=[
         "click>=8.0.0",
         "requests>=2.25.0",
-        "Pillow>=8.0.0",
+        "Pillow>=9.1.0",
         "fastapi>=0.68.0",
         "uvicorn>=0.15.0",
         "aiohttp>=3.8.0",
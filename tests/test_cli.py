@@ -24,12 +24,48 @@ class TestCLI:
         assert result.exit_code == 0
         assert "Search for apps" in result.output
     
+    def test_search_encoder_options(self):
+        """Test search offers encoder profiles and output formats"""
+        runner = CliRunner()
+        result = runner.invoke(cli, ['search', '--help'])
+        assert "--encoder" in result.output and "--image-format" in result.output
+        result = runner.invoke(cli, ['search', 'test', '--encoder', 'ultra'])
+        assert result.exit_code != 0
+        result = runner.invoke(cli, ['search', 'test', '--presets', 'ios,symbian'])
+        assert "Unknown export preset" in result.output
+        result = runner.invoke(cli, ['search', 'test', '--presets', 'ios', '--image-format', 'webp'])
+        assert "always PNG" in result.output
+    
     def test_list_command_help(self):
         """Test list command help"""
         runner = CliRunner()
         result = runner.invoke(cli, ['list', '--help'])
         assert result.exit_code == 0
         assert "Search and list apps" in result.output
+        assert "--countries" in result.output
+    
+    def test_invalid_sweep_country(self):
+        """Test invalid codes in --countries are rejected before searching"""
+        runner = CliRunner()
+        result = runner.invoke(cli, ['list', 'test', '--countries', 'us,usa'])
+        assert "Invalid country code" in result.output
+
+    def test_offline_search_uses_catalog(self, tmp_path, monkeypatch):
+        """Test --offline answers from the local catalog without contacting the stores"""
+        from app_store_icon_hunter.core.catalog import AppCatalog
+        from app_store_icon_hunter.core.models import AppRecord
+        path = str(tmp_path / "catalog.sqlite3")
+        AppCatalog(path).add([AppRecord(name="Offline App", bundle_id="com.example.offline",
+                                        store="appstore", developer="Example Inc.")])
+        monkeypatch.chdir(tmp_path)
+        runner = CliRunner()
+        result = runner.invoke(cli, ['list', 'offline', '--offline', '--catalog-path', path,
+                                     '--no-cache'])
+        assert result.exit_code == 0
+        # Listing never downloads, so no icon directory or store is created
+        assert not (tmp_path / "icons").exists()
+        assert "(local catalog)" in result.output
+        assert "Offline App" in result.output
 
 
 if __name__ == "__main__":
@@ -2,14 +2,82 @@
 Tests for core functionality
 """
 
+import asyncio
+import io
+import json
+import logging
+import time
+import zipfile
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
 import pytest
+import requests
+from PIL import Image, ImageCms
+from yarl import URL
 from app_store_icon_hunter.core.app_store import AppStoreAPI
+from app_store_icon_hunter.core.archive import iter_zip
+from app_store_icon_hunter.core.atlas import pack_atlas
+from app_store_icon_hunter.core.autocomplete import PrefixIndex
+from app_store_icon_hunter.core.cache import SearchCache
+from app_store_icon_hunter.core.downloader import IconDownloader
+from app_store_icon_hunter.core.imaging import ImagePool, ProcessingStats, render_icon_sizes
+from app_store_icon_hunter.core.catalog import AppCatalog
+from app_store_icon_hunter.core.jsonstream import JsonArrayStream, parse_array
+from app_store_icon_hunter.core.matching import CrossStoreMatcher
+from app_store_icon_hunter.core.models import AppRecord
 from app_store_icon_hunter.core.google_play import GooglePlayAPI
+from app_store_icon_hunter.core.http import SharedSession
+from app_store_icon_hunter.core.presets import PRESETS
+from app_store_icon_hunter.core.renditions import png_dimensions, rendition_url
+from app_store_icon_hunter.core.ratelimit import RateLimiter, TokenBucket, parse_retry_after
+from app_store_icon_hunter.core.resilience import (
+    CircuitBreaker, CircuitOpenError, RetryPolicy, call_with_resilience, call_with_resilience_sync
+)
+from app_store_icon_hunter.core.search import MultiStoreSearch
+from app_store_icon_hunter.core.singleflight import SingleFlight
 from app_store_icon_hunter.utils.helpers import (
     validate_icon_size, validate_store_name, clean_filename, format_app_name
 )
 
 
+class FakeSession:
+    """Stand-in for SharedSession that returns a canned JSON payload"""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.calls = []
+
+    async def get_json(self, url, params=None, timeout=None):
+        self.calls.append((url, params))
+        return self.payload
+
+    async def get_json_array(self, url, key, params=None, fields=None, timeout=None):
+        # Run the payload through the real streaming parser in small chunks
+        data = json.dumps(await self.get_json(url, params, timeout)).encode()
+        return parse_array(data, key, fields, chunk_size=7)
+
+    async def iter_json_array(self, url, key, params=None, fields=None, timeout=None):
+        for item in await self.get_json_array(url, key, params, fields, timeout):
+            yield item
+
+
+ITUNES_PAYLOAD = {
+    "resultCount": 1,
+    "results": [{
+        "trackName": "Test App",
+        "bundleId": "com.example.test",
+        "artworkUrl100": "https://is1-ssl.mzstatic.com/image/thumb/a/100x100bb.jpg",
+        "formattedPrice": "Free",
+        "averageUserRating": 4.5,
+        "artistName": "Example Inc.",
+        "primaryGenreName": "Utilities",
+        "trackViewUrl": "https://apps.apple.com/app/id123",
+    }],
+}
+
+
 class TestAppStoreAPI:
     """Test App Store API functionality"""
     
@@ -26,6 +94,45 @@ class TestAppStoreAPI:
         # Should return empty list for empty search term
         assert isinstance(results, list)
 
+    def test_asearch_apps_standardizes_results(self):
+        """Test async search converts iTunes results"""
+        api = AppStoreAPI(session=FakeSession(ITUNES_PAYLOAD))
+        results = asyncio.run(api.asearch_apps("test"))
+        assert results[0]["name"] == "Test App"
+        assert results[0]["store"] == "appstore"
+        assert "512x512" in results[0]["icon_url"]
+
+    def test_search_apps_sync_wrapper(self):
+        """Test the blocking wrapper delegates to the async client"""
+        session = FakeSession(ITUNES_PAYLOAD)
+        api = AppStoreAPI(session=session)
+        results = api.search_apps("test", country="gb", limit=5)
+        assert results[0]["bundle_id"] == "com.example.test"
+        assert session.calls[0][1]["country"] == "gb"
+
+    def test_get_app_details_bulk(self):
+        """Test bulk lookup batches identifiers and keeps request order"""
+        class LookupSession(FakeSession):
+            async def get_json(self, url, params=None, timeout=None):
+                self.calls.append((url, params))
+                results = []
+                for value in params.get("id", "").split(","):
+                    if value:
+                        results.append({"trackId": int(value), "bundleId": f"com.example.app{value}",
+                                        "trackName": f"App {value}"})
+                return {"results": results}
+
+        session = LookupSession(None)
+        api = AppStoreAPI(session=session)
+        api.LOOKUP_BATCH_SIZE = 2
+        apps = api.get_app_details_bulk([
+            "3", "https://apps.apple.com/us/app/example/id1", "id2", "3", "com.example.missing"
+        ])
+        assert [app["name"] for app in apps] == ["App 3", "App 1", "App 2"]
+        assert all(app["store"] == "appstore" for app in apps)
+        id_batches = [params["id"] for _, params in session.calls if "id" in params]
+        assert sorted(id_batches) == ["2", "3,1"]
+
 
 class TestGooglePlayAPI:
     """Test Google Play API functionality"""
@@ -41,6 +148,1063 @@ class TestGooglePlayAPI:
         assert api.api_key == "test_key"
 
 
+class SlowSession(FakeSession):
+    """FakeSession that answers only after a delay"""
+
+    def __init__(self, payload, delay):
+        super().__init__(payload)
+        self.delay = delay
+
+    async def get_json(self, url, params=None, timeout=None):
+        await asyncio.sleep(self.delay)
+        return await super().get_json(url, params, timeout)
+
+
+class TestMultiStoreSearch:
+    """Test concurrent multi-store search"""
+
+    def test_partial_results_on_timeout(self):
+        """Test a slow store times out without hiding the other store's results"""
+        searcher = MultiStoreSearch(
+            AppStoreAPI(session=FakeSession(ITUNES_PAYLOAD)),
+            GooglePlayAPI("test_key", session=SlowSession({"organic_results": []}, 1.0)),
+        )
+        outcome = asyncio.run(searcher.search("test", timeout=0.1))
+        assert [app["store"] for app in outcome["results"]] == ["appstore"]
+        assert outcome["stores"]["appstore"]["status"] == "ok"
+        assert outcome["stores"]["googleplay"]["status"] == "timeout"
+
+    def test_sweep_merges_countries_by_bundle_id(self):
+        """Test a sweep merges apps and records per-country icon differences"""
+        class CountrySession(FakeSession):
+            async def get_json(self, url, params=None, timeout=None):
+                self.calls.append((url, params))
+                result = dict(ITUNES_PAYLOAD["results"][0])
+                if params["country"] == "jp":
+                    result["artworkUrl100"] = "https://is1-ssl.mzstatic.com/image/thumb/jp/100x100bb.jpg"
+                return {"results": [result]}
+
+        session = CountrySession(None)
+        searcher = MultiStoreSearch(AppStoreAPI(session=session), GooglePlayAPI(session=session))
+        outcome = searcher.sweep_sync("test", ["us", "GB", "jp", "us"], store="appstore")
+        assert len(session.calls) == 3
+        assert len(outcome["results"]) == 1
+        app = outcome["results"][0]
+        assert app["countries"] == ["us", "gb", "jp"]
+        assert list(app["icon_urls"]) == ["jp"]
+        assert set(outcome["countries"]) == {"us", "gb", "jp"}
+
+    def test_sweep_is_paced_by_rate_limit(self):
+        """Test sweep requests queued on the rate limit do not use up their deadline"""
+        limiter = RateLimiter({"appstore": (20.0, 1)})
+
+        class LimitedSession(FakeSession):
+            async def get_json(self, url, params=None, timeout=None):
+                await limiter.acquire(url)
+                await asyncio.sleep(0.01)
+                return await super().get_json(url, params, timeout)
+
+        countries = ["us", "gb", "de", "fr", "jp", "it", "es", "ca", "au", "br", "mx", "nl"]
+        searcher = MultiStoreSearch(AppStoreAPI(session=LimitedSession(ITUNES_PAYLOAD)))
+        started = time.monotonic()
+        outcome = searcher.sweep_sync("test", countries, store="appstore", timeout=0.1)
+        # 12 requests at 20/s take over 0.5s, far beyond one deadline
+        assert time.monotonic() - started >= 0.5
+        assert {c: s["appstore"]["status"] for c, s in outcome["countries"].items()} == {
+            country: "ok" for country in countries
+        }
+
+    def test_sweep_endpoint_rejects_bad_timeout(self):
+        """Test the sweep endpoint answers 400 for a deadline that is not positive"""
+        from fastapi import HTTPException
+        from app_store_icon_hunter.api.main import SweepRequest, sweep_search
+        for timeout in (0, -1):
+            with pytest.raises(HTTPException) as raised:
+                asyncio.run(sweep_search(SweepRequest(term="test", countries=["us"], timeout=timeout)))
+            assert raised.value.status_code == 400
+
+    def test_stream_does_not_wait_for_slow_store(self):
+        """Test streamed results arrive before a slow store finishes or times out"""
+        searcher = MultiStoreSearch(
+            AppStoreAPI(session=FakeSession(ITUNES_PAYLOAD)),
+            GooglePlayAPI("test_key", session=SlowSession({"organic_results": []}, 1.0)),
+        )
+
+        async def collect():
+            return [event async for event in searcher.stream("test", limit=500, timeout=0.1)]
+
+        events = asyncio.run(collect())
+        assert [(e["type"], e.get("store")) for e in events] == [
+            ("result", "appstore"), ("status", "appstore"),
+            ("status", "googleplay"), ("done", None),
+        ]
+        assert events[0]["app"]["name"] == "Test App"
+        assert events[-1]["stores"]["googleplay"]["status"] == "timeout"
+        # The App Store limit is capped at its maximum page size
+        assert searcher.clients["appstore"].session.calls[0][1]["limit"] == 200
+
+    def test_stream_offset_paging(self):
+        """Test offsets are passed to iTunes and reported unsupported for Google Play"""
+        session = FakeSession(ITUNES_PAYLOAD)
+        searcher = MultiStoreSearch(
+            AppStoreAPI(session=session), GooglePlayAPI("test_key", session=FakeSession({}))
+        )
+
+        async def collect():
+            return [event async for event in searcher.stream("test", offset=50)]
+
+        stores = asyncio.run(collect())[-1]["stores"]
+        assert session.calls[0][1]["offset"] == 50
+        assert stores["appstore"]["count"] == 1
+        assert stores["googleplay"]["status"] == "unsupported"
+
+    def test_failure_status_hides_api_key(self):
+        """Test an HTTP error is reported without the request's query string or API key"""
+        async def unauthorized(request):
+            return web.Response(status=401, text="Invalid API key")
+
+        async def run_search():
+            application = web.Application()
+            application.router.add_get("/search.json", unauthorized)
+            runner = web.AppRunner(application)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+            session = SharedSession()
+            google_play = GooglePlayAPI("SECRET-KEY-123", session=session)
+            google_play.base_url = f"http://127.0.0.1:{port}/search.json"
+            searcher = MultiStoreSearch(AppStoreAPI(session=FakeSession(ITUNES_PAYLOAD)), google_play)
+            try:
+                return await searcher.search("secret term", store="googleplay"), port
+            finally:
+                await session.close()
+                await runner.cleanup()
+
+        outcome, port = asyncio.run(run_search())
+        status = outcome["stores"]["googleplay"]
+        assert status["status"] == "error"
+        assert status["error"] == f"HTTP 401 from http://127.0.0.1:{port}/search.json"
+        assert "SECRET" not in json.dumps(status) and "?" not in status["error"]
+
+    def test_unconfigured_store_is_reported(self):
+        """Test Google Play without an API key is reported as unavailable"""
+        google_play = GooglePlayAPI(session=FakeSession({}))
+        google_play.api_key = None
+        searcher = MultiStoreSearch(AppStoreAPI(session=FakeSession(ITUNES_PAYLOAD)), google_play)
+        outcome = searcher.search_sync("test", store="googleplay")
+        assert outcome["results"] == []
+        assert outcome["stores"]["googleplay"]["status"] == "unavailable"
+
+
+class TestAppRecord:
+    """Test the slotted app record"""
+
+    def test_dict_compatible_access(self):
+        """Test records behave like the standardized dictionaries"""
+        record = AppRecord(name="Test", store="appstore", rating="4.5")
+        assert record["name"] == record.get("name") == "Test"
+        assert record.get("missing", "default") == "default"
+        assert record["rating"] == 4.5
+        assert dict(record)["store"] == "appstore"
+        record["countries"] = ["us"]
+        assert record.to_dict()["countries"] == ["us"]
+        copy = record.copy()
+        copy["countries"].append("gb")
+        assert copy["countries"] == ["us", "gb"]
+        del copy["countries"]
+        assert "countries" in record and "countries" not in copy
+        assert not hasattr(record, "__dict__")
+
+    def test_strings_are_interned(self):
+        """Test low-cardinality fields share one string object"""
+        first = AppRecord(category="".join(["Util", "ities"]))
+        second = AppRecord(category="".join(["Utilit", "ies"]))
+        assert first.category is second.category
+
+    def test_description_limit(self):
+        """Test clients can truncate descriptions"""
+        payload = {"results": [dict(ITUNES_PAYLOAD["results"][0], description="x" * 500)]}
+        api = AppStoreAPI(session=FakeSession(payload), description_limit=100)
+        assert len(api.search_apps("test")[0]["description"]) == 100
+
+    def test_validates_as_response_model(self):
+        """Test records convert to the API response model without copying to dicts"""
+        from app_store_icon_hunter.api.main import AppSearchResult
+        result = AppSearchResult(**AppRecord(name="Test", bundle_id="com.example", store="appstore"))
+        assert result.name == "Test"
+        assert result.rating is None
+
+
+class TestJsonArrayStream:
+    """Test incremental parsing of upstream result arrays"""
+
+    DOCUMENT = {
+        "resultCount": 2,
+        "results": [
+            {"trackName": "Caf\u00e9 \u2603", "screenshotUrls": ["a", "]}"], "averageUserRating": 4},
+            {"trackName": "Quote \" ]", "averageUserRating": 12345},
+        ],
+        "trailing": {"ignored": [1, 2]},
+    }
+
+    def test_chunk_boundaries(self):
+        """Test items and projections survive any chunk split, including inside UTF-8"""
+        data = json.dumps(self.DOCUMENT, ensure_ascii=False).encode()
+        expected = [
+            {"trackName": "Caf\u00e9 \u2603", "averageUserRating": 4},
+            {"trackName": "Quote \" ]", "averageUserRating": 12345},
+        ]
+        for chunk_size in (1, 2, 5, 64, len(data)):
+            fields = ("trackName", "averageUserRating")
+            assert parse_array(data, "results", fields, chunk_size) == expected
+
+    def test_numbers_split_across_chunks(self):
+        """Test a float or exponent cut after '.' or 'e' waits for the rest of the number"""
+        stream = JsonArrayStream("results")
+        assert stream.feed(b'{"took": 1.') == []
+        assert stream.feed(b'5, "results": [2e') == []
+        assert stream.feed(b"3, -0.") == [2000.0]
+        assert stream.feed(b"25]}") == [-0.25]
+        assert stream.close() == []
+
+    def test_missing_key_and_errors(self):
+        """Test a missing array yields nothing and malformed bodies raise ValueError"""
+        stream = JsonArrayStream("results")
+        assert stream.feed(b'{"error": "nope"}') == []
+        assert stream.close() == [] and not stream.found
+        for body in (b'{"results": [{"a": 1},', b"[1, 2]", b'{"results": {}}', b""):
+            with pytest.raises(ValueError):
+                parse_array(body, "results")
+
+    def test_clients_parse_without_streaming(self):
+        """Test the whole-document path still works when streaming is disabled"""
+        api = AppStoreAPI(session=FakeSession(ITUNES_PAYLOAD), streaming_parse=False)
+        assert api.search_apps("test")[0]["name"] == "Test App"
+
+
+class TestAppCatalog:
+    """Test the local app catalog"""
+
+    def test_upsert_and_full_text_search(self):
+        """Test records upsert by store and bundle ID and match by word prefix"""
+        catalog = AppCatalog()
+        catalog.add([
+            AppRecord(name="Photo Editor", bundle_id="com.example.photo", store="appstore",
+                      developer="Caf\u00e9 Apps", category="Photography"),
+            AppRecord(name="Photo Editor", bundle_id="com.example.photo", store="googleplay"),
+            AppRecord(name="No bundle", store="appstore"),
+        ])
+        catalog.add([AppRecord(name="Photo Editor Pro", bundle_id="com.example.photo",
+                               store="appstore", category="Photography")])
+        assert catalog.stats()["apps"] == 2
+        assert [app["name"] for app in catalog.search("edit pro")] == ["Photo Editor Pro"]
+        assert [app["store"] for app in catalog.search("photo", store="googleplay")] == ["googleplay"]
+        assert catalog.search("cafe") == []  # Developer was refreshed by the upsert
+        assert catalog.search("photo", max_age=-1) == []
+        assert catalog.search("photo")[0]["last_seen"] > 0
+
+    def test_clients_record_seen_apps(self):
+        """Test search results are written to the catalog"""
+        catalog = AppCatalog()
+        AppStoreAPI(session=FakeSession(ITUNES_PAYLOAD), catalog=catalog).search_apps("test")
+        assert catalog.get("appstore", "com.example.test")["name"] == "Test App"
+
+    def test_search_sources(self):
+        """Test local, local-first and remote search sources"""
+        catalog = AppCatalog()
+        session = FakeSession(ITUNES_PAYLOAD)
+        searcher = MultiStoreSearch(AppStoreAPI(session=session), catalog=catalog)
+
+        outcome = searcher.search_sync("test", store="appstore", source="local")
+        assert outcome["results"] == [] and outcome["stores"]["appstore"]["source"] == "local"
+        outcome = searcher.search_sync("test", store="appstore", source="local_first")
+        assert outcome["stores"]["appstore"]["source"] == "remote"
+        assert len(session.calls) == 1
+
+        catalog.add(outcome["results"])
+        outcome = searcher.search_sync("test", store="appstore", source="local_first")
+        assert outcome["stores"]["appstore"]["source"] == "local"
+        assert len(session.calls) == 1
+        with pytest.raises(ValueError):
+            MultiStoreSearch(AppStoreAPI(session=session)).search_sync("test", source="local")
+
+
+class TestPrefixIndex:
+    """Test the autocomplete prefix index"""
+
+    APPS = [
+        AppRecord(name="Photo Editor", bundle_id="com.a.photo", store="appstore",
+                  developer="Caf\u00e9 Labs", rating=3.0),
+        AppRecord(name="Photoshop Express", bundle_id="com.adobe.ps", store="appstore",
+                  developer="Adobe", rating=4.8),
+        AppRecord(name="Phone", bundle_id="com.g.phone", store="googleplay", rating=4.0),
+    ]
+
+    def test_word_prefixes_and_ranking(self):
+        """Test any word start matches and higher rated apps come first"""
+        index = PrefixIndex()
+        index.add(self.APPS)
+        assert [app["name"] for app in index.complete("pho")] == [
+            "Photoshop Express", "Phone", "Photo Editor"
+        ]
+        assert [app["name"] for app in index.complete("photo ")] == [
+            "Photoshop Express", "Photo Editor"
+        ]
+        assert [app["name"] for app in index.complete("EDI")] == ["Photo Editor"]
+        assert [app["name"] for app in index.complete("cafe")] == ["Photo Editor"]
+        assert index.complete("pho", store="googleplay")[0]["name"] == "Phone"
+        assert index.complete("xyz") == [] and index.complete("  ") == []
+
+    def test_incremental_updates(self):
+        """Test apps seen more often rise, and new apps are found without a rebuild"""
+        index = PrefixIndex(top_k=2)
+        index.add(self.APPS)
+        for _ in range(20):
+            index.add([self.APPS[0]])
+        assert index.complete("pho", limit=1)[0]["name"] == "Photo Editor"
+        index.add([AppRecord(name="Phonics", bundle_id="com.p.phonics", store="appstore")])
+        assert [app["name"] for app in index.complete("phoni")] == ["Phonics"]
+        assert len(index) == 4
+
+    def test_fed_by_clients_and_cache(self):
+        """Test fresh search results and cached records reach the index"""
+        index = PrefixIndex()
+        cache = SearchCache()
+        AppStoreAPI(session=FakeSession(ITUNES_PAYLOAD), cache=cache,
+                    prefix_index=index).search_apps("test")
+        assert index.complete("test")[0]["bundle_id"] == "com.example.test"
+        seeded = PrefixIndex()
+        assert seeded.add(cache.records()) == 1
+        assert seeded.complete("example")[0]["name"] == "Test App"
+
+
+class TestCrossStoreMatcher:
+    """Test pairing App Store and Google Play records"""
+
+    APPS = [
+        AppRecord(name="Photo Editor Pro", developer="Lumen Labs Inc.",
+                  bundle_id="com.lumen.photo", store="appstore"),
+        AppRecord(name="Photo Editor Pro - Free", developer="Lumen Labs LLC",
+                  bundle_id="com.lumen.photo.android", store="googleplay"),
+        AppRecord(name="Photo Album", developer="Someone Else",
+                  bundle_id="org.album", store="googleplay"),
+        AppRecord(name="Nightsky", developer="Star Co",
+                  bundle_id="com.star.nightsky", store="appstore"),
+        AppRecord(name="Night Sky Map", developer="Orbit",
+                  bundle_id="com.star.nightsky", store="googleplay"),
+    ]
+
+    def test_pairs_same_product_one_to_one(self):
+        """Test renamed listings pair, lookalikes do not, and bundle IDs count"""
+        matcher = CrossStoreMatcher()
+        pairs = matcher.match(self.APPS)
+        paired = {(a["bundle_id"], b["bundle_id"]) for a, b, _ in pairs}
+        assert paired == {
+            ("com.lumen.photo", "com.lumen.photo.android"),
+            ("com.star.nightsky", "com.star.nightsky"),
+        }
+        assert all(0.75 <= score <= 1 for _, _, score in pairs)
+        assert matcher.last_stats["records"] == 5
+        assert matcher.last_stats["pairs"] == 2
+
+        # A second App Store copy cannot claim an already paired listing
+        duplicate = AppRecord(name="Photo Editor Pro", developer="Lumen Labs",
+                              bundle_id="com.lumen.photo2", store="appstore")
+        pairs = matcher.match(self.APPS + [duplicate])
+        assert len([b for _, b, _ in pairs if b["bundle_id"] == "com.lumen.photo.android"]) == 1
+
+    def test_search_annotates_pairs(self):
+        """Test searching both stores links the two listings of an app"""
+        google_play = {"organic_results": [{
+            "title": "Test App - Free", "product_id": "com.example.test.android",
+            "developer": "Example LLC", "thumbnail": "https://play-lh.googleusercontent.com/t",
+        }]}
+        searcher = MultiStoreSearch(
+            AppStoreAPI(session=FakeSession(ITUNES_PAYLOAD)),
+            GooglePlayAPI("test_key", session=FakeSession(google_play)),
+        )
+        outcome = asyncio.run(searcher.search("test"))
+        by_store = {app["store"]: app for app in outcome["results"]}
+        assert by_store["appstore"]["paired_with"]["bundle_id"] == "com.example.test.android"
+        assert by_store["googleplay"]["paired_with"]["store"] == "appstore"
+
+        outcome = asyncio.run(searcher.search("test", store="appstore"))
+        assert "paired_with" not in outcome["results"][0]
+
+    def test_match_request_rejects_non_string_fields(self):
+        """Test /match bodies with non-string names or developers fail validation"""
+        from pydantic import ValidationError
+        from app_store_icon_hunter.api.main import MatchRequest
+        for app in ({"name": 123}, {"name": "Test", "developer": ["Example"]}, {"developer": "Example"}):
+            with pytest.raises(ValidationError):
+                MatchRequest(apps=[app])
+
+        request = MatchRequest(apps=[{"name": "Test", "store": "appstore", "icon_hash": "ff00", "rank": 1}])
+        assert request.apps[0].name == "Test"
+        assert request.apps[0].developer is None
+
+
+class TestSearchCache:
+    """Test the search result cache"""
+
+    def test_key_normalization(self):
+        """Test equivalent searches share a key"""
+        assert SearchCache.make_key("appstore", "  Spotify  Music", "US", 10) == \
+            SearchCache.make_key("appstore", "spotify music", "us", 10)
+
+    def test_ttl_and_lru_eviction(self):
+        """Test entries expire and the least recently used entry is evicted"""
+        cache = SearchCache(ttl=0.05, max_entries=2)
+        cache.set("a", [AppRecord(name="A")])
+        cache.set("b", [AppRecord(name="B")])
+        cache.get("a")
+        cache.set("c", [AppRecord(name="C")])
+        assert cache.get("b") is None
+        assert cache.get("a")[0]["name"] == "A"
+        time.sleep(0.1)
+        assert cache.get("a") is None
+        assert cache.stats()["evictions"] == 1
+
+    def test_disk_tier_is_shared(self, tmp_path):
+        """Test a second cache instance sees entries written to SQLite"""
+        path = tmp_path / "cache.sqlite3"
+        SearchCache(path=path).set("key", [AppRecord(name="A")])
+        other = SearchCache(path=path)
+        assert [app["name"] for app in other.get("key")] == ["A"]
+        assert other.stats()["disk_hits"] == 1
+
+    def test_client_uses_cache(self):
+        """Test repeated searches reach the upstream once"""
+        session = FakeSession(ITUNES_PAYLOAD)
+        api = AppStoreAPI(session=session, cache=SearchCache())
+        api.search_apps("Test")
+        results = api.search_apps("test ")
+        assert len(session.calls) == 1
+        assert results[0]["name"] == "Test App"
+
+
+class TestSingleFlight:
+    """Test coalescing of identical in-flight searches"""
+
+    def test_concurrent_searches_share_one_request(self):
+        """Test identical concurrent searches reach the upstream once"""
+        session = SlowSession(ITUNES_PAYLOAD, 0.05)
+        api = AppStoreAPI(session=session)
+
+        async def run():
+            return await asyncio.gather(*[api.asearch_apps("test") for _ in range(5)])
+
+        results = asyncio.run(run())
+        assert len(session.calls) == 1
+        assert all(r[0]["name"] == "Test App" for r in results)
+        assert results[0][0] is not results[1][0]
+        assert api.singleflight.stats()["coalesced"] == 4
+
+    def test_errors_reach_every_waiter(self):
+        """Test a failed shared call raises in every waiter"""
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def run():
+            return await asyncio.gather(
+                flight.do("key", fail), flight.do("key", fail), return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        assert all(isinstance(r, ValueError) for r in results)
+        assert flight.stats() == {"calls": 2, "executions": 1, "coalesced": 1, "in_flight": 0}
+
+    def test_abandoned_call_is_cancelled(self):
+        """Test shared work stops once every caller has given up, and is started afresh"""
+        flight = SingleFlight()
+        finished = []
+
+        async def slow():
+            await asyncio.sleep(0.2)
+            finished.append(True)
+            return "done"
+
+        async def run():
+            waiters = [asyncio.ensure_future(flight.do("key", slow)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            waiters[0].cancel()
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(waiters[1], 0.05)
+            await asyncio.sleep(0.25)
+            return await flight.do("key", slow)
+
+        assert asyncio.run(run()) == "done"
+        assert finished == [True]
+        assert flight.stats() == {"calls": 3, "executions": 2, "coalesced": 1, "in_flight": 0}
+
+
+class TestRateLimiter:
+    """Test per-host token buckets"""
+
+    def test_bucket_spaces_requests_after_burst(self):
+        """Test requests beyond the burst are delayed at the configured rate"""
+        bucket = TokenBucket(rate=10, burst=2)
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+        assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+    def test_throttle_halves_rate_and_honors_retry_after(self):
+        """Test a 429 shrinks the rate and pauses for Retry-After"""
+        limiter = RateLimiter(rates={"appstore": (4, 4)})
+        url = "https://itunes.apple.com/search"
+        limiter.record(url, 429, "3")
+        bucket = limiter.bucket(url)
+        assert bucket.rate == 2
+        assert bucket.reserve() == pytest.approx(3, abs=0.05)
+        assert bucket.reserve() == pytest.approx(3.5, abs=0.05)
+        limiter.record(url, 200)
+        assert bucket.rate > 2
+
+    def test_hosts_resolve_by_suffix(self):
+        """Test CDN hosts share the configured suffix limits but not buckets"""
+        limiter = RateLimiter()
+        first = limiter.bucket("https://is1-ssl.mzstatic.com/a.png")
+        second = limiter.bucket("https://is2-ssl.mzstatic.com/b.png")
+        assert first is not second
+        assert first.max_rate == second.max_rate == 50.0
+        assert RateLimiter(default_rate=None).bucket("https://example.com/") is None
+
+    def test_parse_retry_after(self):
+        """Test Retry-After parsing"""
+        assert parse_retry_after("120") == 120.0
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+
+
+def http_error(status):
+    """Build the aiohttp error raised by raise_for_status()"""
+    url = URL("https://upstream.test/")
+    request_info = aiohttp.RequestInfo(url, "GET", {}, url)
+    return aiohttp.ClientResponseError(request_info=request_info, history=(), status=status)
+
+
+class TestResilience:
+    """Test retries and circuit breaking"""
+
+    def test_retries_transient_errors(self):
+        """Test a 503 is retried and a later success is returned"""
+        outcomes = [http_error(503), http_error(503), {"ok": True}]
+
+        async def flaky():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        retry = RetryPolicy(attempts=3, base_delay=0.001)
+        assert asyncio.run(call_with_resilience(flaky, retry)) == {"ok": True}
+
+    def test_retry_logs_hide_api_key(self, caplog):
+        """Test retry debug logs name the failed URL without its query string"""
+        url = URL("https://serpapi.test/search.json?api_key=SECRET-KEY-123")
+        error = aiohttp.ClientResponseError(aiohttp.RequestInfo(url, "GET", {}, url), (), status=503)
+        response = requests.Response()
+        response.status_code, response.url = 503, str(url)
+        retry = RetryPolicy(attempts=2, base_delay=0.001)
+
+        async def failing():
+            raise error
+
+        def failing_sync():
+            raise requests.HTTPError("503 Server Error for url: " + str(url), response=response)
+
+        with caplog.at_level(logging.DEBUG, logger="app_store_icon_hunter.core.resilience"):
+            with pytest.raises(aiohttp.ClientResponseError):
+                asyncio.run(call_with_resilience(failing, retry))
+            with pytest.raises(requests.HTTPError):
+                call_with_resilience_sync(failing_sync, retry)
+        retries = [record.getMessage() for record in caplog.records if "Retrying" in record.getMessage()]
+        assert len(retries) == 2
+        assert all("HTTP 503 from https://serpapi.test/search.json" in message for message in retries)
+        assert "SECRET-KEY-123" not in caplog.text
+
+    def test_client_errors_are_not_retried(self):
+        """Test a 404 fails immediately without opening the breaker"""
+        calls = []
+        breaker = CircuitBreaker("test", min_calls=1)
+
+        async def missing():
+            calls.append(1)
+            raise http_error(404)
+
+        with pytest.raises(aiohttp.ClientResponseError):
+            asyncio.run(call_with_resilience(missing, RetryPolicy(base_delay=0.001), breaker))
+        assert len(calls) == 1
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_breaker_opens_and_recovers(self):
+        """Test the breaker fails fast after errors and closes after a good probe"""
+        breaker = CircuitBreaker("test", min_calls=2, cooldown=0.05)
+
+        async def down():
+            raise http_error(500)
+
+        async def up():
+            return "ok"
+
+        for _ in range(2):
+            with pytest.raises(aiohttp.ClientResponseError):
+                asyncio.run(call_with_resilience(down, breaker=breaker))
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(call_with_resilience(up, breaker=breaker))
+        time.sleep(0.06)
+        assert asyncio.run(call_with_resilience(up, breaker=breaker)) == "ok"
+        assert breaker.stats()["state"] == "closed"
+
+    def test_store_failure_is_reported_not_empty(self):
+        """Test an upstream 5xx surfaces as an error status rather than no results"""
+        class FailingSession(FakeSession):
+            async def get_json(self, url, params=None, timeout=None):
+                raise http_error(502)
+
+        api = AppStoreAPI(session=FailingSession(None), retry=RetryPolicy(base_delay=0.001),
+                          breaker=CircuitBreaker("test"))
+        outcome = MultiStoreSearch(api, GooglePlayAPI(session=FakeSession({}))).search_sync(
+            "test", store="appstore"
+        )
+        assert outcome["stores"]["appstore"]["status"] == "error"
+
+
+class TestIconDownloader:
+    """Test batch download scheduling"""
+
+    def test_bounded_workers_ordered_results(self, tmp_path):
+        """Test at most max_concurrency apps run at once and results keep input order"""
+        class TrackingDownloader(IconDownloader):
+            active = peak = 0
+            progress_seen = []
+
+            async def _download_app_icon(self, session, app, sizes, job_id):
+                self.progress_seen.append(self.jobs[job_id]["progress"])
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+                await asyncio.sleep(0.001 * (app["delay"]))
+                self.active -= 1
+                if app["name"] == "App 3":
+                    raise ValueError("no icon")
+                return {"app": app, "files": [], "directory": ""}
+
+        downloader = TrackingDownloader(str(tmp_path), max_concurrency=4)
+        apps = [{"name": f"App {i}", "delay": (7 * i) % 5} for i in range(20)]
+        status = asyncio.run(downloader.download_icons_async(apps, [64], "job"))
+        assert downloader.peak == 4
+        assert status["progress"] == status["total"] == 20
+        assert status["completed_apps"] == [f"App {i}" for i in range(20) if i != 3]
+        assert status["failed_apps"] == [{"app": "App 3", "error": "no icon"}]
+        # Progress advanced while the batch was still running
+        assert max(downloader.progress_seen) >= 16
+
+        with pytest.raises(ValueError):
+            IconDownloader(str(tmp_path), max_concurrency=0)
+
+    @pytest.mark.parametrize("kind", ["thread", "process"])
+    def test_image_pool_renders_sizes(self, tmp_path, kind):
+        """Test icons are resized on the pool and jobs report processing stats"""
+        buffer = io.BytesIO()
+        Image.new("RGB", (100, 100), (200, 40, 40)).save(buffer, "PNG")
+        image_data = buffer.getvalue()
+
+        downloader = IconDownloader(str(tmp_path), image_pool=ImagePool(kind, workers=2))
+        downloader.jobs["job"] = {}
+        downloader._processing["job"] = ProcessingStats(kind, 2)
+
+        async def render():
+            return await asyncio.gather(*(
+                downloader._resize_icon(image_data, tmp_path, [16, 32, 100], "job")
+                for _ in range(3)
+            ))
+        try:
+            results = asyncio.run(render())
+        finally:
+            downloader.close()
+        assert results[0] == [str(tmp_path / "icon_16x16.png"), str(tmp_path / "icon_32x32.png")]
+        assert Image.open(tmp_path / "icon_32x32.png").size == (32, 32)
+        processing = downloader.get_job_status("job")["processing"]
+        assert processing["executor"] == kind and processing["images"] == 3
+        assert processing["speedup"] > 0
+
+    @pytest.mark.parametrize("quality", ["best", "balanced", "fast"])
+    def test_resize_cascade_and_passthrough(self, tmp_path, quality):
+        """Test every profile renders the requested sizes and keeps exact-size PNGs as is"""
+        buffer = io.BytesIO()
+        Image.radial_gradient("L").convert("RGBA").save(buffer, "PNG")
+        source = buffer.getvalue()  # 256x256
+
+        paths = render_icon_sizes(source, str(tmp_path), [32, 256, 16, 64, 32], quality)
+        assert [Path(path).name for path in paths] == [
+            "icon_32x32.png", "icon_256x256.png", "icon_16x16.png", "icon_64x64.png"
+        ]
+        assert (tmp_path / "icon_256x256.png").read_bytes() == source
+        for path in paths:
+            image = Image.open(path)
+            assert image.size[0] == image.size[1] and image.mode == "RGBA"
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (512, 512), (10, 200, 30)).save(buffer, "JPEG")
+        paths = render_icon_sizes(buffer.getvalue(), str(tmp_path), [48], quality)
+        assert Image.open(paths[0]).size == (48, 48)
+
+        with pytest.raises(ValueError):
+            render_icon_sizes(source, str(tmp_path), [16], "ultra")
+
+    def test_encoder_profiles_and_formats(self, tmp_path):
+        """Test encoder profiles write lossless WebP, indexed tiny PNGs and no color profile"""
+        icon = Image.new("RGBA", (128, 128), (0, 0, 0, 0))
+        icon.paste((240, 80, 20, 255), (16, 16, 112, 112))
+        buffer = io.BytesIO()
+        icon.save(buffer, "PNG", icc_profile=ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes())
+
+        sizes = [16, 64, 128]
+        webp = render_icon_sizes(buffer.getvalue(), str(tmp_path), sizes, "best", "fast", "webp")
+        assert [Path(path).name for path in webp] == [f"icon_{size}x{size}.webp" for size in sizes]
+        assert Image.open(webp[2]).convert("RGBA").tobytes() == icon.tobytes()
+
+        smallest = render_icon_sizes(buffer.getvalue(), str(tmp_path), sizes, "best", "smallest")
+        for path in smallest:
+            image = Image.open(path)
+            assert image.mode == "P" and "icc_profile" not in image.info
+        assert Image.open(smallest[2]).convert("RGBA").tobytes() == icon.tobytes()
+
+        with pytest.raises(ValueError):
+            render_icon_sizes(buffer.getvalue(), str(tmp_path), sizes, "best", "tiny")
+        with pytest.raises(ValueError):
+            IconDownloader(str(tmp_path), image_format="gif")
+
+        class StaticDownloader(IconDownloader):
+            async def _fetch_icon(self, session, icon_url, headers=None):
+                return buffer.getvalue(), {}
+
+        downloader = StaticDownloader(str(tmp_path / "jobs"))
+        apps = [{"name": "Orange", "icon_url": "https://example.com/o.png"}]
+        try:
+            status = asyncio.run(downloader.download_icons_async(apps, [32], "job", "smallest", "webp"))
+            asyncio.run(downloader.download_icons_async(apps, [32], "default"))
+        finally:
+            downloader.close()
+        assert status["encoding"] == {"encoder": "smallest", "format": "webp"}
+        assert [name for name, _ in downloader.archive_entries("job")] == ["Orange/original.png",
+                                                                           "Orange/icon_32x32.webp"]
+        assert (tmp_path / "jobs" / "default" / "Orange" / "icon_32x32.png").exists()
+        assert downloader.blob_store.stats()["variants"] == 2
+
+    def test_export_presets(self, tmp_path):
+        """Test presets write platform layouts and containers from one pass over the icon"""
+        icon = Image.new("RGBA", (256, 256), (0, 0, 0, 0))
+        icon.paste((30, 120, 240, 255), (32, 32, 224, 224))
+        buffer = io.BytesIO()
+        icon.save(buffer, "PNG")
+
+        class StaticDownloader(IconDownloader):
+            async def _fetch_icon(self, session, icon_url, headers=None):
+                return buffer.getvalue(), {}
+
+        downloader = StaticDownloader(str(tmp_path))
+        apps = [{"name": "Blue", "icon_url": "https://example.com/b.png"}]
+        try:
+            status = asyncio.run(downloader.download_icons_async(apps, job_id="job", presets=list(PRESETS)))
+            with pytest.raises(ValueError):
+                asyncio.run(downloader.download_icons_async(apps, presets=["ios", "symbian"]))
+            with pytest.raises(ValueError):
+                asyncio.run(downloader.download_icons_async(apps, presets=["ios"], image_format="webp"))
+        finally:
+            downloader.close()
+        assert status["completed_apps"] == ["Blue"] and status["processing"]["images"] == 1
+        assert status["encoding"]["format"] == "png"
+
+        names = {name for name, _ in downloader.archive_entries("job")}
+        for name in ("ios/AppIcon.appiconset/Contents.json", "android/res/mipmap-xxxhdpi/ic_launcher.png",
+                     "macos/AppIcon.icns", "windows/app.ico", "web/favicon.ico", "web/site.webmanifest"):
+            assert f"Blue/{name}" in names
+        assert not any("icon_64x64" in name for name in names)
+
+        app_dir = tmp_path / "job" / "Blue"
+        iconset = app_dir / "ios" / "AppIcon.appiconset"
+        slots = json.loads((iconset / "Contents.json").read_text())["images"]
+        assert len(slots) == 18
+        for slot in slots:
+            image = Image.open(iconset / slot["filename"])
+            points = float(slot["size"].split("x")[0])
+            assert image.size[0] == round(points * int(slot["scale"][0])) and image.mode == "RGB"
+        assert Image.open(app_dir / "android" / "res" / "mipmap-hdpi" / "ic_launcher.png").size == (72, 72)
+        assert Image.open(app_dir / "windows" / "app.ico").info["sizes"] == {
+            (size, size) for size in (16, 24, 32, 48, 64, 128, 256)
+        }
+        assert Image.open(app_dir / "macos" / "AppIcon.icns").size == (1024, 1024)
+
+    def test_job_atlas(self, tmp_path):
+        """Test a job's icons of one size are packed into sheets with a stable index"""
+        colors = {"a": (200, 0, 0), "b": (0, 200, 0), "c": (0, 0, 200)}
+
+        class ColorDownloader(IconDownloader):
+            async def _fetch_icon(self, session, icon_url, headers=None):
+                buffer = io.BytesIO()
+                Image.new("RGB", (64, 64), colors[icon_url[-1]]).save(buffer, "PNG")
+                return buffer.getvalue(), {}
+
+        downloader = ColorDownloader(str(tmp_path))
+        apps = [{"name": "Red App", "icon_url": "https://example.com/a"},
+                {"name": "Green App", "icon_url": "https://example.com/b"},
+                {"name": "Red App!", "icon_url": "https://example.com/c"}]
+        try:
+            asyncio.run(downloader.download_icons_async(apps, [16, 32], "job"))
+            index = downloader.build_atlas("job", 16)
+            assert downloader.build_atlas("job", 16) is index
+            assert downloader.build_atlas("job", 64)["icons"] == {}
+            assert not downloader.atlas_dir("job", 64).exists()
+            assert downloader.jobs["job"]["sizes"] == [16, 32]
+            assert downloader.build_atlas("unknown", 16) is None
+        finally:
+            downloader.close()
+
+        assert len(index["sheets"]) == 1 and len(index["icons"]) == 3
+        sheet = Image.open(downloader.atlas_file("job", 16, index["sheets"][0]["file"])).convert("RGB")
+        assert sheet.size == (48, 16)
+        for app in apps:
+            place = index["icons"][app["name"]]
+            pixel = sheet.getpixel((place["x"] + 8, place["y"] + 8))
+            assert max(abs(a - b) for a, b in zip(pixel, colors[app["icon_url"][-1]])) <= 2
+        assert {place["css_class"] for place in index["icons"].values()} == {
+            "icon-red-app", "icon-green-app", "icon-red-app-2"
+        }
+
+        css = downloader.atlas_file("job", 16, "atlas.css").read_text()
+        assert f".icon-red-app-2{{background-image:url({index['sheets'][0]['file']})" in css
+        assert downloader.atlas_file("job", 16, "../index.json") is None
+
+        # Repacking the same icons gives the same sheet names and ETag
+        repacked = pack_atlas([(name, tmp_path / "job" / name / "icon_16x16.png") for name in index["icons"]],
+                              16, tmp_path / "repack")
+        assert repacked["etag"] == index["etag"] and repacked["sheets"] == index["sheets"]
+        # Icons that do not fit spill onto more sheets
+        split = pack_atlas([(name, tmp_path / "job" / name / "icon_32x32.png") for name in index["icons"]],
+                           32, tmp_path / "split", max_sheet_size=40)
+        assert [(sheet["width"], sheet["height"]) for sheet in split["sheets"]] == [(32, 32)] * 3
+        # Apps are packed in the order they finished
+        position = list(index["icons"]).index("Red App!")
+        assert split["icons"]["Red App!"] == dict(index["icons"]["Red App!"], sheet=position, x=0, y=0,
+                                                  width=32, height=32)
+
+    def test_repeat_jobs_reuse_stored_icons(self, tmp_path):
+        """Test a second job links the stored original and sizes instead of rendering"""
+        buffer = io.BytesIO()
+        Image.new("RGB", (128, 128), (0, 90, 200)).save(buffer, "PNG")
+
+        class StaticDownloader(IconDownloader):
+            async def _fetch_icon(self, session, icon_url, headers=None):
+                return buffer.getvalue(), {}
+
+        downloader = StaticDownloader(str(tmp_path))
+        apps = [{"name": "Blue", "icon_url": "https://example.com/a.png"},
+                {"name": "Same Icon", "icon_url": "https://example.com/b.png"}]
+        try:
+            first = asyncio.run(downloader.download_icons_async(apps, [32, 64], "first"))
+            second = asyncio.run(downloader.download_icons_async(apps[:1], [32, 64], "second"))
+        finally:
+            downloader.close()
+
+        assert first["processing"]["images"] + first["processing"]["reused"] == 2
+        assert first["processing"]["images"] >= 1
+        assert second["processing"]["images"] == 0 and second["processing"]["reused"] == 1
+        for name in ("original.png", "icon_32x32.png", "icon_64x64.png"):
+            inodes = {(tmp_path / job / app / name).stat().st_ino
+                      for job, app in (("first", "Blue"), ("first", "Same Icon"), ("second", "Blue"))}
+            assert len(inodes) == 1
+        stats = downloader.blob_store.stats()
+        assert stats["objects"] == 1 and stats["variants"] == 2
+
+    def test_unchanged_icons_are_revalidated(self, tmp_path):
+        """Test a repeat fetch sends validators and reuses the stored icon on 304"""
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 64), (250, 200, 0)).save(buffer, "PNG")
+        requests_seen = []
+
+        async def icon(request):
+            requests_seen.append(request.headers.get("If-None-Match"))
+            if request.headers.get("If-None-Match") == '"v1"':
+                return web.Response(status=304, headers={"ETag": '"v1"'})
+            return web.Response(body=buffer.getvalue(), content_type="image/png",
+                                headers={"ETag": '"v1"'})
+
+        async def run_jobs():
+            application = web.Application()
+            application.router.add_get("/icon.png", icon)
+            runner = web.AppRunner(application)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+            apps = [{"name": "Sun", "icon_url": f"http://127.0.0.1:{port}/icon.png"}]
+            try:
+                first = await downloader.download_icons_async(apps, [32], "first")
+                second = await downloader.download_icons_async(apps, [32], "second")
+            finally:
+                await runner.cleanup()
+            return first, second
+
+        downloader = IconDownloader(str(tmp_path))
+        try:
+            first, second = asyncio.run(run_jobs())
+        finally:
+            downloader.close()
+        assert requests_seen == [None, '"v1"']
+        assert first["fetches"] == {"downloaded": 1, "revalidated": 0, "renditions": 0,
+                                    "rendition_fetches": 0, "bytes_downloaded": len(buffer.getvalue())}
+        assert second["fetches"] == {"downloaded": 0, "revalidated": 1, "renditions": 0,
+                                     "rendition_fetches": 0, "bytes_downloaded": 0}
+        assert second["processing"]["reused"] == 1
+        assert (tmp_path / "second" / "Sun" / "original.png").read_bytes() == buffer.getvalue()
+
+    def test_rendition_urls(self):
+        """Test store CDN URLs are rewritten to the requested size"""
+        assert rendition_url(
+            "https://is1-ssl.mzstatic.com/image/thumb/Purple/v4/ab/cd/AppIcon.png/512x512bb.jpg", 64
+        ) == "https://is1-ssl.mzstatic.com/image/thumb/Purple/v4/ab/cd/AppIcon.png/64x64bb.png"
+        assert rendition_url("https://play-lh.googleusercontent.com/abc=s64-rw", 256) == \
+            "https://play-lh.googleusercontent.com/abc=s256"
+        assert rendition_url("https://play-lh.googleusercontent.com/abc", 32) == \
+            "https://play-lh.googleusercontent.com/abc=s32"
+        assert rendition_url("https://example.com/icon/512x512bb.jpg", 64) is None
+        assert rendition_url("https://is1-ssl.mzstatic.com/image/thumb/original", 64) is None
+
+    def test_renditions_replace_local_resizing(self, tmp_path):
+        """Test CDN renditions are used where valid and other sizes are resized locally"""
+        def png(size):
+            buffer = io.BytesIO()
+            Image.new("RGB", (size, size), (0, 0, 0)).save(buffer, "PNG")
+            return buffer.getvalue()
+
+        class CdnDownloader(IconDownloader):
+            async def _fetch_icon(self, session, icon_url, headers=None):
+                size = int(icon_url.rsplit("/", 1)[1].split("x")[0])
+                return png(min(size, 512)), {}  # The CDN caps renditions at the artwork size
+
+        downloader = CdnDownloader(str(tmp_path), renditions=True)
+        apps = [{"name": "Dark", "icon_url": "https://is1-ssl.mzstatic.com/image/thumb/x/512x512bb.jpg"}]
+        try:
+            status = asyncio.run(downloader.download_icons_async(apps, [16, 128, 1024], "job"))
+        finally:
+            downloader.close()
+        assert status["fetches"]["renditions"] == 2
+        assert status["fetches"]["rendition_fetches"] == 3
+        assert status["fetches"]["downloaded"] == 1
+        assert status["processing"]["images"] == 1
+        for size in (16, 128, 1024):
+            data = (tmp_path / "job" / "Dark" / f"icon_{size}x{size}.png").read_bytes()
+            assert png_dimensions(data) == (size, size)
+
+    def test_unrenderable_sizes_are_left_out(self, tmp_path):
+        """Test sizes that cannot be rendered are counted as failed, not filled with the original"""
+        class BrokenDownloader(IconDownloader):
+            async def _fetch_icon(self, session, icon_url, headers=None):
+                return b"not an image", {}
+
+        downloader = BrokenDownloader(str(tmp_path))
+        apps = [{"name": "Broken", "icon_url": "https://example.com/broken.png"}]
+        try:
+            status = asyncio.run(downloader.download_icons_async(apps, [32, 64], "job", image_format="webp"))
+        finally:
+            downloader.close()
+        assert status["processing"]["failed_sizes"] == 2
+        assert [path.name for path in (tmp_path / "job" / "Broken").iterdir()] == ["original.png"]
+        assert [name for name, _ in downloader.archive_entries("job")] == ["Broken/original.png"]
+        assert downloader.build_atlas("job", 32)["icons"] == {}
+
+    def test_storage_is_created_on_first_download(self, tmp_path):
+        """Test constructing a downloader leaves the disk untouched until it downloads"""
+        output_dir = tmp_path / "icons"
+        downloader = IconDownloader(str(output_dir))
+        try:
+            assert not output_dir.exists()
+            assert downloader.storage_stats() == {"blob_store": None, "icon_validators": None}
+            downloader.validator_cache.get("https://example.com/icon.png")
+            assert (output_dir / ".blobs" / "validators.sqlite3").exists()
+        finally:
+            downloader.close()
+
+    def test_job_zip_is_streamed(self, tmp_path):
+        """Test job archives are built on demand, storing PNGs without recompression"""
+        buffer = io.BytesIO()
+        Image.new("RGB", (256, 256), (30, 160, 90)).save(buffer, "PNG")
+
+        class StaticDownloader(IconDownloader):
+            async def _fetch_icon(self, session, icon_url, headers=None):
+                return buffer.getvalue(), {}
+
+        downloader = StaticDownloader(str(tmp_path))
+        apps = [{"name": "One", "icon_url": "https://a/1.png"}, {"name": "Two", "icon_url": "https://a/2.png"}]
+        try:
+            status = asyncio.run(downloader.download_icons_async(apps, [64, 128], "job"))
+        finally:
+            downloader.close()
+        assert status["archive_files"] == 6
+        assert not list(tmp_path.glob("*.zip"))
+
+        chunks = list(iter_zip(downloader.archive_entries("job") + [("Gone/x.png", str(tmp_path / "x"))],
+                               chunk_size=1024))
+        assert len(chunks) > 1
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+            assert archive.testzip() is None
+            names = archive.namelist()
+            assert sorted(names) == sorted(f"{app}/{name}" for app in ("One", "Two")
+                                           for name in ("original.png", "icon_64x64.png", "icon_128x128.png"))
+            assert {info.compress_type for info in archive.infolist()} == {zipfile.ZIP_STORED}
+            assert archive.read("Two/icon_64x64.png") == (tmp_path / "job" / "Two" / "icon_64x64.png").read_bytes()
+
+        downloader.discard_job("job")
+        assert downloader.archive_entries("job") is None
+
+    def test_archive_grows_while_job_runs(self, tmp_path):
+        """Test finished apps are in the job archive before slower apps finish"""
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 64), (200, 40, 40)).save(buffer, "PNG")
+
+        class SlowDownloader(IconDownloader):
+            async def _fetch_icon(self, session, icon_url, headers=None):
+                if "slow" in icon_url:
+                    await release.wait()
+                return buffer.getvalue(), {}
+
+        downloader = SlowDownloader(str(tmp_path))
+        apps = [{"name": "Slow", "icon_url": "https://a/slow.png"}, {"name": "Fast", "icon_url": "https://a/fast.png"}]
+
+        async def run():
+            nonlocal release
+            release = asyncio.Event()
+            job = asyncio.create_task(downloader.download_icons_async(apps, [32], "job"))
+            while downloader.jobs.get("job", {}).get("progress") != 1:
+                await asyncio.sleep(0.01)
+            partial = downloader.archive_entries("job")
+            release.set()
+            return partial, await job
+
+        release = None
+        try:
+            partial, status = asyncio.run(run())
+        finally:
+            downloader.close()
+        assert [name for name, _ in partial] == ["Fast/original.png", "Fast/icon_32x32.png"]
+        assert status["archive_files"] == 4
+        assert [name for name, _ in downloader.archive_entries("job")][2:] == ["Slow/original.png",
+                                                                               "Slow/icon_32x32.png"]
+
+    def test_image_pool_validates_settings(self):
+        """Test unknown executors and empty pools are rejected"""
+        with pytest.raises(ValueError):
+            ImagePool("gpu")
+        with pytest.raises(ValueError):
+            ImagePool("thread", workers=0)
+
+
 class TestUtilityFunctions:
     """Test utility helper functions"""
     